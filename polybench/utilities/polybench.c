@@ -22,6 +22,12 @@
 #ifdef _OPENMP
 # include <omp.h>
 #endif
+#ifdef POLYBENCH_PERF_REGION
+# include <stdint.h>
+# include <sys/ioctl.h>
+# include <sys/syscall.h>
+# include <linux/perf_event.h>
+#endif
 
 #if defined(POLYBENCH_PAPI)
 # undef POLYBENCH_PAPI
@@ -350,6 +356,138 @@ void polybench_papi_print()
 #endif
 /* ! POLYBENCH_PAPI */
 
+#ifdef POLYBENCH_PERF_REGION
+/*
+ * Region-scoped hardware counters (Linux perf_event_open). The counters
+ * are started by polybench_timer_start and stopped by polybench_timer_stop,
+ * so only the kernel is measured, not the array initialization nor the
+ * cache flush. polybench_timer_print prints them after the execution time
+ * in the format of perf stat, which the parse-log.py scripts read.
+ *
+ * The events are the groups collected by run.sh -p; the memory events are
+ * raw Skylake / Cascade Lake encodings (event | umask << 8). Only user space
+ * is counted, so perf_event_paranoid up to 2 is enough.
+ */
+struct polybench_perf_event
+{
+  const char* name;
+  uint32_t type;
+  uint64_t config;
+  int group;
+};
+static struct polybench_perf_event polybench_perf_events[] = {
+  { "cycles", PERF_TYPE_HARDWARE, PERF_COUNT_HW_CPU_CYCLES, 0 },
+  { "instructions", PERF_TYPE_HARDWARE, PERF_COUNT_HW_INSTRUCTIONS, 0 },
+  { "mem_load_retired.l1_miss", PERF_TYPE_RAW, 0x08d1, 1 },
+  { "mem_load_retired.l2_miss", PERF_TYPE_RAW, 0x10d1, 1 },
+  { "mem_load_retired.l3_miss", PERF_TYPE_RAW, 0x20d1, 1 },
+  { "dtlb_load_misses.stlb_hit", PERF_TYPE_RAW, 0x2008, 2 },
+  { "dtlb_load_misses.miss_causes_a_walk", PERF_TYPE_RAW, 0x0108, 2 },
+};
+# define POLYBENCH_NB_PERF_EVENTS \
+  (sizeof(polybench_perf_events) / sizeof(polybench_perf_events[0]))
+static int polybench_perf_fds[POLYBENCH_NB_PERF_EVENTS];
+/* Values scaled for multiplexing, and percentage of the region during
+   which each counter was scheduled (0 when it never was). */
+static unsigned long long polybench_perf_values[POLYBENCH_NB_PERF_EVENTS];
+static double polybench_perf_enabled[POLYBENCH_NB_PERF_EVENTS];
+
+static
+void polybench_perf_region_open()
+{
+  int leader = -1;
+  int group = -1;
+  unsigned int i;
+  for (i = 0; i < POLYBENCH_NB_PERF_EVENTS; ++i)
+    {
+      struct perf_event_attr attr;
+      memset (&attr, 0, sizeof(attr));
+      attr.size = sizeof(attr);
+      attr.type = polybench_perf_events[i].type;
+      attr.config = polybench_perf_events[i].config;
+      attr.read_format = PERF_FORMAT_TOTAL_TIME_ENABLED
+	| PERF_FORMAT_TOTAL_TIME_RUNNING;
+      attr.exclude_kernel = 1;
+      attr.exclude_hv = 1;
+      if (polybench_perf_events[i].group != group)
+	{
+	  group = polybench_perf_events[i].group;
+	  leader = -1;
+	}
+      /* The leader is disabled, the whole group is enabled with it. */
+      attr.disabled = leader == -1;
+      polybench_perf_fds[i] =
+	syscall (__NR_perf_event_open, &attr, 0, -1, leader, 0);
+      if (leader == -1)
+	leader = polybench_perf_fds[i];
+    }
+}
+
+static
+void polybench_perf_region_start()
+{
+  unsigned int i;
+  polybench_perf_region_open ();
+  for (i = 0; i < POLYBENCH_NB_PERF_EVENTS; ++i)
+    if (polybench_perf_fds[i] != -1)
+      ioctl (polybench_perf_fds[i], PERF_EVENT_IOC_ENABLE, 0);
+}
+
+static
+void polybench_perf_region_stop()
+{
+  unsigned int i;
+  for (i = 0; i < POLYBENCH_NB_PERF_EVENTS; ++i)
+    if (polybench_perf_fds[i] != -1)
+      ioctl (polybench_perf_fds[i], PERF_EVENT_IOC_DISABLE, 0);
+  for (i = 0; i < POLYBENCH_NB_PERF_EVENTS; ++i)
+    {
+      uint64_t data[3] = { 0, 0, 0 };
+      polybench_perf_values[i] = 0;
+      polybench_perf_enabled[i] = 0;
+      if (polybench_perf_fds[i] == -1)
+	continue;
+      if (read (polybench_perf_fds[i], data, sizeof(data)) == sizeof(data)
+	  && data[2] != 0)
+	{
+	  polybench_perf_values[i] =
+	    (unsigned long long) ((double) data[0] * data[1] / data[2]);
+	  polybench_perf_enabled[i] = 100.0 * data[2] / data[1];
+	}
+      close (polybench_perf_fds[i]);
+    }
+}
+
+static
+void polybench_perf_region_print()
+{
+  unsigned int i;
+  printf ("\n Performance counter stats for 'kernel region':\n\n");
+  for (i = 0; i < POLYBENCH_NB_PERF_EVENTS; ++i)
+    {
+      if (polybench_perf_fds[i] == -1)
+	printf ("%20s      %s\n", "<not supported>",
+		polybench_perf_events[i].name);
+      else if (polybench_perf_enabled[i] == 0)
+	printf ("%20s      %s\n", "<not counted>",
+		polybench_perf_events[i].name);
+      else if (polybench_perf_enabled[i] < 100)
+	printf ("%20llu      %s  (%.2f%%)\n", polybench_perf_values[i],
+		polybench_perf_events[i].name, polybench_perf_enabled[i]);
+      else
+	printf ("%20llu      %s\n", polybench_perf_values[i],
+		polybench_perf_events[i].name);
+    }
+# ifndef POLYBENCH_CYCLE_ACCURATE_TIMER
+  printf ("\n%20.9f seconds time elapsed\n\n",
+	  polybench_t_end - polybench_t_start);
+# else
+  printf ("\n%20s seconds time elapsed\n\n", "");
+# endif
+}
+#endif
+/* ! POLYBENCH_PERF_REGION */
+
 void polybench_prepare_instruments()
 {
 #ifndef POLYBENCH_NO_FLUSH_CACHE
@@ -364,6 +502,9 @@ void polybench_prepare_instruments()
 void polybench_timer_start()
 {
   polybench_prepare_instruments ();
+#ifdef POLYBENCH_PERF_REGION
+  polybench_perf_region_start ();
+#endif
 #ifndef POLYBENCH_CYCLE_ACCURATE_TIMER
   polybench_t_start = rtclock ();
 #else
@@ -379,6 +520,9 @@ void polybench_timer_stop()
 #else
   polybench_c_end = rdtsc ();
 #endif
+#ifdef POLYBENCH_PERF_REGION
+  polybench_perf_region_stop ();
+#endif
 #ifdef POLYBENCH_LINUX_FIFO_SCHEDULER
   polybench_linux_standard_scheduler ();
 #endif
@@ -404,6 +548,9 @@ void polybench_timer_print()
       printf ("%Ld\n", polybench_c_end - polybench_c_start);
 # endif
 #endif
+#ifdef POLYBENCH_PERF_REGION
+  polybench_perf_region_print ();
+#endif
 }
 
 /*
@@ -20,6 +20,9 @@
  *   OR (exclusive):
  * -DPOLYBENCH_PAPI, to use PAPI H/W counters (defined in polybench.c)
  *
+ * With -DPOLYBENCH_TIME, -DPOLYBENCH_PERF_REGION also counts H/W events
+ * around the kernel only (Linux perf_event_open, defined in polybench.c).
+ *
  *
  * See README or utilities/polybench.c for additional options.
  *
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# Convert the results of a google benchmark executable to JSON-lines records
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from packtools.logparse import tokenize_log, COUNTER, ERROR
+from packtools.records import RecordWriter, make_record, executable_benchmark, executable_tiling_packing
+from packtools.perfcsv import read_perf_output, append_perf_csv, counted_values
+
+# factor converting a google benchmark time unit to milliseconds
+TIME_UNITS = {"ns": 1e-6, "us": 1e-3, "ms": 1.0, "s": 1e3}
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Append the repetitions of a google benchmark run to a JSON-lines records file.")
+
+    parser.add_argument("benchmark_out", help="Output of the executable with --benchmark_out_format=json")
+    parser.add_argument("run_output", help="Text output of the run (google benchmark console output and perf stat)")
+    parser.add_argument("executable", help="Executable that was run")
+    parser.add_argument("records_file", help="JSON-lines records file")
+    parser.add_argument("--core", help="Core the executable ran on.", type=int, default=-1)
+    parser.add_argument("--perf-output", help="Output of perf stat -x, -o for the run, appended to --perf-csv.", type=str)
+    parser.add_argument("--perf-csv", help="Perf CSV file of the log.", type=str)
+    args = parser.parse_args()
+
+    # perf counters measure the whole run, they are kept on its first repetition
+    counters = {}
+    for token, key, value in tokenize_log(args.run_output):
+        if token == ERROR:
+            counters = None
+            break
+        if token == COUNTER:
+            counters[key] = value
+    if args.perf_output is not None:
+        perf_rows = read_perf_output(args.perf_output)
+        append_perf_csv(args.perf_csv, args.executable, 0, args.core, perf_rows)
+        if counters is not None:
+            counters = counted_values(perf_rows)
+
+    # the executable crashed before writing its results
+    try:
+        with open(args.benchmark_out, 'r') as f:
+            results = json.load(f)
+    except (OSError, ValueError):
+        sys.exit(0)
+
+    benchmark = executable_benchmark(args.executable)
+    tiling, packing = executable_tiling_packing(args.executable)
+    with RecordWriter(args.records_file) as records:
+        for result in results["benchmarks"]:
+            if result.get("run_type", "iteration") != "iteration":
+                continue
+            repetition = result.get("repetition_index", 0)
+            runtime = result["cpu_time"] * TIME_UNITS[result.get("time_unit", "ns")]
+            records.write(make_record(benchmark, packing, tiling, repetition, args.core, runtime, counters if repetition == 0 else None))
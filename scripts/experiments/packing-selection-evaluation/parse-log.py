@@ -2,96 +2,186 @@
 # Parse output logs of packing selection evaluation
 
 import argparse
-import matplotlib.pyplot as plt
+import numpy as np
 import sys
-import scipy.stats as st
 from math import sqrt
 from pathlib import Path
 
-# parse google benchmark results
-def parse_log_file(log_file):
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from packtools.logscan import scan_log
+from packtools.render import figure_spec, FigureRenderer, FORMATS
+from packtools.store import write_store, read_store, is_store
+from packtools.cache import log_cache, add_cache_arguments
+from packtools.stats import confidence_interval, sample_matrix, summarize
+from packtools.records import read_records, records_path, RECORDS_SUFFIX
+from packtools.perfcsv import read_perf_csv, perf_csv_path, perf_csv_warnings, counted_values_by_executable, log_sidecars
+from packtools.profiling import profiler, add_profile_arguments, PROFILE_FILE
+from packtools.resultsdb import ResultsDB, run_metadata, add_results_arguments
+
+# get tiling and packing of an executable from its name
+def parse_executable_name(executable):
+    tiling,packing = executable.split('/')[-1].replace('./' + benchmark_name + '-', '').replace('.exe', '').replace('Running ', '').strip('\n').split('-packing-')
+    tiling = '-'.join(tiling.split('-')[1:])
+    tiling = int(tiling.split('-')[-1])
+    return tiling, packing
+
+# parse google benchmark results and perf results with a single scan of the
+# mapped log, returns the columns of the samples store (one row per executable
+# run) and the names of the perf counter columns
+def read_log_file(log_file):
+    if Path(log_file).suffix == RECORDS_SUFFIX:
+        return read_records_file(log_file)
+
+    scanned = scan_log(log_file, google_benchmark=True)
+    # tiling and packing of each distinct executable, then of each run
+    names = [parse_executable_name(executable) for executable in scanned.executables]
+    runs = scanned.runs.tolist()
+
+    # google benchmark only reports aggregates: runtime is the mean execution time
+    columns = {
+        "benchmark": [benchmark_name] * len(runs),
+        "variant": [names[run][1] for run in runs],
+        "tiling": [names[run][0] for run in runs],
+        "runtime": scanned.means.tolist(),
+        "stddev": scanned.stddevs.tolist(),
+        "iterations": scanned.iterations.tolist(),
+    }
+    perf_counters = list(scanned.counters.keys())
+    for counter,values in scanned.counters.items():
+        columns[counter] = values.tolist()
+
+    # executable and error status of each row, to match the perf CSV file
+    executables = [Path(scanned.executables[run]).name for run in runs]
+    failed_rows = set(np.flatnonzero(scanned.errors).tolist())
+
+    # counters written by perf stat -x, next to the log by run.sh
+    perf_csv = perf_csv_path(log_file)
+    if perf_csv.exists():
+        read_perf_csv_counters(perf_csv, executables, failed_rows, columns, perf_counters)
+
+    return columns, perf_counters
+
+# fill the counter columns of the rows of executables from a perf CSV file,
+# multiplexed and not counted events are reported on stderr
+def read_perf_csv_counters(perf_csv, executables, failed_rows, columns, perf_counters):
+    perf_columns = read_perf_csv(perf_csv)
+    for warning in perf_csv_warnings(perf_columns, perf_csv.name):
+        print(warning, file=sys.stderr)
+    executable_counters = {}
+    for (executable, counter),values in counted_values_by_executable(perf_columns).items():
+        if executable not in executable_counters:
+            executable_counters[executable] = []
+        executable_counters[executable].append((counter, values))
+
+    runs = {}
+    for row,executable in enumerate(executables):
+        # the n-th run of an executable has the n-th values of its counters
+        run = runs.get(executable, 0)
+        runs[executable] = run + 1
+        if row in failed_rows:
+            continue
+        for counter,values in executable_counters.get(executable, []):
+            if run >= len(values):
+                continue
+            if counter not in columns:
+                columns[counter] = [np.nan] * len(executables)
+                perf_counters.append(counter)
+            columns[counter][row] = int(values[run])
+
+# columns of read_log_file computed from the JSON-lines records of the
+# repetitions written alongside the log by run.sh
+def read_records_file(records_file):
+    records, counters = read_records(records_file)
+    # one row per executable, in the order they were run
+    runs = list(dict.fromkeys(zip(records["variant"], records["tiling"])))
+    run_index = {run: row for row,run in enumerate(runs)}
+    run_rows = np.array([run_index[run] for run in zip(records["variant"], records["tiling"])], dtype=np.intp)
+    stats = summarize(sample_matrix([records["runtime"][run_rows == row] for row in range(len(runs))]))
+
+    columns = {
+        "benchmark": [benchmark_name] * len(runs),
+        "variant": [packing for packing,_ in runs],
+        "tiling": [int(tiling) for _,tiling in runs],
+        "runtime": list(stats.mean),
+        "stddev": list(stats.stddev),
+        "iterations": [int(count) for count in stats.count],
+    }
+    # counters of a run are kept on one of its repetitions
+    perf_counters = list(counters.keys())
+    for counter,values in counters.items():
+        columns[counter] = [np.nan] * len(runs)
+        for row,value in zip(run_rows, values):
+            if not np.isnan(value):
+                columns[counter][row] = value
+    return columns, perf_counters
+
+# summarize the columns read from the log or from the samples store
+def log_statistics(columns, perf_counters, packings):
     # map from a packing to a map from tiling to the its mean execution time
     benchmark_means_map = {}
     # map from a packing to a map from tiling to the stddev of its execution time
     benchmark_stddev_map = {}
     # map from a packing to a map from tiling to the confidence interval of its execution time
     benchmark_confidence_intervals_map = {}
+    # map from perf counter to a map from a packing to a map from a tiling to the value of the counter
+    perf_counter_map = {}
     # stores all packing options used in all tilings
     tilings_run = set()
+    # smallest number of iterations run by an executable
     iterations_per_run = -1
 
-    with open(log_file, 'r') as f:
-        for line in f:
-            if "Running" in line:
-                tiling,packing = line.split('/')[-1].replace('./' + benchmark_name + '-', '').replace('.exe', '').replace('Running ', '').strip('\n').split('-packing-')
-                tiling = '-'.join(tiling.split('-')[1:])
-                tiling = int(tiling.split('-')[-1])
-
-            if "mean" in line:
-                mean_value = float(line.split()[3])
-                iterations = int(line.split()[5])
-                if iterations_per_run == -1:
-                    iterations_per_run = iterations
-                else:
-                    assert iterations == iterations_per_run
-
-            if "stddev" in line:
-                stddev_value = float(line.split()[3])
-                tilings_run.add(tiling)
-
-                # results were collected for this sample
-                if packing not in benchmark_means_map:
-                    benchmark_means_map[packing] = {}
-                    benchmark_stddev_map[packing] = {}
-                    benchmark_confidence_intervals_map[packing] = {}
-
-                benchmark_means_map[packing][tiling] = mean_value
-                benchmark_stddev_map[packing][tiling] = stddev_value
-
-                conf_low, conf_high = st.norm.interval(alpha=0.95, loc=mean_value, scale=stddev_value/sqrt(iterations))
-                conf = (conf_high - conf_low) / 2
-                benchmark_confidence_intervals_map[packing][tiling] = conf
-
-    return benchmark_means_map, benchmark_stddev_map, benchmark_confidence_intervals_map, iterations, tilings_run
-
-# parse perf results
-def parse_perf_log_file(log_file):
-    # map from perf counter to a map from a packing to a map from a tiling to the value of the counter
-    perf_counter_map = {}
+    # google benchmark gives the mean and stddev of every run, confidence
+    # intervals of all runs are computed at once
+    confidence_intervals = confidence_interval(np.asarray(columns["stddev"], dtype=float), np.asarray(columns["iterations"], dtype=float))
 
-    with open(log_file, 'r') as f:
-        collectPerf = False
-        errorFound = False
-        for line in f:
-            # skip empty lines
-            if line.strip() == '':
-                continue
+    for row,packing in enumerate(packings):
+        tiling = int(columns["tiling"][row])
 
-            if "abort" in line.lower() or "segmentation fault" in line.lower():
-                errorFound = True
-                continue
+        # results were collected for this sample
+        if not np.isnan(columns["stddev"][row]):
+            mean_value = float(columns["runtime"][row])
+            stddev_value = float(columns["stddev"][row])
+            iterations = int(columns["iterations"][row])
+            if iterations_per_run == -1 or iterations < iterations_per_run:
+                iterations_per_run = iterations
+            tilings_run.add(tiling)
+
+            if packing not in benchmark_means_map:
+                benchmark_means_map[packing] = {}
+                benchmark_stddev_map[packing] = {}
+                benchmark_confidence_intervals_map[packing] = {}
+
+            benchmark_means_map[packing][tiling] = mean_value
+            benchmark_stddev_map[packing][tiling] = stddev_value
+
+            benchmark_confidence_intervals_map[packing][tiling] = float(confidence_intervals[row])
 
-            if "Running" in line:
-                errorFound = False
-                tiling,packing = line.split('/')[-1].replace('./' + benchmark_name + '-', '').replace('.exe', '').replace('Running ', '').strip('\n').split('-packing-')
-                tiling = '-'.join(tiling.split('-')[1:])
-                tiling = int(tiling.split('-')[-1])
-            # start of perf information
-            elif "Performance counter stats" in line and not errorFound:
-                collectPerf = True
-            # end of perf information
-            elif "seconds time elapsed" in line and not errorFound:
-                collectPerf = False
-            elif collectPerf and not errorFound:
-                value = int(line.split()[0].replace(',',''))
-                counter = line.split()[1]
+        for counter in perf_counters:
+            value = columns[counter][row]
+            if not np.isnan(value):
                 if counter not in perf_counter_map:
                     perf_counter_map[counter] = {}
                 if packing not in perf_counter_map[counter]:
                     perf_counter_map[counter][packing] = {}
-                perf_counter_map[counter][packing][tiling] = value
-
-    return perf_counter_map
+                perf_counter_map[counter][packing][tiling] = int(value)
+
+    return benchmark_means_map, benchmark_stddev_map, benchmark_confidence_intervals_map, iterations_per_run, tilings_run, perf_counter_map
+
+# rows of the results database: statistics of the execution time and perf
+# counters of every packing and tiling
+def result_rows(benchmark_mean, benchmark_stddev, benchmark_confidence_interval, iterations_per_run, perf_results):
+    for packing in benchmark_mean.keys():
+        for tiling,mean in benchmark_mean[packing].items():
+            yield benchmark_name, packing, tiling, "runtime", mean, benchmark_stddev[packing][tiling], benchmark_confidence_interval[packing][tiling], iterations_per_run
+    for counter in perf_results.keys():
+        for packing in perf_results[counter].keys():
+            for tiling,value in perf_results[counter][packing].items():
+                yield benchmark_name, packing, tiling, counter, value, None, None, None
+
+# parse google benchmark results and perf results in a single pass over the log
+def parse_log_file(log_file):
+    columns, perf_counters = read_log_file(log_file)
+    return log_statistics(columns, perf_counters, columns["variant"])
 
 if __name__ == "__main__":
 
@@ -101,12 +191,25 @@ if __name__ == "__main__":
     parser.add_argument("output_dir", help="Output dir")
     parser.add_argument('benchmark_name', choices=['2mm', 'gemm', 'gemm-blis'], type=str, help="Benchmark used in generate-files.sh")
     parser.add_argument("--skip-perf-graphs", help="Do not generate perf graphs.", action='store_true')
+    parser.add_argument("--csv-only", help="Only write output.csv and output-perf.csv, without graphs (matplotlib is not loaded).", action='store_true')
+    parser.add_argument("-j", "--jobs", help="Number of graphs rendered in parallel.", type=int, default=1)
+    parser.add_argument("--format", help="Format of the graphs.", type=str, choices=FORMATS, default='png')
+    parser.add_argument("--samples", help="Columnar store of the parsed samples. Written after parsing the log; when it already exists, it is read instead of the log.", type=str)
+    add_cache_arguments(parser)
+    add_profile_arguments(parser)
+    add_results_arguments(parser)
     args = parser.parse_args()
 
     input_file = Path(args.input_file)
     output_dir = Path(args.output_dir)
     benchmark_name = args.benchmark_name
     skip_perf_graphs = args.skip_perf_graphs
+    csv_only = args.csv_only
+    jobs = args.jobs
+    graph_format = args.format
+    samples_path = Path(args.samples).absolute() if args.samples else None
+    cache = log_cache(args)
+    profile = profiler(args)
 
     if not input_file.exists() or not input_file.is_file():
         print("Input file is not a file of does not exist", file=sys.stderr)
@@ -117,10 +220,36 @@ if __name__ == "__main__":
         sys.exit(1)
 
     input_file = input_file.absolute()
+    # the JSON-lines records written by run.sh are read instead of the log when present
+    if records_path(input_file).exists():
+        input_file = records_path(input_file)
     output_dir = output_dir.absolute()
 
-    # Parse input file
-    benchmark_mean, benchmark_stddev, benchmark_confidence_interval, iterations_per_run, tiling_legend = parse_log_file(input_file)
+    profile.start("parse")
+    # Parse input file only once: samples are read from the store when it exists
+    if samples_path is not None and is_store(samples_path):
+        columns, labels = read_store(samples_path)
+        perf_counters = [name for name in columns if name not in ("benchmark", "variant", "tiling", "runtime", "stddev", "iterations")]
+        packings = [labels["variant"][code] for code in columns["variant"]]
+    else:
+        # the executables of the log are named after the benchmark
+        cache_tag = "packing-selection-evaluation-" + benchmark_name
+        samples = cache.get(input_file, cache_tag, log_sidecars(input_file)) if cache is not None else None
+        if samples is None:
+            samples = read_log_file(input_file)
+            if cache is not None:
+                cache.put(input_file, samples, cache_tag, log_sidecars(input_file))
+        columns, perf_counters = samples
+        packings = columns["variant"]
+        if samples_path is not None:
+            write_store(samples_path, columns)
+    profile.start("stats")
+    benchmark_mean, benchmark_stddev, benchmark_confidence_interval, iterations_per_run, tiling_legend, perf_results = log_statistics(columns, perf_counters, packings)
+
+    if args.results_db is not None:
+        profile.start("results db")
+        with ResultsDB(args.results_db) as results_db:
+            results_db.add_run(run_metadata("packing-selection-evaluation", input_file, args, "Polymer"), result_rows(benchmark_mean, benchmark_stddev, benchmark_confidence_interval, iterations_per_run, perf_results))
 
     # Output paths
     output_csv = output_dir / "output.csv"
@@ -128,37 +257,21 @@ if __name__ == "__main__":
     perf_relative_outputs_dir = output_dir / "perf-relative"
     output_perf_csv = output_dir / "output-perf.csv"
 
-    perf_counters = set()
-    perf_results = dict()
-
     # get perf counters that were measured
-    with open(input_file, 'r') as f:
-        collectPerf = False
-        for line in f:
-            # skip emtpy lines
-            if line.strip() == '':
-                continue
-
-            # start of perf information
-            if "Performance counter stats" in line:
-                collectPerf = True
-            # end of perf information
-            elif "seconds time elapsed" in line:
-                break
-            elif collectPerf:
-                perf_counters.add(line.split()[1])
+    perf_counters = set(perf_results.keys())
 
     # Check if perf was measured
     perf_found = True
-    if skip_perf_graphs:
+    if skip_perf_graphs and not csv_only:
         perf_found = False
     elif len(perf_counters) == 0:
         perf_found = False
         print("Warning: No perf data was found")
-    else:
+    elif not csv_only:
         perf_outputs_dir.mkdir(exist_ok=True)
         perf_relative_outputs_dir.mkdir(exist_ok=True)
 
+    profile.start("csv")
     # Dump .csv data
     with open(output_csv, 'w') as f:
         # Write header
@@ -168,8 +281,6 @@ if __name__ == "__main__":
                 f.write(benchmark_name + "," + str(tiling) + "," + packing + "," + str(benchmark_mean[packing][tiling]) + "," + str(benchmark_stddev[packing][tiling]) + "," + str(benchmark_confidence_interval[packing][tiling]) + "," + str(iterations_per_run) + "\n")
 
     if perf_found:
-        # parse perf results
-        perf_results = parse_perf_log_file(input_file)
         # Dump perf .csv data
         with open(output_perf_csv, 'w') as f:
             # Write header
@@ -184,6 +295,11 @@ if __name__ == "__main__":
                     csv_output_line = csv_output_line + ','.join(counter_values) + ',' + str(iterations_per_run) + '\n'
                     f.write(csv_output_line)
 
+    if csv_only:
+        profile.write_report(output_dir / PROFILE_FILE, benchmark=benchmark_name, csv_only=True, rows=len(packings))
+        profile.close()
+        sys.exit(0)
+
     # from matplotlib import rc
     # rc('font',**{'family':'serif','serif':['Libertine']})
     # rc('text', usetex=True)
@@ -200,6 +316,8 @@ if __name__ == "__main__":
     #     "font.family": "serif",
     #     "legend.fontsize": 16,
     # })
+    # matplotlib is only loaded when graphs are drawn, not with --csv-only
+    import matplotlib.pyplot as plt
     plt.style.use('seaborn-whitegrid')
     plt.rcParams.update({
         "font.size": 18,
@@ -208,6 +326,9 @@ if __name__ == "__main__":
     })
     marker=['o', 'v', '^', '<', '>', 's', 'p', '*', 'X']
 
+    # graphs are rendered by workers while the next ones are being built
+    renderer = FigureRenderer(jobs, graph_format, profile)
+
     none_packing_idx = "none"
     heuristic_packing_idx = "heuristic"
 
@@ -217,8 +338,9 @@ if __name__ == "__main__":
     else:
         polymer_label = "Polymer"
 
+    profile.start("time graphs")
     # Build the plot for all packings together (time) ----------------
-    fig, ax = plt.subplots()
+    spec, ax = figure_spec()
     for idx,packing in enumerate(sorted(benchmark_mean.keys())):
         label = packing
         if packing == heuristic_packing_idx:
@@ -243,18 +365,14 @@ if __name__ == "__main__":
     # Save the figure and show
     graph_path = output_dir / ('all-graphs-time.png')
     if benchmark_name == "gemm-blis":
-        legend = plt.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+        spec.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
     else:
-        legend = plt.legend(ncol=6, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-    frame = legend.get_frame()
-    frame.set_facecolor('white')
-    frame.set_edgecolor('black')
-    plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-    plt.close(fig)
+        spec.legend(ncol=6, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+    renderer.submit(spec, graph_path)
     # ----------------------------------------------------------------
 
     # Build the plot for all packings together (time area) ----------------
-    fig, ax = plt.subplots()
+    spec, ax = figure_spec()
     y_max_time = []
     y_min_time = []
     y_no_packing = []
@@ -294,18 +412,15 @@ if __name__ == "__main__":
     # Save the figure and show
     graph_path = output_dir / ('all-graphs-time-area.png')
     if benchmark_name == "gemm-blis":
-        legend = plt.legend(ncol=1, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+        spec.legend(ncol=1, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
     else:
-        legend = plt.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-    frame = legend.get_frame()
-    frame.set_facecolor('white')
-    frame.set_edgecolor('black')
-    plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-    plt.close(fig)
+        spec.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+    renderer.submit(spec, graph_path)
     # ----------------------------------------------------------------
 
+    profile.start("speedup graphs")
     # Build the plot for all packings together (speedup on none) -----
-    fig, ax = plt.subplots()
+    spec, ax = figure_spec()
     ax.axhline(y=1, color='black', linestyle='--', alpha=0.5, linewidth=1)
     for idx,packing in enumerate(sorted(benchmark_mean.keys())):
         if packing == none_packing_idx or packing == heuristic_packing_idx:
@@ -315,7 +430,7 @@ if __name__ == "__main__":
 
         for tiling in x_tilings:
             y_speedup.append(benchmark_mean[none_packing_idx][tiling]/benchmark_mean[packing][tiling])
-        bars = ax.scatter(x_tilings, y_speedup, marker=marker[idx%len(marker)], s=12, edgecolor='black', linewidths=0.2, alpha=0.8, label=packing)
+        ax.scatter(x_tilings, y_speedup, marker=marker[idx%len(marker)], s=12, edgecolor='black', linewidths=0.2, alpha=0.8, label=packing)
     # Set axes labels and limits
     ax.set_xlim(left=min(x_tilings)-2, right=max(x_tilings)+2)
     ax.yaxis.grid(True)
@@ -327,16 +442,12 @@ if __name__ == "__main__":
     ax.set_xlabel('Tiling size')
     # Save the figure and show
     graph_path = output_dir / ('all-graphs-speedup.png')
-    legend = plt.legend(ncol=6, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-    frame = legend.get_frame()
-    frame.set_facecolor('white')
-    frame.set_edgecolor('black')
-    plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-    plt.close(fig)
+    spec.legend(ncol=6, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+    renderer.submit(spec, graph_path)
     # ----------------------------------------------------------------
 
     # Build the plot for all packings together (speedup area) --------
-    fig, ax = plt.subplots()
+    spec, ax = figure_spec()
     ax.axhline(y=1, color='black', linestyle='--', alpha=0.5, linewidth=1)
     y_max_time = []
     y_min_time = []
@@ -368,20 +479,17 @@ if __name__ == "__main__":
     # Save the figure and show
     graph_path = output_dir / ('all-graphs-speedup-area.png')
     if benchmark_name == "gemm-blis":
-        legend = plt.legend(ncol=1, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+        spec.legend(ncol=1, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
     else:
-        legend = plt.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-    frame = legend.get_frame()
-    frame.set_facecolor('white')
-    frame.set_edgecolor('black')
-    plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-    plt.close(fig)
+        spec.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+    renderer.submit(spec, graph_path)
     # ----------------------------------------------------------------
 
     if perf_found:
+        profile.start("perf graphs")
         # Build the plot for all packings together for perf counters (area) -----
         for counter in perf_counters:
-            fig, ax = plt.subplots()
+            spec, ax = figure_spec("perf-area")
             y_max = []
             y_min = []
             y_no_packing = []
@@ -413,19 +521,15 @@ if __name__ == "__main__":
             # Save the figure and show
             graph_path = perf_outputs_dir / (counter + '-area.png')
             if benchmark_name == "gemm-blis":
-                legend = plt.legend(ncol=1, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1.05), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+                spec.legend(ncol=1, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1.05), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
             else:
-                legend = plt.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1.05), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-            frame = legend.get_frame()
-            frame.set_facecolor('white')
-            frame.set_edgecolor('black')
-            plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-            plt.close(fig)
+                spec.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1.05), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+            renderer.submit(spec, graph_path)
         # -----------------------------------------------------------------------
 
         # Build the plot for all packings together for perf counters -----
         for counter in perf_counters:
-            fig, ax = plt.subplots()
+            spec, ax = figure_spec("perf")
             for idx,packing in enumerate(sorted(perf_results[counter].keys())):
                 label = packing
                 if packing == heuristic_packing_idx:
@@ -437,7 +541,7 @@ if __name__ == "__main__":
                 for tiling in sorted(perf_results[counter][packing].keys()):
                     y_values.append(perf_results[counter][packing][tiling]/iterations_per_run)
                     x_tilings.append(tiling)
-                bars = ax.scatter(x_tilings, y_values, marker=marker[idx%len(marker)], s=12, edgecolor='black', linewidths=0.2, alpha=0.8, label=label)
+                ax.scatter(x_tilings, y_values, marker=marker[idx%len(marker)], s=12, edgecolor='black', linewidths=0.2, alpha=0.8, label=label)
             # Set axes labels and limits
             ax.set_ylim(bottom=0)
             ax.set_xlim(left=min(x_tilings)-2, right=max(x_tilings)+2)
@@ -449,19 +553,16 @@ if __name__ == "__main__":
             # Save the figure and show
             graph_path = perf_outputs_dir / (counter + '.png')
             if benchmark_name == "gemm-blis":
-                legend = plt.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1.05), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+                spec.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1.05), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
             else:
-                legend = plt.legend(ncol=6, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1.05), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-            frame = legend.get_frame()
-            frame.set_facecolor('white')
-            frame.set_edgecolor('black')
-            plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-            plt.close(fig)
+                spec.legend(ncol=6, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1.05), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+            renderer.submit(spec, graph_path)
         # ----------------------------------------------------------------
 
+        profile.start("perf relative graphs")
         # Build the plot for all packings together for perf counters relative to no packing (area) -----
         for counter in perf_counters:
-            fig, ax = plt.subplots()
+            spec, ax = figure_spec("perf-relative-area")
             ax.axhline(y=1, color='black', linestyle='--', alpha=0.5, linewidth=1)
             y_max = []
             y_min = []
@@ -491,17 +592,13 @@ if __name__ == "__main__":
             ax.set_xlabel('Tiling size (all dimensions)')
             # Save the figure and show
             graph_path = perf_relative_outputs_dir / (counter + '-area.png')
-            legend = plt.legend(loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-            frame = legend.get_frame()
-            frame.set_facecolor('white')
-            frame.set_edgecolor('black')
-            plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-            plt.close(fig)
+            spec.legend(loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+            renderer.submit(spec, graph_path)
          # ----------------------------------------------------------------------------------------------
 
         # Build the plot for all packings together for perf counters relative to no packing -------
         for counter in perf_counters:
-            fig, ax = plt.subplots()
+            spec, ax = figure_spec("perf-relative")
             ax.axhline(y=1, color='black', linestyle='--', alpha=0.5, linewidth=1)
             for idx,packing in enumerate(sorted(perf_results[counter].keys())):
                 if packing == heuristic_packing_idx or packing == none_packing_idx:
@@ -511,7 +608,7 @@ if __name__ == "__main__":
                 for tiling in sorted(perf_results[counter][packing].keys()):
                     y_values.append(perf_results[counter][none_packing_idx][tiling]/perf_results[counter][packing][tiling])
                     x_tilings.append(tiling)
-                bars = ax.scatter(x_tilings, y_values, marker=marker[idx%len(marker)], s=12, edgecolor='black', linewidths=0.2, alpha=0.8, label=packing)
+                ax.scatter(x_tilings, y_values, marker=marker[idx%len(marker)], s=12, edgecolor='black', linewidths=0.2, alpha=0.8, label=packing)
             # Set axes labels and limits
             ax.set_xlim(left=min(x_tilings)-2, right=max(x_tilings)+2)
             ax.yaxis.grid(True)
@@ -523,12 +620,11 @@ if __name__ == "__main__":
             ax.set_xlabel('Tiling size')
             # Save the figure and show
             graph_path = perf_relative_outputs_dir / (counter + '.png')
-            legend = plt.legend(ncol=6, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-            frame = legend.get_frame()
-            frame.set_facecolor('white')
-            frame.set_edgecolor('black')
-            plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-            plt.close(fig)
+            spec.legend(ncol=6, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+            renderer.submit(spec, graph_path)
         # -----------------------------------------------------------------------------------------
 
-
+    profile.start("rendering")
+    renderer.close()
+    profile.write_report(output_dir / PROFILE_FILE, benchmark=benchmark_name, jobs=jobs, format=graph_format, rows=len(packings))
+    profile.close()
@@ -157,6 +157,16 @@ if [ -f $OUTPUT_LOG ]; then
     echo "Please remove $OUTPUT_LOG"
     exit 1
 fi
+if [ -f "$OUTPUT_DIR/output.jsonl" ]; then
+    echo "ERROR: Output records already exist."
+    echo "Please remove $OUTPUT_DIR/output.jsonl"
+    exit 1
+fi
+if [ -f "$OUTPUT_DIR/output.perf.csv" ]; then
+    echo "ERROR: Output perf counters already exist."
+    echo "Please remove $OUTPUT_DIR/output.perf.csv"
+    exit 1
+fi
 
 case $DATASET_SIZE in
   MINI)
@@ -185,17 +195,34 @@ if [[ ! -z $CUSTOM_REPEATS ]]; then
   REPEATS=$CUSTOM_REPEATS
 fi
 
+# Each repetition is also recorded in output.jsonl, read by parse-log.py instead of the log
+RECORDS_PY="$(getScriptLocation)/gbench-records.py"
+OUTPUT_RECORDS="$OUTPUT_DIR/output.jsonl"
+RUN_OUTPUT=$(mktemp)
+BENCHMARK_OUT=$(mktemp)
+# perf stat -x, output of each run, appended to output.perf.csv
+PERF_OUT=$(mktemp)
+trap "rm -f $RUN_OUTPUT $BENCHMARK_OUT $PERF_OUT" EXIT
+
 for i in $(find $INPUT_DIR -name "*.exe" | sort); do
   FNAME=$(basename $i)
   echoGreen "\nRunning $FNAME"
 
   # seed random
   RANDOM=$(date +%s%N | cut -b10-19 | sed -e 's/^0*//;s/^$/0/')
+  CORE=$(( $RANDOM % $CORES ))
+  rm -f $BENCHMARK_OUT
 
   if [[ "$collect_perf" == "true" ]]; then
-    perf stat -e '{cycles,instructions},{mem_load_retired.l1_miss,mem_load_retired.l2_miss,mem_load_retired.l3_miss},{dtlb_load_misses.stlb_hit,dtlb_load_misses.miss_causes_a_walk}' taskset --cpu-list $(( $RANDOM % $CORES )) $i --benchmark_repetitions=$REPEATS 2>&1 | tee -a $OUTPUT_LOG
+    perf stat -x, -o $PERF_OUT -e '{cycles,instructions},{mem_load_retired.l1_miss,mem_load_retired.l2_miss,mem_load_retired.l3_miss},{dtlb_load_misses.stlb_hit,dtlb_load_misses.miss_causes_a_walk}' taskset --cpu-list $CORE $i --benchmark_repetitions=$REPEATS --benchmark_out=$BENCHMARK_OUT --benchmark_out_format=json 2>&1 | tee $RUN_OUTPUT
+  else
+    taskset --cpu-list $CORE $i --benchmark_repetitions=$REPEATS --benchmark_out=$BENCHMARK_OUT --benchmark_out_format=json 2>&1 | tee $RUN_OUTPUT
+  fi
+  cat $RUN_OUTPUT >> $OUTPUT_LOG
+  if [[ "$collect_perf" == "true" ]]; then
+    $RECORDS_PY --core $CORE --perf-output $PERF_OUT --perf-csv "$OUTPUT_DIR/output.perf.csv" $BENCHMARK_OUT $RUN_OUTPUT $i $OUTPUT_RECORDS
   else
-    taskset --cpu-list $(( $RANDOM % $CORES )) $i --benchmark_repetitions=$REPEATS 2>&1 | tee -a $OUTPUT_LOG
+    $RECORDS_PY --core $CORE $BENCHMARK_OUT $RUN_OUTPUT $i $OUTPUT_RECORDS
   fi
 
 done
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# Time the parse-log.py scripts on logs written by generate-logs.py
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from packtools.synthlog import read_manifest
+from packtools.profiling import PROFILE_FILE
+
+EXPERIMENTS_DIR = Path(__file__).resolve().parents[1]
+
+
+# command line of the parse-log.py script of the experiment of the logs
+def parse_log_command(log_dir, output_dir, manifest, jobs, skip_perf_graphs):
+    experiment = manifest["experiment"]
+    script = EXPERIMENTS_DIR / experiment / "parse-log.py"
+    if experiment == "polybench-evaluation":
+        command = [sys.executable, str(script), str(log_dir), str(output_dir), manifest["tiling_method"]]
+    else:
+        command = [sys.executable, str(script), str(log_dir / "output.log"), str(output_dir), manifest["benchmark"]]
+    command += ["--no-cache", "--profile", "-j", str(jobs)]
+    if skip_perf_graphs:
+        command.append("--skip-perf-graphs")
+    return command
+
+
+# run the script once, returns its wall time and the wall time of its parse
+# phase
+def time_run(command, output_dir):
+    start = time.perf_counter()
+    subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+    wall = time.perf_counter() - start
+    with open(output_dir / PROFILE_FILE) as f:
+        phases = {phase["name"]: phase for phase in json.load(f)["phases"]}
+    return wall, phases["parse"]["wall"]
+
+
+# throughput of the best of repeats runs of the script on the logs of log_dir
+def benchmark_logs(log_dir, repeats, jobs, skip_perf_graphs):
+    manifest = read_manifest(log_dir)
+    size = sum(log["bytes"] for log in manifest["logs"])
+    executions = sum(log["executions"] for log in manifest["logs"])
+    walls = []
+    parse_walls = []
+    with tempfile.TemporaryDirectory(prefix="parse-benchmark-") as output_dir:
+        output_dir = Path(output_dir)
+        command = parse_log_command(log_dir, output_dir, manifest, jobs, skip_perf_graphs)
+        for _ in range(repeats):
+            wall, parse_wall = time_run(command, output_dir)
+            walls.append(wall)
+            parse_walls.append(parse_wall)
+    wall = min(walls)
+    parse_wall = min(parse_walls)
+    return {
+        "log_dir": str(log_dir),
+        "experiment": manifest["experiment"],
+        "bytes": size,
+        "executions": executions,
+        "jobs": jobs,
+        "wall": wall,
+        "parse_wall": parse_wall,
+        "mb_per_second": size / 1e6 / wall,
+        "samples_per_second": executions / wall,
+        "parse_mb_per_second": size / 1e6 / parse_wall,
+        "parse_samples_per_second": executions / parse_wall,
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Run the parse-log.py scripts end to end on synthetic logs and report their throughput.")
+
+    parser.add_argument("log_dirs", nargs='+', help="Output dirs of generate-logs.py")
+    parser.add_argument("--repeats", help="Runs of each script, the fastest one is reported.", type=int, default=3)
+    parser.add_argument("-j", "--jobs", help="Jobs of the parse-log.py scripts.", type=int, default=1)
+    parser.add_argument("--skip-perf-graphs", help="Do not render the perf graphs, rendering time does not depend on the size of the logs.", action='store_true')
+    parser.add_argument("--min-parse-mbps", help="Exit with an error if the parse phase of a script reads less MB/s.", type=float)
+    parser.add_argument("--min-parse-samples", help="Exit with an error if the parse phase of a script reads less samples/s.", type=float)
+    parser.add_argument("--results", help="JSON-lines file the results are appended to.", type=str)
+    args = parser.parse_args()
+
+    results = [benchmark_logs(Path(log_dir).absolute(), args.repeats, args.jobs, args.skip_perf_graphs) for log_dir in args.log_dirs]
+
+    print("experiment,log dir,MB,samples,wall (s),MB/s,samples/s,parse wall (s),parse MB/s,parse samples/s")
+    for result in results:
+        print("{},{},{:.1f},{},{:.3f},{:.1f},{:.0f},{:.3f},{:.1f},{:.0f}".format(
+            result["experiment"], result["log_dir"], result["bytes"] / 1e6, result["executions"],
+            result["wall"], result["mb_per_second"], result["samples_per_second"],
+            result["parse_wall"], result["parse_mb_per_second"], result["parse_samples_per_second"]))
+
+    if args.results is not None:
+        with open(args.results, 'a') as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+    failed = False
+    for result in results:
+        if args.min_parse_mbps is not None and result["parse_mb_per_second"] < args.min_parse_mbps:
+            print("{}: parse throughput {:.1f} MB/s below {} MB/s".format(result["log_dir"], result["parse_mb_per_second"], args.min_parse_mbps), file=sys.stderr)
+            failed = True
+        if args.min_parse_samples is not None and result["parse_samples_per_second"] < args.min_parse_samples:
+            print("{}: parse throughput {:.0f} samples/s below {} samples/s".format(result["log_dir"], result["parse_samples_per_second"], args.min_parse_samples), file=sys.stderr)
+            failed = True
+    if failed:
+        sys.exit(1)
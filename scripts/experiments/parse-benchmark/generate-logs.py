@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# Write synthetic logs in the format of run.sh, read by the parse-log.py scripts
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from packtools.synthlog import write_polybench_logs, write_packing_logs, parse_size, POLYBENCH_BENCHMARKS
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Write synthetic logs of a polybench-evaluation or packing-selection-evaluation run, with perf counters and aborted executions.")
+
+    parser.add_argument("experiment", choices=["polybench-evaluation", "packing-selection-evaluation"], help="Experiment whose run.sh logs are generated")
+    parser.add_argument("output_dir", help="Output dir of the logs, created if needed")
+    parser.add_argument("--size", help="Total size of the logs, e.g. 500M or 20G.", type=str, default="100M")
+    parser.add_argument("--tiling-method", help="Logs of the polybench-evaluation tiling method.", choices=["AffineTiling", "Polymer"], default="AffineTiling")
+    parser.add_argument("--tile-sizes", help="Tile sizes of the Polymer and packing-selection-evaluation executables.", type=str, default="8,10,12,14,16,18")
+    parser.add_argument("--benchmarks", help="Comma separated polybench-evaluation benchmarks (all by default).", type=str)
+    parser.add_argument("--benchmark", help="packing-selection-evaluation benchmark.", choices=['2mm', 'gemm', 'gemm-blis'], default="gemm")
+    parser.add_argument("--packings", help="Number of individual packings of each packing-selection-evaluation tiling.", type=int, default=4)
+    parser.add_argument("--error-rate", help="Fraction of the executions that abort or crash.", type=float, default=0.001)
+    parser.add_argument("--no-perf", help="Do not write perf stat output.", action='store_true')
+    parser.add_argument("--seed", help="Seed of the generated values.", type=int, default=0)
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    size = parse_size(args.size)
+    tile_sizes = [int(tile) for tile in args.tile_sizes.split(',')]
+
+    if args.experiment == "polybench-evaluation":
+        benchmarks = args.benchmarks.split(',') if args.benchmarks else POLYBENCH_BENCHMARKS
+        manifest = write_polybench_logs(output_dir, size, args.tiling_method, tile_sizes, benchmarks, not args.no_perf, args.error_rate, args.seed)
+    else:
+        manifest = write_packing_logs(output_dir, size, args.benchmark, tile_sizes, args.packings, not args.no_perf, args.error_rate, args.seed)
+
+    for log in manifest["logs"]:
+        print("{}: {} bytes, {} executions, {} failed".format(log["log"], log["bytes"], log["executions"], log["failed"]))
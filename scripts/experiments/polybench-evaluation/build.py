@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# Translates polybench files to MLIR, tiles them, applies packing to them, and compiles them. Also compiles them with Polly.
+# Same steps and output dir as generate-files.sh, every step of every benchmark is reused from the build cache when its
+# inputs, tools, flags and spec.file values did not change. The steps of all benchmarks and tile sizes run in parallel,
+# each as soon as the files it reads are written.
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from packtools.buildcache import ActionResult, run_action, build_cache, add_build_cache_arguments
+from packtools.pipeline import SPEC_VARIABLES, POLYMER_FAILURES, POLYMER_TIMEOUTS, PACKED_MESSAGE, read_shell_files, read_benchmark_list, polymer_tile_sizes, read_tile_sizes, benchmark_stem, polymer_tile_file, polygeist_action, polymer_action, affine_tiling_action, packing_action, kernel_source, lowering_action, polly_action
+from packtools.resultsdb import DATASET_SIZES
+from packtools.scheduler import Task, run_tasks, make_jobserver
+
+CACHE_LEVELS = ("l1", "l2", "l3")
+
+
+def echo_error(output_dir, message):
+    print("\033[0;91m{}\033[0m".format(message))
+    with open(output_dir / "error.txt", 'a') as f:
+        f.write(message + "\n")
+
+
+# task running the action returned by make_action, whose outputs go to
+# output_dir; make_action returns None when the step is skipped (its input
+# was not generated) or the result of a step known to fail
+def step_task(cache, make_action, output_dir, description, name, inputs=(), outputs=()):
+    def run():
+        action = make_action()
+        if action is None:
+            return None
+        if isinstance(action, ActionResult):
+            return output_dir, description, name, action
+        return output_dir, description, name, run_action(action, output_dir, cache)
+    return Task("{}: {}".format(output_dir.name, description), run, inputs, outputs)
+
+
+# prints the steps as they are done, failures of the file name are recorded in
+# the error.txt of the dir of the step
+def report(task, value, error, done, total):
+    if error is not None:
+        print("\033[0;91m[{}/{}] {}: {}\033[0m".format(done, total, task.name, error))
+        return
+    if value is None:
+        return
+    output_dir, description, name, result = value
+    print("[{}/{}] {}: {}{}".format(done, total, output_dir.name, description, " (cached)" if result.cached else ""))
+    if result.error is not None:
+        echo_error(output_dir, "  {}: {}".format(result.error, name))
+
+
+def make_dir(path):
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def source_resource(benchmark):
+    return "source:" + benchmark
+
+
+if __name__ == "__main__":
+
+    scripts_dir = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Translates polybench files to MLIR, tiles them, applies packing to them, and compiles them. Also compiles them with Polly. Same as generate-files.sh with a build cache, in parallel.")
+
+    parser.add_argument("output_dir", help="Output dir of the MLIR files and binaries")
+    parser.add_argument("-D", "--dataset-size", help="Size of dataset.", choices=DATASET_SIZES, type=str, required=True)
+    parser.add_argument("-T", "--tiling-method", help="Tiling method.", choices=["AffineTiling", "Polymer"], type=str, required=True)
+    parser.add_argument("-j", "--jobs", help="Maximum number of compiler invocations run in parallel; run by make -jN, the jobs of make are shared.", type=int, default=os.cpu_count())
+    parser.add_argument("--tile-sizes", help="File with the Polymer tile sizes of each benchmark, a line per benchmark: its name followed by its tile sizes (e.g. \"gemm 8 16 32\"); only these tile sizes are built, instead of the range of the dataset size.", type=str)
+    parser.add_argument("--config-file", help="config.file with the paths of the tools.", type=str, default=str(scripts_dir / "config.file"))
+    parser.add_argument("--spec-file", help="spec.file with the cache sizes.", type=str, default=str(scripts_dir / "experiments" / "spec.file"))
+    add_build_cache_arguments(parser)
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir).resolve()
+    if not output_dir.is_dir():
+        print("ERROR: Output path is empty or isn't a directory.", file=sys.stderr)
+        sys.exit(1)
+    for path, name in ((args.config_file, "config.file"), (args.spec_file, "spec.file")):
+        if not Path(path).is_file():
+            print("Please create {}".format(name), file=sys.stderr)
+            sys.exit(2)
+
+    config = read_shell_files(args.config_file, args.spec_file)
+    for name in SPEC_VARIABLES:
+        if config.get(name, "") == "":
+            print("{} not defined in the spec.file".format(name), file=sys.stderr)
+            sys.exit(1)
+    tools = ["MLIR_CLANG", "MLIR_OPT", "MLIR_TRANSLATE", "CLANG"]
+    tools += ["POLYMER_OPT"] if args.tiling_method == "Polymer" else ["MLIR_PLUS_OPT", "MLIR_PLUS_TRANSLATE"]
+    for name in tools:
+        if not Path(config.get(name, "")).is_file():
+            print("{} not found!".format(name), file=sys.stderr)
+            sys.exit(1)
+    if config.get("CLANG_VERSION", "") not in subprocess.run([config["CLANG"], "--version"], stdout=subprocess.PIPE).stdout.decode():
+        print("Incorrect clang version, please set it up according to the config.file", file=sys.stderr)
+        print("Corrent version is {}".format(config.get("CLANG_VERSION")), file=sys.stderr)
+        sys.exit(1)
+
+    cache = build_cache(args)
+    if cache is not None:
+        # the steps still running after Ctrl-C are not cached, their commands
+        # may have been interrupted without dying from the signal
+        def interrupt(signum, frame):
+            cache.interrupted.set()
+            signal.default_int_handler(signum, frame)
+        signal.signal(signal.SIGINT, interrupt)
+    benchmarks = [benchmark for benchmark in read_benchmark_list(config["POLYBENCH_BENCHMARK_LIST"]) if (Path(config["POLYBENCH"]) / benchmark).is_file()]
+    dataset_size = args.dataset_size
+    polymer = args.tiling_method == "Polymer"
+
+    # polybench sources without kernel body, by benchmark
+    sources = {}
+
+    def remove_body(benchmark):
+        sources[benchmark] = kernel_source(config, benchmark)
+
+    # steps reading a file that was not generated are skipped
+    def file_step(mlir_file, make_action):
+        return lambda: make_action(mlir_file) if mlir_file.is_file() else None
+
+    def polymer_step(mlir_file, tile):
+        if benchmark_stem(mlir_file) in POLYMER_FAILURES:
+            return file_step(mlir_file, lambda mlir_file: ActionResult("Error"))
+        if benchmark_stem(mlir_file) in POLYMER_TIMEOUTS:
+            return file_step(mlir_file, lambda mlir_file: ActionResult("Timeout"))
+        return file_step(mlir_file, lambda mlir_file: polymer_action(config, mlir_file, tile))
+
+    # with Polymer, kernels that were not packed are deleted instead of compiled
+    def lowering_step(benchmark, mlir_file, mlir_opt, mlir_translate, packing_log):
+        def make_action(mlir_file):
+            if packing_log is not None and (not packing_log.is_file() or PACKED_MESSAGE not in packing_log.read_text(errors='replace')):
+                mlir_file.unlink()
+                return None
+            return lowering_action(config, mlir_opt, mlir_translate, benchmark, sources[benchmark], mlir_file, dataset_size)
+        return file_step(mlir_file, make_action)
+
+    def lowering_task(benchmark, mlir_dir, bin_dir, plus=False, packing_log=None):
+        mlir_file = mlir_dir / (benchmark_stem(benchmark) + ".mlir")
+        mlir_opt = config["MLIR_PLUS_OPT"] if plus else config["MLIR_OPT"]
+        mlir_translate = config["MLIR_PLUS_TRANSLATE"] if plus else config["MLIR_TRANSLATE"]
+        tool_names = "mlir-plus-opt mlir-plus-translate clang" if plus else "mlir-opt mlir-translate clang"
+        return step_task(cache, lowering_step(benchmark, mlir_file, mlir_opt, mlir_translate, packing_log), bin_dir,
+                         "Lowering and compiling ({}) {} and {}".format(tool_names, Path(benchmark).name, mlir_file.name), Path(benchmark).name,
+                         inputs=[mlir_file, source_resource(benchmark)], outputs=[bin_dir / (benchmark_stem(benchmark) + ".exe")])
+
+    # Translate to MLIR and remove the kernel bodies --------------------
+    polygeist_out = make_dir(output_dir / "polygeist-mlir")
+    tasks = []
+    for benchmark in benchmarks:
+        mlir_file = polygeist_out / (benchmark_stem(benchmark) + ".mlir")
+        tasks.append(step_task(cache, lambda benchmark=benchmark: polygeist_action(config, benchmark, dataset_size), polygeist_out,
+                               "Polygeist (mlir-clang) " + Path(benchmark).name, Path(benchmark).name, outputs=[mlir_file]))
+        tasks.append(Task("remove-body: " + benchmark, lambda benchmark=benchmark: remove_body(benchmark), outputs=[source_resource(benchmark)]))
+
+    # Tile and pack ----------------------------------------------------
+    # (tiling dir, packing dir, tiling bin dir, packing bin dir, tools of llvm-packing-plus, benchmarks)
+    variants = []
+    if polymer:
+        tile_sizes = read_tile_sizes(args.tile_sizes) if args.tile_sizes is not None else None
+        all_tiles = polymer_tile_sizes(dataset_size) if tile_sizes is None else sorted(set(tile for tiles in tile_sizes.values() for tile in tiles))
+        for tile in all_tiles:
+            tiled = [benchmark for benchmark in benchmarks if tile_sizes is None or tile in tile_sizes.get(benchmark_stem(benchmark), ())]
+            tiling_out = make_dir(output_dir / "polymer-{}-mlir".format(tile))
+            (tiling_out / "tile.sizes").write_text(polymer_tile_file(tile))
+            packing_out = make_dir(output_dir / "polymer-packing-{}-mlir".format(tile))
+            variants.append((tiling_out, packing_out, output_dir / "polymer-{}-bin".format(tile), output_dir / "polymer-packing-{}-bin".format(tile), False, tiled))
+            for benchmark in tiled:
+                name = benchmark_stem(benchmark) + ".mlir"
+                tasks.append(step_task(cache, polymer_step(polygeist_out / name, tile), tiling_out, "Polymer (polymer-opt) " + name, name,
+                                       inputs=[polygeist_out / name], outputs=[tiling_out / name]))
+                tasks.append(step_task(cache, file_step(tiling_out / name, lambda mlir_file: packing_action(config, config["MLIR_OPT"], mlir_file)), packing_out,
+                                       "Packing (mlir-opt) " + name, name, inputs=[tiling_out / name], outputs=[packing_out / name]))
+    else:
+        for suffix, plus, tool in (("", False, "mlir-opt"), ("-plus", True, "mlir-plus-opt")):
+            mlir_opt = config["MLIR_PLUS_OPT"] if plus else config["MLIR_OPT"]
+            for level in CACHE_LEVELS:
+                tiling_out = make_dir(output_dir / "affine-tiling-{}-mlir{}".format(level, suffix))
+                packing_out = make_dir(output_dir / "affine-tiling-{}-packing-mlir{}".format(level, suffix))
+                # the tilings of llvm-packing-plus are only compiled packed
+                tiling_bin = None if plus else output_dir / "affine-tiling-{}-bin".format(level)
+                variants.append((tiling_out, packing_out, tiling_bin, output_dir / "affine-tiling-{}-packing-bin{}".format(level, suffix), plus, benchmarks))
+                tiling = lambda mlir_file, mlir_opt=mlir_opt, cache_size=config[level.upper()]: affine_tiling_action(mlir_opt, mlir_file, cache_size)
+                packing = lambda mlir_file, mlir_opt=mlir_opt: packing_action(config, mlir_opt, mlir_file)
+                for benchmark in benchmarks:
+                    name = benchmark_stem(benchmark) + ".mlir"
+                    tasks.append(step_task(cache, file_step(polygeist_out / name, tiling), tiling_out, "Tiling ({}) {}".format(tool, name), name,
+                                           inputs=[polygeist_out / name], outputs=[tiling_out / name]))
+                    tasks.append(step_task(cache, file_step(tiling_out / name, packing), packing_out, "Packing ({}) {}".format(tool, name), name,
+                                           inputs=[tiling_out / name], outputs=[packing_out / name]))
+
+    # Compile ----------------------------------------------------------
+    polygeist_bin = make_dir(output_dir / "polygeist-bin")
+    for benchmark in benchmarks:
+        tasks.append(lowering_task(benchmark, polygeist_out, polygeist_bin))
+    for tiling_out, packing_out, tiling_bin, packing_bin, plus, tiled in variants:
+        for benchmark in tiled:
+            if tiling_bin is not None:
+                tasks.append(lowering_task(benchmark, tiling_out, make_dir(tiling_bin)))
+            packing_log = packing_out / "logs" / (benchmark_stem(benchmark) + ".log") if polymer else None
+            tasks.append(lowering_task(benchmark, packing_out, make_dir(packing_bin), plus, packing_log))
+    polly_bin = make_dir(output_dir / "polly-bin")
+    for benchmark in benchmarks:
+        tasks.append(step_task(cache, lambda benchmark=benchmark: polly_action(config, benchmark, dataset_size), polly_bin,
+                               "Polly (clang) " + Path(benchmark).name, Path(benchmark).name))
+
+    failed = run_tasks(tasks, args.jobs, report, make_jobserver())
+
+    # Get list of benchmarks and of tilings of benchmarks that were packed by looking at the logs
+    packed_logs = sorted(str(log.relative_to(output_dir)) for log in output_dir.glob("*/logs/*.log") if PACKED_MESSAGE in log.read_text(errors='replace'))
+    packed_benchmarks = " ".join(sorted(set(benchmark_stem(log) for log in packed_logs)))
+    (output_dir / "packed-benchmarks.txt").write_text(packed_benchmarks + "\n")
+    packed_files = "".join("{}/{}.mlir\n".format(Path(log).parts[0], benchmark_stem(log)) for log in packed_logs)
+    (output_dir / "packed-files.txt").write_text(packed_files)
+    if not polymer:
+        # Get list of the tiling files that were not packed
+        (output_dir / "packed-tiling-files.txt").write_text(packed_files.replace("-packing", ""))
+
+    # Delete executable files benchmarks that are not in packed-benchmarks list
+    for executable in output_dir.rglob("*.exe"):
+        if benchmark_stem(executable) not in packed_benchmarks:
+            executable.unlink()
+
+    if cache is not None:
+        print("\nBuild cache: {} steps reused, {} run".format(cache.hits, cache.misses))
+        cache.evict()
+    if failed:
+        sys.exit(1)
@@ -2,99 +2,197 @@
 # Parse output logs of polybench evaluation
 
 import argparse
-import matplotlib.patches as mpatches
-import matplotlib.lines as mlines
-import matplotlib.pyplot as plt
 import sys
+import time
 import numpy as np
-import scipy.stats as st
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
+from functools import partial
 from pathlib import Path
 from math import sqrt
- 
-def parse_log_file(log_file):
-    found_running = False
-    benchmark = ""
-    runtime_map = {}
-
-    # parse polybench results
-    with open(log_file, 'r') as f:
-        for line in f:
-            if "Running" in line:
-                benchmark = line.split()[1].strip('.exe')
-                found_running = True
-                if benchmark not in runtime_map:
-                    runtime_map[benchmark] = []
-                continue
-
-            if found_running:
-                runtime = float(line.strip())*1000
-                runtime_map[benchmark].append(runtime)
-                found_running = False
-                continue
-
-    benchmark_mean_time_map = {}
-    benchmark_confidence_map = {}
-    iterations = -1
-
-    for benchmark,times in sorted(runtime_map.items()):
-        # Check number of iterations of each benchmark
-        if iterations == -1:
-            iterations = len(times)
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from packtools.logparse import RUNNING, SAMPLE, COUNTER
+from packtools.render import figure_spec, FigureRenderer, FORMATS
+from packtools.store import write_store, read_store, is_store, group_rows
+from packtools.cache import log_cache, add_cache_arguments
+from packtools.follow import LogFollower, PerfCsvFollower, save_follow_state, load_follow_state, Welford
+from packtools.records import records_path, variant_tiling, benchmark_name
+from packtools.logstats import read_log_file, log_statistics
+from packtools.perfcsv import log_sidecars, perf_csv_path
+from packtools.profiling import profiler, add_profile_arguments, timed_call, NullProfiler, PROFILE_FILE
+from packtools.resultsdb import ResultsDB, run_metadata, add_results_arguments
+
+# entries of the cache of parsed logs written by read_log_file
+CACHE_TAG = "polybench-evaluation"
+
+# read independent logs, in parallel when more than one job is given, only
+# logs changed since they were cached are parsed again; the parse time of
+# every log is added to profile as "parse <log>"
+# returns a map from log name to its samples
+def read_log_files(log_files, jobs=1, cache=None, profile=NullProfiler()):
+    log_samples = {}
+    if cache is not None:
+        for log_file in log_files:
+            samples = cache.get(log_file, CACHE_TAG, log_sidecars(log_file))
+            if samples is not None:
+                log_samples[log_file.stem] = samples
+    parsed_files = [log_file for log_file in log_files if log_file.stem not in log_samples]
+
+    timed_read_log_file = partial(timed_call, read_log_file)
+    in_workers = jobs > 1 and len(parsed_files) > 1
+    if in_workers:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(timed_read_log_file, parsed_files))
+    else:
+        results = [timed_read_log_file(log_file) for log_file in parsed_files]
+
+    for log_file,(samples, wall, cpu) in zip(parsed_files, results):
+        if in_workers:
+            profile.add_worker_time("parse " + log_file.name, wall, cpu)
         else:
-            assert(iterations == len(times))
-        mean_time = np.mean(times)
-        conf_low, conf_high = st.norm.interval(alpha=0.95, loc=mean_time, scale=st.sem(times))
-        conf = (conf_high - conf_low) / 2
-        benchmark_mean_time_map[benchmark] = mean_time
-        benchmark_confidence_map[benchmark] = conf
-
-    return benchmark_mean_time_map, benchmark_confidence_map, iterations
-
-# parse perf results
-def parse_perf_log_file(log_file):
-    # map from benchmark to perf counter to a list of counter values
-    perf_counter_map = {}
-
-    with open(log_file, 'r') as f:
-        collectPerf = False
-        for line in f:
-            # skip empty lines
-            if line.strip() == '':
-                continue
-
-            if "Running" in line:
-                benchmark = line.split()[1].strip('.exe')
-                if benchmark not in perf_counter_map:
-                    perf_counter_map[benchmark] = {}
-            # start of perf information
-            elif "Performance counter stats" in line:
-                collectPerf = True
-            # end of perf information
-            elif "seconds time elapsed" in line:
-                collectPerf = False
-            elif collectPerf:
-                value = int(line.split()[0].replace(',',''))
-                counter = line.split()[1]
-                if counter not in perf_counter_map[benchmark]:
-                    perf_counter_map[benchmark][counter] = []
-                perf_counter_map[benchmark][counter].append(value)
-
-    perf_mean_map = {}
-    perf_confidence_map = {}
-
-    for benchmark in sorted(perf_counter_map.keys()):
-        for counter in sorted(perf_counter_map[benchmark].keys()):
-            values = perf_counter_map[benchmark][counter]
-            mean_time = np.mean(values)
-            conf_low, conf_high = st.norm.interval(alpha=0.95, loc=mean_time, scale=st.sem(values))
-            conf = (conf_high - conf_low) / 2
-            if benchmark not in perf_mean_map:
-                perf_mean_map[benchmark] = {}
-                perf_confidence_map[benchmark] = {}
-            perf_mean_map[benchmark][counter] = mean_time
-            perf_confidence_map[benchmark][counter] = conf
-
-    return perf_mean_map, perf_confidence_map
+            profile.add_time("parse " + log_file.name, wall, cpu)
+        log_samples[log_file.stem] = samples
+        if cache is not None:
+            cache.put(log_file, samples, CACHE_TAG, log_sidecars(log_file))
+    return {log_file.stem: log_samples[log_file.stem] for log_file in log_files}
+
+# rows of the results database: statistics of the execution times and perf
+# counters of every log and benchmark
+def result_rows(log_samples, parsed_logs):
+    for log_name,(mean_map, confidence_map, _, perf_mean_map, perf_confidence_map) in parsed_logs.items():
+        runtime_map, perf_counter_map = log_samples[log_name]
+        tiling = variant_tiling(log_name)
+        for benchmark,mean in mean_map.items():
+            yield benchmark, log_name, tiling, "runtime", mean, None, confidence_map[benchmark], len(runtime_map[benchmark])
+        for benchmark,counters in perf_mean_map.items():
+            for counter,mean in counters.items():
+                yield benchmark, log_name, tiling, counter, mean, None, perf_confidence_map[benchmark][counter], len(perf_counter_map[benchmark][counter])
+
+# fill missing samples with nan so all columns of the store have the same length
+def pad_samples(values, rows):
+    padded = np.full(rows, np.nan)
+    padded[:len(values)] = values
+    return padded
+
+# write the samples of all logs to a columnar store, one row per execution
+def write_samples_store(samples_path, log_samples):
+    log_names = sorted(log_samples.keys())
+    benchmarks = sorted({benchmark for runtime_map,_ in log_samples.values() for benchmark in runtime_map})
+    counters = sorted({counter for _,perf_counter_map in log_samples.values() for counter_map in perf_counter_map.values() for counter in counter_map})
+
+    columns = {"variant": [], "benchmark": [], "tiling": [], "iteration": [], "runtime": []}
+    for counter in counters:
+        columns[counter] = []
+
+    for variant,log_name in enumerate(log_names):
+        runtime_map, perf_counter_map = log_samples[log_name]
+        for benchmark in sorted(runtime_map.keys()):
+            times = runtime_map[benchmark]
+            counter_map = perf_counter_map[benchmark]
+            rows = max([len(times)] + [len(values) for values in counter_map.values()])
+            columns["variant"].append(np.full(rows, variant, dtype=np.int32))
+            columns["benchmark"].append(np.full(rows, benchmarks.index(benchmark), dtype=np.int32))
+            columns["tiling"].append(np.full(rows, variant_tiling(log_name), dtype=np.int32))
+            columns["iteration"].append(np.arange(rows, dtype=np.int32))
+            columns["runtime"].append(pad_samples(times, rows))
+            for counter in counters:
+                columns[counter].append(pad_samples(counter_map.get(counter, []), rows))
+
+    for name in columns:
+        columns[name] = np.concatenate(columns[name]) if columns[name] else np.array([])
+    write_store(samples_path, columns, {"variant": log_names, "benchmark": benchmarks})
+
+# read the samples of all logs from a columnar store written by write_samples_store
+def read_samples_store(samples_path):
+    columns, labels = read_store(samples_path)
+    counters = [name for name in columns if name not in ("variant", "benchmark", "tiling", "iteration", "runtime")]
+
+    log_samples = {}
+    for (variant, benchmark), start, end in group_rows(columns["variant"], columns["benchmark"]):
+        log_name = labels["variant"][variant]
+        benchmark = labels["benchmark"][benchmark]
+        if log_name not in log_samples:
+            log_samples[log_name] = ({}, {})
+        runtime_map, perf_counter_map = log_samples[log_name]
+
+        times = columns["runtime"][start:end]
+        runtime_map[benchmark] = times[~np.isnan(times)]
+        perf_counter_map[benchmark] = {}
+        for counter in counters:
+            values = columns[counter][start:end]
+            values = values[~np.isnan(values)]
+            if len(values) > 0:
+                perf_counter_map[benchmark][counter] = values
+
+    return log_samples
+
+# logs written by run.sh for the binaries of a tiling method
+def tiling_log_files(input_dir, tiling_method):
+    log_files = [input_dir / "polly.log", input_dir / "polygeist.log"]
+    if tiling_method == "AffineTiling":
+        log_files += [input_dir / "affine-tiling-{}.log".format(level) for level in ('l1', 'l2', 'l3')]
+        log_files += [input_dir / "affine-tiling-{}-packing.log".format(level) for level in ('l1', 'l2', 'l3')]
+    elif tiling_method == "Polymer":
+        log_files += sorted(input_dir.glob("polymer-[0-9]*.log"))
+        log_files += sorted(input_dir.glob("polymer-packing-[0-9]*.log"))
+    return log_files
+
+# write the running statistics of every (log, benchmark, runtime or counter)
+def write_follow_summary(summary_path, statistics):
+    tmp_path = summary_path.with_name(summary_path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write("log,benchmark,metric,iterations,mean,stddev,95% confidence interval,relative confidence interval\n")
+        for key in sorted(statistics.keys()):
+            stat = statistics[key]
+            conf = stat.conf
+            f.write(",".join(key) + "," + ",".join(str(value) for value in (stat.count, stat.mean, stat.stddev, conf, conf / stat.mean if stat.mean != 0 else float('nan'))) + "\n")
+    tmp_path.replace(summary_path)
+
+# parse the logs while run.sh is appending to them, refreshing the summary
+# every interval seconds until interrupted; reading resumes where it stopped
+# when the state file of a previous run is found in the output dir
+def follow_logs(input_dir, output_dir, tiling_method, interval):
+    state_path = output_dir / "follow-state.json"
+    summary_path = output_dir / "summary.csv"
+    followers, statistics = load_follow_state(state_path) if state_path.exists() else ({}, {})
+
+    def update(log_name, benchmark, metric, value):
+        key = (log_name, benchmark, metric)
+        if key not in statistics:
+            statistics[key] = Welford()
+        statistics[key].update(value)
+
+    try:
+        while True:
+            # new polymer logs appear while the sweep goes on
+            for log_file in tiling_log_files(input_dir, tiling_method):
+                if log_file not in followers:
+                    followers[log_file] = LogFollower(log_file)
+                follower = followers[log_file]
+                benchmark = benchmark_name(follower.executable) if follower.executable is not None else ""
+                for token, key, value in follower.poll():
+                    if token == RUNNING:
+                        benchmark = benchmark_name(key)
+                    elif token == SAMPLE:
+                        update(log_file.stem, benchmark, "runtime", value*1000)
+                    elif token == COUNTER:
+                        update(log_file.stem, benchmark, key, value)
+                # the runner writes the counters to the perf CSV file of the log
+                csv_file = perf_csv_path(log_file)
+                if csv_file not in followers:
+                    followers[csv_file] = PerfCsvFollower(csv_file)
+                for executable, event, value in followers[csv_file].poll():
+                    update(log_file.stem, benchmark_name(executable), event, value)
+
+            write_follow_summary(summary_path, statistics)
+            save_follow_state(state_path, followers, statistics)
+            runtimes = [stat for key,stat in statistics.items() if key[2] == "runtime" and stat.count > 1]
+            if len(runtimes) > 0:
+                print("{}: {} benchmarks, widest relative confidence interval {:.2%}".format(time.strftime("%H:%M:%S"), len(runtimes), max(stat.conf / stat.mean for stat in runtimes)), flush=True)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
 
@@ -104,12 +202,25 @@ if __name__ == "__main__":
     parser.add_argument("output_dir", help="Output dir")
     parser.add_argument("tiling_method", help="Tiling method used in generate-files.sh.", type=str, choices=['AffineTiling', 'Polymer'])
     parser.add_argument("--skip-perf-graphs", help="Do not generate perf graphs.", action='store_true')
+    parser.add_argument("-j", "--jobs", help="Number of logs parsed and graphs rendered in parallel.", type=int, default=1)
+    parser.add_argument("--format", help="Format of the graphs.", type=str, choices=FORMATS, default='png')
+    parser.add_argument("--samples", help="Columnar store of the parsed samples. Written after parsing the logs; when it already exists, it is read instead of the logs.", type=str)
+    parser.add_argument("--follow", help="Follow the logs while run.sh is running and write the running statistics to summary.csv in the output dir, without graphs.", action='store_true')
+    parser.add_argument("--interval", help="Seconds between two refreshes of summary.csv with --follow.", type=float, default=30)
+    add_cache_arguments(parser)
+    add_profile_arguments(parser)
+    add_results_arguments(parser)
     args = parser.parse_args()
 
     input_dir = Path(args.input_dir)
     output_dir = Path(args.output_dir)
     tiling_method = args.tiling_method
     skip_perf_graphs = args.skip_perf_graphs
+    jobs = args.jobs
+    graph_format = args.format
+    samples_path = Path(args.samples).absolute() if args.samples else None
+    cache = log_cache(args)
+    profile = profiler(args)
 
     if not input_dir.exists() or not input_dir.is_dir():
         print("Input file is not a file of does not exist", file=sys.stderr)
@@ -122,6 +233,10 @@ if __name__ == "__main__":
     input_dir = input_dir.absolute()
     output_dir = output_dir.absolute()
 
+    if args.follow:
+        follow_logs(input_dir, output_dir, tiling_method, args.interval)
+        sys.exit(0)
+
     # from matplotlib import rc
     # rc('font',**{'family':'serif','serif':['Libertine']})
     # rc('text', usetex=True)
@@ -132,6 +247,9 @@ if __name__ == "__main__":
     #     r"\usepackage{libertine}",
     #     ])
     #   )
+    # matplotlib is only loaded when graphs are drawn, not with --follow
+    import matplotlib.patches as mpatches
+    import matplotlib.pyplot as plt
     plt.style.use('seaborn-whitegrid')
     plt.rcParams.update({
         "font.size": 16,
@@ -140,27 +258,58 @@ if __name__ == "__main__":
     })
     marker=['o', 'v', '^', '<', '>', 's', 'p', '*', 'X']
 
+    # graphs are rendered by workers while the next ones are being built
+    renderer = FigureRenderer(jobs, graph_format, profile)
+
+    profile.start("parse")
+
+    # Logs used by the tiling method, their JSON-lines records are read instead when present
+    log_files = [records_path(log_file) if records_path(log_file).exists() else log_file for log_file in tiling_log_files(input_dir, tiling_method)]
+
+    # Parse the logs only once: samples are read from the store when it exists
+    if samples_path is not None and is_store(samples_path):
+        log_samples = read_samples_store(samples_path)
+    else:
+        log_samples = read_log_files(log_files, jobs, cache, profile)
+        if samples_path is not None:
+            write_samples_store(samples_path, log_samples)
+
+    profile.start("stats")
+    # map from log name to the statistics of its execution times and perf counters
+    parsed_logs = {log_name: log_statistics(*samples) for log_name,samples in log_samples.items()}
+
+    if args.results_db is not None:
+        profile.start("results db")
+        with ResultsDB(args.results_db) as results_db:
+            results_db.add_run(run_metadata("polybench-evaluation", input_dir, args, tiling_method), result_rows(log_samples, parsed_logs))
+
     if tiling_method == "AffineTiling":
-    
-        polly_log = input_dir / "polly.log"
-        polygeist_log = input_dir / "polygeist.log"
 
-        polly_mean, polly_conf, _ = parse_log_file(polly_log)
-        polygeist_mean, polygeist_conf, _ = parse_log_file(polygeist_log)
+        polly_mean, polly_conf, _, polly_perf_mean, polly_perf_conf = parsed_logs["polly"]
+        polygeist_mean, polygeist_conf, _, polygeist_perf_mean, polygeist_perf_conf = parsed_logs["polygeist"]
 
         affine_tiling_mean_list = {}
         affine_tiling_conf_list = {}
         affine_tiling_packing_mean_list = {}
         affine_tiling_packing_conf_list = {}
+        affine_tiling_perf_mean_list = {}
+        affine_tiling_perf_conf_list = {}
+        affine_tiling_packing_perf_mean_list = {}
+        affine_tiling_packing_perf_conf_list = {}
         for level in ('l1', 'l2', 'l3'):
-            affine_tiling_mean, affine_tiling_conf, _ = parse_log_file(input_dir / "affine-tiling-{}.log".format(level))
+            affine_tiling_mean, affine_tiling_conf, _, affine_tiling_perf_mean, affine_tiling_perf_conf = parsed_logs["affine-tiling-{}".format(level)]
             affine_tiling_mean_list[level] = affine_tiling_mean
             affine_tiling_conf_list[level] = affine_tiling_conf
+            affine_tiling_perf_mean_list[level] = affine_tiling_perf_mean
+            affine_tiling_perf_conf_list[level] = affine_tiling_perf_conf
 
-            affine_tiling_packing_mean, affine_tiling_packing_conf, _ = parse_log_file(input_dir / "affine-tiling-{}-packing.log".format(level))
+            affine_tiling_packing_mean, affine_tiling_packing_conf, _, affine_tiling_packing_perf_mean, affine_tiling_packing_perf_conf = parsed_logs["affine-tiling-{}-packing".format(level)]
             affine_tiling_packing_mean_list[level] = affine_tiling_packing_mean
             affine_tiling_packing_conf_list[level] = affine_tiling_packing_conf
+            affine_tiling_packing_perf_mean_list[level] = affine_tiling_packing_perf_mean
+            affine_tiling_packing_perf_conf_list[level] = affine_tiling_packing_perf_conf
 
+        profile.start("time graphs")
         # Build bar graph for execution time ------------------------------------------------------
         for benchmark in polly_mean.keys():
             y_time_affine_tiling = []
@@ -182,13 +331,13 @@ if __name__ == "__main__":
             x = np.array(x)  # the label locations
             width = 0.2  # the width of the bars
 
-            fig, ax = plt.subplots()
-            rects1 = ax.bar(x - width/2, y_time_affine_tiling, width, yerr=y_conf_affine_tiling, color='#b2abd2', edgecolor='black', linewidth=0.5, alpha=0.8, label='Affine')
-            rects2 = ax.bar(x + width/2, y_time_affine_tiling_packing, width, yerr=y_conf_affine_tiling_packing, color='#e66101', edgecolor='black', linewidth=0.25, alpha=0.8, label='Affine + GPAT')
+            spec, ax = figure_spec("time")
+            ax.bar(x - width/2, y_time_affine_tiling, width, yerr=y_conf_affine_tiling, color='#b2abd2', edgecolor='black', linewidth=0.5, alpha=0.8, label='Affine')
+            ax.bar(x + width/2, y_time_affine_tiling_packing, width, yerr=y_conf_affine_tiling_packing, color='#e66101', edgecolor='black', linewidth=0.25, alpha=0.8, label='Affine + GPAT')
 
-            plt.axhline(y=polly_mean[benchmark], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
+            ax.axhline(y=polly_mean[benchmark], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
             ax.fill_between([-0.5, 2.5], polly_mean[benchmark]+polly_conf[benchmark], polly_mean[benchmark]-polly_conf[benchmark], alpha=0.3, color='#000000')
-            plt.axhline(y=polygeist_mean[benchmark], color='black', linestyle='--', alpha=0.8, linewidth=1, label='Clang-O3')
+            ax.axhline(y=polygeist_mean[benchmark], color='black', linestyle='--', alpha=0.8, linewidth=1, label='Clang-O3')
             ax.fill_between([-0.5, 2.5], polygeist_mean[benchmark]+polygeist_conf[benchmark], polygeist_mean[benchmark]-polygeist_conf[benchmark], alpha=0.3, color='#000000')
 
             # Set axes labels and limits
@@ -201,14 +350,11 @@ if __name__ == "__main__":
             ax.set_xlabel('Tiling target cache level')
             # Save the figure and show
             graph_path = output_dir / (benchmark + '-time.png')
-            legend = plt.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-            frame = legend.get_frame()
-            frame.set_facecolor('white')
-            frame.set_edgecolor('black')
-            plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-            plt.close(fig)
+            spec.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+            renderer.submit(spec, graph_path)
         # -----------------------------------------------------------------------------------------
 
+        profile.start("speedup graphs")
         # Build bar graph for speedup -------------------------------------------------------------
         for benchmark in polly_mean.keys():
             y_time_affine_tiling = []
@@ -230,11 +376,11 @@ if __name__ == "__main__":
             x = np.array(x)  # the label locations
             width = 0.2  # the width of the bars
 
-            fig, ax = plt.subplots()
-            rects1 = ax.bar(x - width/2, y_time_affine_tiling, width, color='#b2abd2', edgecolor='black', linewidth=0.5, alpha=0.8, label='Affine')
-            rects2 = ax.bar(x + width/2, y_time_affine_tiling_packing, width, color='#e66101', edgecolor='black', linewidth=0.25, alpha=0.8, label='Affine + GPAT')
+            spec, ax = figure_spec("speedup")
+            ax.bar(x - width/2, y_time_affine_tiling, width, color='#b2abd2', edgecolor='black', linewidth=0.5, alpha=0.8, label='Affine')
+            ax.bar(x + width/2, y_time_affine_tiling_packing, width, color='#e66101', edgecolor='black', linewidth=0.25, alpha=0.8, label='Affine + GPAT')
 
-            plt.axhline(y=polygeist_mean[benchmark]/polly_mean[benchmark], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
+            ax.axhline(y=polygeist_mean[benchmark]/polly_mean[benchmark], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
             ax.axhline(y=1, color='black', linestyle='--', alpha=0.5, linewidth=1)
 
             # Set axes labels and limits
@@ -247,16 +393,13 @@ if __name__ == "__main__":
             ax.set_xlabel('Tiling target cache level')
             # Save the figure and show
             graph_path = output_dir / (benchmark + '-speedup.png')
-            legend = plt.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-            frame = legend.get_frame()
-            frame.set_facecolor('white')
-            frame.set_edgecolor('black')
-            plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-            plt.close(fig)
+            spec.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+            renderer.submit(spec, graph_path)
         # -----------------------------------------------------------------------------------------
 
+        profile.start("paper graph")
         # Build combined bar graph for speedup for paper ------------
-        fig, ax = plt.subplots()
+        spec, ax = figure_spec()
         base_x = 1
         x_positions = []
         x_ticks = []
@@ -337,10 +480,7 @@ if __name__ == "__main__":
         affine_packing_patch = mpatches.Patch(facecolor='#e66101', label='Affine + GPAT', alpha=1, edgecolor="black", linewidth=0.5)
         polly_patch = mpatches.Patch(facecolor='#000000', label='Polly', alpha=1, edgecolor="black", linewidth=0.5)
 
-        legend = plt.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), handles=[affine_patch, affine_packing_patch, polly_patch], handletextpad=0.3, handlelength=1.0)
-        frame = legend.get_frame()
-        frame.set_facecolor('white')
-        frame.set_edgecolor('black')
+        spec.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), handles=[affine_patch, affine_packing_patch, polly_patch], handletextpad=0.3, handlelength=1.0)
 
         # ax.text((x_positions[0]+x_positions[4]+3*width)/2, -0.5, "{\\em \\rmfamily 2mm}", rotation=45, va="top", ha="right")
         # ax.text((x_positions[5]+x_positions[9]+3*width)/2, -0.5, "{\\em \\rmfamily 3mm}", rotation=45, va="top", ha="right")
@@ -356,8 +496,7 @@ if __name__ == "__main__":
         ax.text((x_positions[20]+x_positions[22]+3*width)/2, -0.5, "gramschmidt", rotation=45, va="top", ha="right")
         ax.text((x_positions[23]+x_positions[25]+3*width)/2, -0.5, "trmm", rotation=45, va="top", ha="right")
         
-        plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-        plt.close(fig)
+        renderer.submit(spec, graph_path)
         # -----------------------------------------------------------------------------------------
     
     elif tiling_method == "Polymer":
@@ -367,34 +506,41 @@ if __name__ == "__main__":
             "legend.fontsize": 16,
         })
 
-        polly_log = input_dir / "polly.log"
-        polygeist_log = input_dir / "polygeist.log"
-        polymer_logs = input_dir.glob("polymer-[0-9]*.log")
-        polymer_packing_logs = input_dir.glob("polymer-packing-[0-9]*.log")
+        polymer_logs = [log_name for log_name in parsed_logs if fnmatch(log_name, "polymer-[0-9]*")]
+        polymer_packing_logs = [log_name for log_name in parsed_logs if fnmatch(log_name, "polymer-packing-[0-9]*")]
 
-        polly_mean, polly_conf, _ = parse_log_file(polly_log)
-        polygeist_mean, polygeist_conf, _ = parse_log_file(polygeist_log)
+        polly_mean, polly_conf, _, polly_perf_mean, polly_perf_conf = parsed_logs["polly"]
+        polygeist_mean, polygeist_conf, _, polygeist_perf_mean, polygeist_perf_conf = parsed_logs["polygeist"]
 
         tiling_polymer_mean_map = {}
         tiling_polymer_conf_map = {}
-        for log_file in polymer_logs:
-            tiling_size = int(log_file.name.strip('.log').split('-')[1])
-            polymer_mean, polymer_conf, _ = parse_log_file(log_file)
+        tiling_polymer_perf_mean_map = {}
+        tiling_polymer_perf_conf_map = {}
+        for log_name in polymer_logs:
+            tiling_size = int(log_name.split('-')[1])
+            polymer_mean, polymer_conf, _, polymer_perf_mean, polymer_perf_conf = parsed_logs[log_name]
             tiling_polymer_mean_map[tiling_size] = polymer_mean
             tiling_polymer_conf_map[tiling_size] = polymer_conf
+            tiling_polymer_perf_mean_map[tiling_size] = polymer_perf_mean
+            tiling_polymer_perf_conf_map[tiling_size] = polymer_perf_conf
 
         tiling_polymer_packing_mean_map = {}
         tiling_polymer_packing_conf_map = {}
-        for log_file in polymer_packing_logs:
-            tiling_size = int(log_file.name.strip('.log').split('-')[2])
-            polymer_packing_mean, polymer_packing_conf, _ = parse_log_file(log_file)
+        tiling_polymer_packing_perf_mean_map = {}
+        tiling_polymer_packing_perf_conf_map = {}
+        for log_name in polymer_packing_logs:
+            tiling_size = int(log_name.split('-')[2])
+            polymer_packing_mean, polymer_packing_conf, _, polymer_packing_perf_mean, polymer_packing_perf_conf = parsed_logs[log_name]
             tiling_polymer_packing_mean_map[tiling_size] = polymer_packing_mean
             tiling_polymer_packing_conf_map[tiling_size] = polymer_packing_conf
+            tiling_polymer_packing_perf_mean_map[tiling_size] = polymer_packing_perf_mean
+            tiling_polymer_packing_perf_conf_map[tiling_size] = polymer_packing_perf_conf
 
         x_tilings = []
         for tiling in sorted(tiling_polymer_mean_map.keys()):
             x_tilings.append(tiling)
 
+        profile.start("time graphs")
         # Build time graphs ---------------------------------------------------------------------------
         for benchmark in polly_mean.keys():
             y_time_polymer = []
@@ -412,10 +558,10 @@ if __name__ == "__main__":
                     y_conf_polymer_packing.append(tiling_polymer_packing_conf_map[tiling][benchmark])
                     x_tilings_polymer_packing.append(tiling)
 
-            fig, ax = plt.subplots()
-            plt.axhline(y=polly_mean[benchmark], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
+            spec, ax = figure_spec("time")
+            ax.axhline(y=polly_mean[benchmark], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
             ax.fill_between(x_tilings, polly_mean[benchmark]+polly_conf[benchmark], polly_mean[benchmark]-polly_conf[benchmark], alpha=0.3, color='#000000')
-            plt.axhline(y=polygeist_mean[benchmark], color='black', linestyle='--', alpha=0.8, linewidth=1, label='Clang-O3')
+            ax.axhline(y=polygeist_mean[benchmark], color='black', linestyle='--', alpha=0.8, linewidth=1, label='Clang-O3')
             ax.fill_between(x_tilings, polygeist_mean[benchmark]+polygeist_conf[benchmark], polygeist_mean[benchmark]-polygeist_conf[benchmark], alpha=0.3, color='#000000')
             ax.errorbar(x_tilings, y_time_polymer, yerr=y_conf_polymer, label="Polymer", markersize=sqrt(18), markerfacecolor='#5e3c99', markeredgecolor='black', markeredgewidth=0.5, ecolor='black', elinewidth=0.5, fmt='o', alpha=0.8)
             ax.errorbar(x_tilings_polymer_packing, y_time_polymer_packing, yerr=y_conf_polymer_packing, label="Polymer + GPAT", markersize=sqrt(18), markerfacecolor='#e66101', markeredgecolor='black', markeredgewidth=0.5, ecolor='black', elinewidth=0.5, fmt='s', alpha=0.8)
@@ -429,14 +575,11 @@ if __name__ == "__main__":
             ax.set_xlabel('Tiling size (all dimensions)')
             # Save the figure and show
             graph_path = output_dir / (benchmark + '-time.png')
-            legend = plt.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-            frame = legend.get_frame()
-            frame.set_facecolor('white')
-            frame.set_edgecolor('black')
-            plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-            plt.close(fig)
+            spec.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+            renderer.submit(spec, graph_path)
         # ---------------------------------------------------------------------------------------------
 
+        profile.start("speedup graphs")
         # Build speedup graphs ------------------------------------------------------------------------
         for benchmark in polly_mean.keys():
             y_time_polymer = []
@@ -452,9 +595,9 @@ if __name__ == "__main__":
                     y_time_polymer_packing.append(polygeist_mean[benchmark]/tiling_polymer_packing_mean_map[tiling][benchmark])
                     x_tilings_polymer_packing.append(tiling)
 
-            fig, ax = plt.subplots()
-            plt.axhline(y=polygeist_mean[benchmark]/polly_mean[benchmark], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
-            plt.axhline(y=1, color='black', linestyle='--', alpha=1, linewidth=1)
+            spec, ax = figure_spec("speedup")
+            ax.axhline(y=polygeist_mean[benchmark]/polly_mean[benchmark], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
+            ax.axhline(y=1, color='black', linestyle='--', alpha=1, linewidth=1)
             ax.errorbar(x_tilings, y_time_polymer, label="Polymer", markersize=sqrt(18), markerfacecolor='#5e3c99', markeredgecolor='black', markeredgewidth=0.5, ecolor='black', elinewidth=0.5, fmt='o', alpha=1)
             ax.errorbar(x_tilings_polymer_packing, y_time_polymer_packing, label="Polymer + GPAT", markersize=sqrt(18), markerfacecolor='#e66101', markeredgecolor='black', markeredgewidth=0.5, ecolor='black', elinewidth=0.5, fmt='s', alpha=0.8)
             # Set axes labels and limits
@@ -466,32 +609,15 @@ if __name__ == "__main__":
             ax.set_xlabel('Tiling size (all dimensions)')
             # Save the figure and show
             graph_path = output_dir / (benchmark + '-speedup.png')
-            legend = plt.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-            frame = legend.get_frame()
-            frame.set_facecolor('white')
-            frame.set_edgecolor('black')
-            plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-            plt.close(fig)
+            spec.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+            renderer.submit(spec, graph_path)
         # ---------------------------------------------------------------------------------------------
 
-    # Get perf counters that were measured
+    profile.start("counter discovery")
+    # Get perf counters that were measured (already parsed with polly.log)
     perf_counters = set()
-    # get perf counters that were measured
-    with open(input_dir / "polly.log", 'r') as f:
-        collectPerf = False
-        for line in f:
-            # skip emtpy lines
-            if line.strip() == '':
-                continue
-
-            # start of perf information
-            if "Performance counter stats" in line:
-                collectPerf = True
-            # end of perf information
-            elif "seconds time elapsed" in line:
-                break
-            elif collectPerf:
-                perf_counters.add(line.split()[1])
+    for benchmark_counters in polly_perf_mean.values():
+        perf_counters.update(benchmark_counters.keys())
 
     perf_found = True
     if skip_perf_graphs:
@@ -510,25 +636,7 @@ if __name__ == "__main__":
         perf_relative_outputs_dir.mkdir(exist_ok=True)
 
         if tiling_method == "AffineTiling":
-            polly_log = input_dir / "polly.log"
-            polygeist_log = input_dir / "polygeist.log"
-
-            polly_perf_mean, polly_perf_conf = parse_perf_log_file(polly_log)
-            polygeist_perf_mean, polygeist_perf_conf = parse_perf_log_file(polygeist_log)
-
-            affine_tiling_perf_mean_list = {}
-            affine_tiling_perf_conf_list = {}
-            affine_tiling_packing_perf_mean_list = {}
-            affine_tiling_packing_perf_conf_list = {}
-            for level in ('l1', 'l2', 'l3'):
-                affine_tiling_mean, affine_tiling_conf = parse_perf_log_file(input_dir / "affine-tiling-{}.log".format(level))
-                affine_tiling_perf_mean_list[level] = affine_tiling_mean
-                affine_tiling_perf_conf_list[level] = affine_tiling_conf
-
-                affine_tiling_packing_mean, affine_tiling_packing_conf = parse_perf_log_file(input_dir / "affine-tiling-{}-packing.log".format(level))
-                affine_tiling_packing_perf_mean_list[level] = affine_tiling_packing_mean
-                affine_tiling_packing_perf_conf_list[level] = affine_tiling_packing_conf
-
+            profile.start("perf graphs")
             # Build bar graph for execution time ------------------------------------------------------
             for benchmark in polly_perf_mean.keys():
                 for counter in perf_counters:
@@ -551,13 +659,13 @@ if __name__ == "__main__":
                     x = np.array(x)  # the label locations
                     width = 0.2  # the width of the bars
 
-                    fig, ax = plt.subplots()
-                    rects1 = ax.bar(x - width/2, y_time_affine_tiling, width, yerr=y_conf_affine_tiling, color='#b2abd2', edgecolor='black', linewidth=0.5, alpha=0.8, label='Affine')
-                    rects2 = ax.bar(x + width/2, y_time_affine_tiling_packing, width, yerr=y_conf_affine_tiling_packing, color='#e66101', edgecolor='black', linewidth=0.25, alpha=0.8, label='Affine + GPAT')
+                    spec, ax = figure_spec("perf")
+                    ax.bar(x - width/2, y_time_affine_tiling, width, yerr=y_conf_affine_tiling, color='#b2abd2', edgecolor='black', linewidth=0.5, alpha=0.8, label='Affine')
+                    ax.bar(x + width/2, y_time_affine_tiling_packing, width, yerr=y_conf_affine_tiling_packing, color='#e66101', edgecolor='black', linewidth=0.25, alpha=0.8, label='Affine + GPAT')
 
-                    plt.axhline(y=polly_perf_mean[benchmark][counter], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
+                    ax.axhline(y=polly_perf_mean[benchmark][counter], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
                     ax.fill_between([-0.5, 2.5], polly_perf_mean[benchmark][counter]+polly_perf_conf[benchmark][counter], polly_perf_mean[benchmark][counter]-polly_perf_conf[benchmark][counter], alpha=0.3, color='#000000')
-                    plt.axhline(y=polygeist_perf_mean[benchmark][counter], color='black', linestyle='--', alpha=0.8, linewidth=1, label='Clang-O3')
+                    ax.axhline(y=polygeist_perf_mean[benchmark][counter], color='black', linestyle='--', alpha=0.8, linewidth=1, label='Clang-O3')
                     ax.fill_between([-0.5, 2.5], polygeist_perf_mean[benchmark][counter]+polygeist_perf_conf[benchmark][counter], polygeist_perf_mean[benchmark][counter]-polygeist_perf_conf[benchmark][counter], alpha=0.3, color='#000000')
 
                     # Set axes labels and limits
@@ -570,14 +678,11 @@ if __name__ == "__main__":
                     ax.set_xlabel('Tiling target cache level')
                     # Save the figure and show
                     graph_path = perf_outputs_dir / (benchmark + '-' + counter + '.png')
-                    legend = plt.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-                    frame = legend.get_frame()
-                    frame.set_facecolor('white')
-                    frame.set_edgecolor('black')
-                    plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-                    plt.close(fig)
+                    spec.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+                    renderer.submit(spec, graph_path)
             # -----------------------------------------------------------------------------------------
 
+            profile.start("perf relative graphs")
             # Build bar graph for speedup -------------------------------------------------------------
             for benchmark in polly_perf_mean.keys():
                 for counter in perf_counters:
@@ -598,11 +703,11 @@ if __name__ == "__main__":
                     x = np.array(x)  # the label locations
                     width = 0.2  # the width of the bars
 
-                    fig, ax = plt.subplots()
-                    rects1 = ax.bar(x - width/2, y_time_affine_tiling, width, color='#b2abd2', edgecolor='black', linewidth=0.5, alpha=0.8, label='Affine')
-                    rects2 = ax.bar(x + width/2, y_time_affine_tiling_packing, width, color='#e66101', edgecolor='black', linewidth=0.25, alpha=0.8, label='Affine + GPAT')
+                    spec, ax = figure_spec("perf-relative")
+                    ax.bar(x - width/2, y_time_affine_tiling, width, color='#b2abd2', edgecolor='black', linewidth=0.5, alpha=0.8, label='Affine')
+                    ax.bar(x + width/2, y_time_affine_tiling_packing, width, color='#e66101', edgecolor='black', linewidth=0.25, alpha=0.8, label='Affine + GPAT')
 
-                    plt.axhline(y=polygeist_perf_mean[benchmark][counter]/polly_perf_mean[benchmark][counter], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
+                    ax.axhline(y=polygeist_perf_mean[benchmark][counter]/polly_perf_mean[benchmark][counter], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
                     ax.axhline(y=1, color='black', linestyle='--', alpha=0.5, linewidth=1)
 
                     # Set axes labels and limits
@@ -615,48 +720,16 @@ if __name__ == "__main__":
                     ax.set_xlabel('Tiling target cache level')
                     # Save the figure and show
                     graph_path = perf_relative_outputs_dir / (benchmark + '-' + counter + '.png')
-                    legend = plt.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-                    frame = legend.get_frame()
-                    frame.set_facecolor('white')
-                    frame.set_edgecolor('black')
-                    plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-                    plt.close(fig)
+                    spec.legend(ncol=3, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+                    renderer.submit(spec, graph_path)
             # -----------------------------------------------------------------------------------------
 
         elif tiling_method == "Polymer":
-            plt.rcParams.update({
-                "font.size": 18,
-                "legend.fontsize": 16,
-            })
-
-            polly_log = input_dir / "polly.log"
-            polygeist_log = input_dir / "polygeist.log"
-            polymer_logs = input_dir.glob("polymer-[0-9]*.log")
-            polymer_packing_logs = input_dir.glob("polymer-packing-[0-9]*.log")
-
-            polly_perf_mean, polly_perf_conf = parse_perf_log_file(polly_log)
-            polygeist_perf_mean, polygeist_perf_conf = parse_perf_log_file(polygeist_log)
-
-            tiling_polymer_perf_mean_map = {}
-            tiling_polymer_perf_conf_map = {}
-            for log_file in polymer_logs:
-                tiling_size = int(log_file.name.strip('.log').split('-')[1])
-                polymer_perf_mean, polymer_perf_conf = parse_perf_log_file(log_file)
-                tiling_polymer_perf_mean_map[tiling_size] = polymer_perf_mean
-                tiling_polymer_perf_conf_map[tiling_size] = polymer_perf_conf
-
-            tiling_polymer_packing_perf_mean_map = {}
-            tiling_polymer_packing_perf_conf_map = {}
-            for log_file in polymer_packing_logs:
-                tiling_size = int(log_file.name.strip('.log').split('-')[2])
-                polymer_packing_perf_mean, polymer_packing_perf_conf = parse_perf_log_file(log_file)
-                tiling_polymer_packing_perf_mean_map[tiling_size] = polymer_packing_perf_mean
-                tiling_polymer_packing_perf_conf_map[tiling_size] = polymer_packing_perf_conf
-
             x_tilings = []
             for tiling in sorted(tiling_polymer_perf_mean_map.keys()):
                 x_tilings.append(tiling)
 
+            profile.start("perf graphs")
             # Build perf graphs ---------------------------------------------------------------------------
             for benchmark in polly_mean.keys():
                 for counter in perf_counters:
@@ -675,10 +748,10 @@ if __name__ == "__main__":
                             y_conf_polymer_packing.append(tiling_polymer_packing_perf_conf_map[tiling][benchmark][counter])
                             x_tilings_polymer_packing.append(tiling)
 
-                    fig, ax = plt.subplots()
-                    plt.axhline(y=polly_perf_mean[benchmark][counter], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
+                    spec, ax = figure_spec("perf")
+                    ax.axhline(y=polly_perf_mean[benchmark][counter], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
                     ax.fill_between(x_tilings, polly_perf_mean[benchmark][counter]+polly_perf_conf[benchmark][counter], polly_perf_mean[benchmark][counter]-polly_perf_conf[benchmark][counter], alpha=0.3, color='#000000')
-                    plt.axhline(y=polygeist_perf_mean[benchmark][counter], color='black', linestyle='--', alpha=0.8, linewidth=1, label='Clang-O3')
+                    ax.axhline(y=polygeist_perf_mean[benchmark][counter], color='black', linestyle='--', alpha=0.8, linewidth=1, label='Clang-O3')
                     ax.fill_between(x_tilings, polygeist_perf_mean[benchmark][counter]+polygeist_perf_conf[benchmark][counter], polygeist_perf_mean[benchmark][counter]-polygeist_perf_conf[benchmark][counter], alpha=0.3, color='#000000')
                     ax.errorbar(x_tilings, y_value_polymer, yerr=y_conf_polymer, label="Polymer", markersize=sqrt(18), markerfacecolor='#5e3c99', markeredgecolor='black', markeredgewidth=0.5, ecolor='black', elinewidth=0.5, fmt='o', alpha=0.8)
                     ax.errorbar(x_tilings_polymer_packing, y_value_polymer_packing, yerr=y_conf_polymer_packing, label="Polymer + GPAT", markersize=sqrt(18), markerfacecolor='#e66101', markeredgecolor='black', markeredgewidth=0.5, ecolor='black', elinewidth=0.5, fmt='s', alpha=0.8)
@@ -692,14 +765,11 @@ if __name__ == "__main__":
                     ax.set_xlabel('Tiling size (all dimensions)')
                     # Save the figure and show
                     graph_path = perf_outputs_dir / (benchmark + '-' + counter + '.png')
-                    legend = plt.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-                    frame = legend.get_frame()
-                    frame.set_facecolor('white')
-                    frame.set_edgecolor('black')
-                    plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-                    plt.close(fig)
+                    spec.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+                    renderer.submit(spec, graph_path)
                 # ---------------------------------------------------------------------------------------------
 
+            profile.start("perf relative graphs")
             # Build perf relative graphs ---------------------------------------------------------------------------
             for benchmark in polly_mean.keys():
                 for counter in perf_counters:
@@ -714,9 +784,9 @@ if __name__ == "__main__":
                             y_value_polymer_packing.append(polygeist_perf_mean[benchmark][counter]/tiling_polymer_packing_perf_mean_map[tiling][benchmark][counter])
                             x_tilings_polymer_packing.append(tiling)
 
-                    fig, ax = plt.subplots()
-                    plt.axhline(y=polygeist_perf_mean[benchmark][counter]/polly_perf_mean[benchmark][counter], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
-                    plt.axhline(y=1, color='black', linestyle='--', alpha=0.8, linewidth=1)
+                    spec, ax = figure_spec("perf-relative")
+                    ax.axhline(y=polygeist_perf_mean[benchmark][counter]/polly_perf_mean[benchmark][counter], color='black', linestyle='-', alpha=0.8, linewidth=1, label='Polly')
+                    ax.axhline(y=1, color='black', linestyle='--', alpha=0.8, linewidth=1)
                     ax.errorbar(x_tilings, y_value_polymer, label="Polymer", markersize=sqrt(18), markerfacecolor='#5e3c99', markeredgecolor='black', markeredgewidth=0.5, ecolor='black', elinewidth=0.5, fmt='o', alpha=0.8)
                     ax.errorbar(x_tilings_polymer_packing, y_value_polymer_packing, label="Polymer + GPAT", markersize=sqrt(18), markerfacecolor='#e66101', markeredgecolor='black', markeredgewidth=0.5, ecolor='black', elinewidth=0.5, fmt='s', alpha=0.8)
                     # Set axes labels and limits
@@ -729,12 +799,11 @@ if __name__ == "__main__":
                     ax.set_xlabel('Tiling size (all dimensions)')
                     # Save the figure and show
                     graph_path = perf_relative_outputs_dir / (benchmark + '-' + counter + '.png')
-                    legend = plt.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
-                    frame = legend.get_frame()
-                    frame.set_facecolor('white')
-                    frame.set_edgecolor('black')
-                    plt.savefig(graph_path, bbox_inches='tight', dpi=300)
-                    plt.close(fig)
+                    spec.legend(ncol=2, loc='lower center', frameon=True, framealpha=1, bbox_to_anchor=(0.5, 1), columnspacing=0.8, handletextpad=0.3, handlelength=1.0)
+                    renderer.submit(spec, graph_path)
                 # ---------------------------------------------------------------------------------------------
 
-
+    profile.start("rendering")
+    renderer.close()
+    profile.write_report(output_dir / PROFILE_FILE, tiling_method=tiling_method, jobs=jobs, format=graph_format, logs=len(log_samples), samples=sum(len(times) for runtime_map,_ in log_samples.values() for times in runtime_map.values()))
+    profile.close()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# Run the executables of a binaries folder and append their output to a log
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from packtools.runner import BenchmarkRunner, available_cores, PERF_EVENTS, PERF_BACKENDS
+from packtools.adaptive import RepetitionController
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Run the executables of a binaries folder in random order and append their output to a log in the format of run.sh.")
+
+    parser.add_argument("binaries_dir", help="Folder with the *.exe binaries")
+    parser.add_argument("log_file", help="Log the output of the binaries is appended to")
+    parser.add_argument("--repeats", help="Number of runs of each binary (maximum number with --target-ci or --time-budget).", type=int, required=True)
+    parser.add_argument("--cores", help="Number of logical processors, each execution runs on a random one.", type=int, required=True)
+    parser.add_argument("--max-parallel", help="Number of binaries run at the same time, on cores sharing neither SMT siblings nor L2 caches. More parallel runs finish sooner but share L3 caches and memory bandwidth.", type=int, default=1)
+    parser.add_argument("--perf", help="Collect perf event counters.", action='store_true')
+    parser.add_argument("--perf-backend", help="Collect the counters with a perf stat process per execution or with perf_event_open from the runner.", type=str, choices=PERF_BACKENDS, default='perf-stat')
+    parser.add_argument("--target-ci", help="Stop running a binary once the relative half width of the 95%% confidence interval of its execution time is below this value.", type=float)
+    parser.add_argument("--time-budget", help="Seconds after which no binary is run anymore.", type=float)
+    parser.add_argument("--min-runs", help="Number of runs of a binary before checking its confidence interval.", type=int, default=5)
+    args = parser.parse_args()
+
+    binaries_dir = Path(args.binaries_dir)
+    log_file = Path(args.log_file)
+
+    if not binaries_dir.is_dir():
+        print("Binaries dir does not exist", file=sys.stderr)
+        sys.exit(1)
+
+    executables = sorted(binaries_dir.rglob("*.exe"))
+    runner = BenchmarkRunner(log_file, available_cores(args.cores), PERF_EVENTS if args.perf else None, max_parallel=args.max_parallel, perf_backend=args.perf_backend)
+
+    # only binaries that did not converge are run in each round
+    controller = None
+    if args.target_ci is not None or args.time_budget is not None:
+        deadline = time.time() + args.time_budget if args.time_budget is not None else None
+        # without a target, binaries are run until the time budget or the repetition number is reached
+        controller = RepetitionController([executable.name for executable in executables], args.target_ci or 0, args.min_runs, args.repeats, deadline)
+
+    runner.run(executables, args.repeats, controller)
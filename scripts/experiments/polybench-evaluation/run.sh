@@ -23,8 +23,15 @@ function Help()
    echo -e "\t-D [SIZE]: Specify size of dataset: MINI, SMALL, MEDUIM, LARGE, EXTRALARGE"
    echo -e "\t-h: Print this Help."
    echo -e "\t-p: Collect perf event counters."
+   echo -e "\t-P: Collect perf event counters with perf_event_open instead of a perf stat process per execution."
    echo -e "\t-v: Verbose mode."
    echo -e "\t-r [NUMBER]: Specify repetition number (overrides defaults)."
+   echo -e "\t-c [WIDTH]: Stop running a binary once the relative half width of the 95% confidence"
+   echo -e "\t            interval of its execution time is below WIDTH (e.g. 0.01), the repetition"
+   echo -e "\t            number becomes the maximum number of runs."
+   echo -e "\t-t [SECONDS]: Time budget of each binaries folder, stops running its binaries once reached."
+   echo -e "\t-j [NUMBER]: Maximum number of binaries run at the same time on isolated cores (default 1)."
+   echo -e "\t            Cores of concurrent runs share no SMT sibling nor L2 cache but share the L3 cache."
    echo
    echo -e "Repetition number of executions by default are:"
    echo -e "\tMINI:       10000"
@@ -85,9 +92,13 @@ function echoYellow() {
 
 DATASET_SIZE=""
 collect_perf="false"
+perf_backend="perf-stat"
 CUSTOM_REPEATS=""
+TARGET_CI=""
+TIME_BUDGET=""
+MAX_PARALLEL="1"
 
-while getopts ":hvpD:r:" option; do
+while getopts ":hvpPD:r:c:t:j:" option; do
   case $option in
     h)
       Help
@@ -99,12 +110,25 @@ while getopts ":hvpD:r:" option; do
     p)
       collect_perf="true"
       ;;
+    P)
+      collect_perf="true"
+      perf_backend="perf-event-open"
+      ;;
     D)
       DATASET_SIZE=${OPTARG}
       ;;
     r)
       CUSTOM_REPEATS=${OPTARG}
      ;;
+    c)
+      TARGET_CI=${OPTARG}
+     ;;
+    t)
+      TIME_BUDGET=${OPTARG}
+     ;;
+    j)
+      MAX_PARALLEL=${OPTARG}
+     ;;
     \?)
       echo "Invalid option." >&2
       Help
@@ -186,27 +210,26 @@ if [[ ! -z $CUSTOM_REPEATS ]]; then
   REPEATS=$CUSTOM_REPEATS
 fi
 
+RUN_PY="$(getScriptLocation)/run-binaries.py"
+RUN_ARGS="--repeats $REPEATS --cores $CORES --max-parallel $MAX_PARALLEL"
+if [[ "$collect_perf" == "true" ]]; then
+  RUN_ARGS="$RUN_ARGS --perf --perf-backend $perf_backend"
+fi
+# Adaptive repetitions: only binaries that did not converge are run in each round
+if [[ ! -z $TARGET_CI ]]; then
+  RUN_ARGS="$RUN_ARGS --target-ci $TARGET_CI"
+fi
+if [[ ! -z $TIME_BUDGET ]]; then
+  RUN_ARGS="$RUN_ARGS --time-budget $TIME_BUDGET"
+fi
+
 for binaries in $(find $INPUT_DIR -type d -name "*-bin*" | sort); do
   echoGreen "\nRUNNING: $(basename $binaries)"
 
   output_log_name="$(basename ${binaries%-bin}).log"
   output_log_path="$OUTPUT_DIR/$output_log_name"
 
-  for run in $(seq $REPEATS); do
-    echo "Iteration $run of $REPEATS -------------------------------"
-
-    # execute in random running order
-    for i in $(find $binaries -name "*.exe" | shuf); do
-      echo Running "$(basename $i)" | tee -a $output_log_path
-
-      RANDOM=$(date +%s%N | cut -b10-19 | sed -e 's/^0*//;s/^$/0/')
-
-      if [[ "$collect_perf" == "true" ]]; then
-        perf stat -e '{cycles,instructions},{mem_load_retired.l1_miss,mem_load_retired.l2_miss,mem_load_retired.l3_miss},{dtlb_load_misses.stlb_hit,dtlb_load_misses.miss_causes_a_walk}' taskset --cpu-list $(( $RANDOM % $CORES )) $i 2>&1 | tee -a $output_log_path
-      else
-        taskset --cpu-list $(( $RANDOM % $CORES )) $i 2>&1 | tee -a $output_log_path
-      fi
-    done
-    echo -e "\n"
-  done
+  # execute in random running order, each execution on a random core or,
+  # with -j, on one of the isolated cores
+  $RUN_PY $RUN_ARGS $binaries $output_log_path
 done
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# Run the tile size search of tile-search.py on synthetic execution times, to
+# check how many tile sizes of the range it measures and how close the tile
+# size it finds is to the fastest one, without building or running anything
+
+import argparse
+import math
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from packtools.pipeline import polymer_tile_sizes
+from packtools.tilesearch import TileSearch, cache_tile_sizes, COARSE_POINTS
+from packtools.resultsdb import DATASET_SIZES, read_spec_file
+
+
+# execution time of tile relative to the one of the fastest tile size
+# optimum: a valley around optimum, or a plateau above optimum that is a
+# little faster at the end of the range (the curves the search refined the
+# most when it refined every tile size as fast as the fastest one)
+def relative_time(curve, tiles, optimum, tile):
+    if curve == "valley":
+        return 1 + 0.5 * math.log2(tile / optimum) ** 2
+    return 1 + 0.2 * max(0, math.log2(optimum / tile)) + 0.005 * (tiles[-1] - tile) / tiles[-1]
+
+
+# run a search on the curve with noise (relative half width of the
+# confidence interval of every measurement), returns the number of tile sizes
+# measured, the number of rounds and the relative slowdown of the tile size
+# found
+def simulate(tiles, priors, points, curve, optimum, noise, generator):
+    search = TileSearch(tiles, priors, points)
+    fastest = min(relative_time(curve, tiles, optimum, tile) for tile in tiles)
+    rounds = 0
+    while True:
+        next_tiles = search.next_tiles()
+        if len(next_tiles) == 0:
+            break
+        rounds += 1
+        for tile in next_tiles:
+            time = relative_time(curve, tiles, optimum, tile)
+            search.record(tile, time * (1 + generator.gauss(0, noise / 1.96)), time * noise)
+    return len(search.results), rounds, relative_time(curve, tiles, optimum, search.best()) / fastest - 1
+
+
+if __name__ == "__main__":
+
+    scripts_dir = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Run the tile size search of tile-search.py on synthetic execution time curves and report the fraction of the tile sizes of the range it measures.")
+
+    parser.add_argument("-D", "--dataset-size", help="Sizes of dataset (all by default).", choices=DATASET_SIZES, type=str, action='append')
+    parser.add_argument("--curves", help="Comma separated execution time curves: valley, plateau.", type=str, default="valley,plateau")
+    parser.add_argument("--noise", help="Relative half width of the confidence interval of the measured execution times.", type=float, default=0.1)
+    parser.add_argument("--trials", help="Searches per dataset size and curve, with random fastest tile sizes.", type=int, default=200)
+    parser.add_argument("--points", help="Number of tile sizes spread over the range measured in the first round.", type=int, default=COARSE_POINTS)
+    parser.add_argument("--spec-file", help="spec.file with the cache sizes.", type=str, default=str(scripts_dir / "experiments" / "spec.file"))
+    parser.add_argument("--max-ratio", help="Exit with an error when a search measures more than this fraction of the range on average.", type=float)
+    parser.add_argument("--seed", help="Seed of the noise and of the fastest tile sizes.", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = random.Random(args.seed)
+    priors = cache_tile_sizes(read_spec_file(args.spec_file))
+    failed = False
+    print("{:<11} {:<8} {:>6} {:>9} {:>8} {:>7} {:>12} {:>12}".format("dataset", "curve", "range", "measured", "ratio", "rounds", "mean slower", "max slower"))
+    for dataset_size in args.dataset_size or DATASET_SIZES:
+        tiles = polymer_tile_sizes(dataset_size)
+        for curve in args.curves.split(','):
+            results = [simulate(tiles, priors, args.points, curve, generator.choice(tiles), args.noise, generator) for _ in range(args.trials)]
+            measured = sum(result[0] for result in results) / len(results)
+            ratio = measured / len(tiles)
+            print("{:<11} {:<8} {:>6} {:>9.1f} {:>7.1f}% {:>7.1f} {:>11.2f}% {:>11.2f}%".format(
+                dataset_size, curve, len(tiles), measured, 100 * ratio, sum(result[1] for result in results) / len(results),
+                100 * sum(result[2] for result in results) / len(results), 100 * max(result[2] for result in results)))
+            if args.max_ratio is not None and ratio > args.max_ratio:
+                failed = True
+    if failed:
+        print("A search measured more than {:.1f}% of the range on average".format(100 * args.max_ratio), file=sys.stderr)
+        sys.exit(1)
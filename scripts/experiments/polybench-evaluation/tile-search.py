@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# Search the fastest Polymer tile size of every benchmark, with and without packing, instead of building and running
+# every tile size of the range of the dataset size. Each round builds with build.py and runs only the tile sizes
+# asked for by the search (see tilesearch.py), then parses their logs. The logs have the names and format of run.sh,
+# for parse-log.py; logs already in the log dir are read first, so that a search that was stopped goes on.
+
+import argparse
+import csv
+import math
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from packtools.pipeline import POLYMER_FAILURES, POLYMER_TIMEOUTS, read_shell_files, read_benchmark_list, polymer_tile_sizes, benchmark_stem, write_tile_sizes
+from packtools.tilesearch import TileSearch, cache_tile_sizes, COARSE_POINTS
+from packtools.logstats import parse_log_file
+from packtools.records import records_path
+from packtools.runner import BenchmarkRunner, available_cores
+from packtools.adaptive import RepetitionController
+from packtools.buildcache import add_build_cache_arguments
+from packtools.resultsdb import DATASET_SIZES
+
+# binaries dir and log prefix of the two Polymer variants
+VARIANTS = ("polymer", "polymer-packing")
+
+# repetition number of run.sh
+REPEATS = {
+    "MINI": 10000,
+    "SMALL": 4000,
+    "MEDIUM": 1000,
+    "LARGE": 50,
+    "EXTRALARGE": 10,
+}
+
+
+def log_path(log_dir, variant, tile):
+    return log_dir / "{}-{}.log".format(variant, tile)
+
+
+# record the execution times of the log of a tile size in the searches of
+# benchmarks, read from its JSON-lines records as in parse-log.py; the
+# benchmarks missing from the log failed when fail is set
+def record_log(searches, log_file, variant, tile, benchmarks, fail=True):
+    if records_path(log_file).exists():
+        log_file = records_path(log_file)
+    mean_map, confidence_map = parse_log_file(log_file)[:2] if log_file.is_file() else ({}, {})
+    for benchmark in benchmarks:
+        mean = mean_map.get(benchmark, math.nan)
+        if not math.isnan(mean):
+            conf = confidence_map[benchmark]
+            searches[variant, benchmark].record(tile, mean, 0 if math.isnan(conf) else conf)
+        elif fail:
+            searches[variant, benchmark].fail(tile)
+
+
+if __name__ == "__main__":
+
+    scripts_dir = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Search the fastest Polymer tile size of every benchmark by building and running only some of the tile sizes of the range of generate-files.sh, in rounds: tile sizes spread over the range and fitting the caches of the spec.file first, then the tile sizes next to the fastest ones.")
+
+    parser.add_argument("output_dir", help="Output dir of the MLIR files and binaries, as with build.py")
+    parser.add_argument("log_dir", help="Output dir of the logs, as with run.sh")
+    parser.add_argument("-D", "--dataset-size", help="Size of dataset.", choices=DATASET_SIZES, type=str, required=True)
+    parser.add_argument("-j", "--jobs", help="Maximum number of compiler invocations run in parallel.", type=int, default=os.cpu_count())
+    parser.add_argument("-r", "--repeats", help="Number of runs of each binary (maximum number with --target-ci), the one of run.sh by default.", type=int)
+    parser.add_argument("-c", "--target-ci", help="Stop running a binary once the relative half width of the 95%% confidence interval of its execution time is below this value.", type=float)
+    parser.add_argument("--min-runs", help="Number of runs of a binary before checking its confidence interval.", type=int, default=5)
+    parser.add_argument("--max-parallel", help="Number of binaries run at the same time, on cores sharing neither SMT siblings nor L2 caches.", type=int, default=1)
+    parser.add_argument("--points", help="Number of tile sizes spread over the range measured in the first round.", type=int, default=COARSE_POINTS)
+    parser.add_argument("--max-rounds", help="Maximum number of rounds.", type=int)
+    parser.add_argument("--config-file", help="config.file with the paths of the tools.", type=str, default=str(scripts_dir / "config.file"))
+    parser.add_argument("--spec-file", help="spec.file with the cache sizes.", type=str, default=str(scripts_dir / "experiments" / "spec.file"))
+    add_build_cache_arguments(parser)
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir).resolve()
+    log_dir = Path(args.log_dir).resolve()
+    for path in (output_dir, log_dir):
+        if not path.is_dir():
+            print("ERROR: {} isn't a directory.".format(path), file=sys.stderr)
+            sys.exit(1)
+    for path, name in ((args.config_file, "config.file"), (args.spec_file, "spec.file")):
+        if not Path(path).is_file():
+            print("Please create {}".format(name), file=sys.stderr)
+            sys.exit(2)
+
+    config = read_shell_files(args.config_file, args.spec_file)
+    repeats = args.repeats if args.repeats is not None else REPEATS[args.dataset_size]
+    cores = available_cores(int(config.get("CORES") or os.cpu_count()))
+    tiles = polymer_tile_sizes(args.dataset_size)
+    priors = cache_tile_sizes(config)
+    benchmarks = [benchmark_stem(benchmark) for benchmark in read_benchmark_list(config["POLYBENCH_BENCHMARK_LIST"]) if (Path(config["POLYBENCH"]) / benchmark).is_file()]
+    benchmarks = [benchmark for benchmark in benchmarks if benchmark not in POLYMER_FAILURES + POLYMER_TIMEOUTS]
+    searches = {(variant, benchmark): TileSearch(tiles, priors, args.points) for variant in VARIANTS for benchmark in benchmarks}
+
+    # logs of a previous search
+    for variant in VARIANTS:
+        for tile in tiles:
+            if log_path(log_dir, variant, tile).is_file():
+                record_log(searches, log_path(log_dir, variant, tile), variant, tile, benchmarks, fail=False)
+
+    build = [sys.executable, str(Path(__file__).resolve().parent / "build.py"), "-D", args.dataset_size, "-T", "Polymer", "-j", str(args.jobs),
+             "--config-file", args.config_file, "--spec-file", args.spec_file, "--tile-sizes", str(output_dir / "tile-sizes.txt"),
+             "--build-cache-dir", args.build_cache_dir, "--build-cache-size", str(args.build_cache_size)]
+    build += ["--no-build-cache"] if args.no_build_cache else []
+    rounds = 0
+    while args.max_rounds is None or rounds < args.max_rounds:
+        # tile sizes of each benchmark asked for by the search with or without packing
+        tile_sizes = {}
+        for (variant, benchmark), search in searches.items():
+            for tile in search.next_tiles():
+                tile_sizes.setdefault(benchmark, set()).add(tile)
+        if len(tile_sizes) == 0:
+            break
+        rounds += 1
+        print("\033[0;92m\nROUND {}: {} tile sizes of {} benchmarks\033[0m".format(rounds, sum(len(benchmark_tiles) for benchmark_tiles in tile_sizes.values()), len(tile_sizes)), flush=True)
+
+        write_tile_sizes(output_dir / "tile-sizes.txt", tile_sizes)
+        if subprocess.run(build + [str(output_dir)]).returncode != 0:
+            print("build.py failed", file=sys.stderr)
+            sys.exit(1)
+
+        for tile in sorted(set(tile for benchmark_tiles in tile_sizes.values() for tile in benchmark_tiles)):
+            tiled = [benchmark for benchmark in sorted(tile_sizes) if tile in tile_sizes[benchmark]]
+            for variant in VARIANTS:
+                bin_dir = output_dir / "{}-{}-bin".format(variant, tile)
+                executables = [bin_dir / (benchmark + ".exe") for benchmark in tiled if (bin_dir / (benchmark + ".exe")).is_file()]
+                if len(executables) > 0:
+                    print("\033[0;92m\nRUNNING: {}\033[0m".format(bin_dir.name), flush=True)
+                    runner = BenchmarkRunner(log_path(log_dir, variant, tile), cores, max_parallel=args.max_parallel)
+                    controller = None
+                    if args.target_ci is not None:
+                        controller = RepetitionController([executable.name for executable in executables], args.target_ci, args.min_runs, repeats)
+                    runner.run(executables, repeats, controller)
+                record_log(searches, log_path(log_dir, variant, tile), variant, tile, tiled)
+
+    # fastest tile size of every benchmark, with the number of tile sizes measured
+    with open(log_dir / "tile-search.csv", 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["variant", "benchmark", "tile", "mean", "conf", "measured"])
+        for (variant, benchmark), search in sorted(searches.items()):
+            best = search.best()
+            if best is not None:
+                writer.writerow([variant, benchmark, best, search.results[best][0], search.results[best][1], len(search.results)])
+                print("{}: {} tile size {} ({:.3f} ms, {} tile sizes measured)".format(variant, benchmark, best, search.results[best][0], len(search.results)))
+    measured = len(set((benchmark, tile) for (_, benchmark), search in searches.items() for tile in search.results))
+    print("\nMeasured {} of the {} tile sizes of {} benchmarks".format(measured, len(tiles) * len(benchmarks), len(benchmarks)))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# Query the results database written by the parse-log.py scripts (--results-db)
+
+import argparse
+import csv
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from packtools.resultsdb import ResultsDB
+
+
+def write_csv(rows, columns):
+    writer = csv.DictWriter(sys.stdout, fieldnames=columns, extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare the results of the runs added to a results database by the parse-log.py scripts, as CSV.")
+
+    parser.add_argument("results_db", help="SQLite results database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    runs_parser = subparsers.add_parser("runs", help="List the runs and their metadata.")
+    runs_parser.add_argument("--experiment", choices=["polybench-evaluation", "packing-selection-evaluation"], type=str)
+
+    speedup_parser = subparsers.add_parser("speedup", help="Speedup of the variants over a baseline variant of the same run, per benchmark across runs.")
+    speedup_parser.add_argument("--baseline", help="Baseline variant: a log name (polygeist, polly) or a packing (none).", type=str, default="polygeist")
+    speedup_parser.add_argument("--variants", help="SQL LIKE pattern of the compared variants.", type=str, default="%packing%")
+    speedup_parser.add_argument("--benchmark", type=str)
+    speedup_parser.add_argument("--metric", help="runtime or a perf counter.", type=str, default="runtime")
+    speedup_parser.add_argument("--experiment", choices=["polybench-evaluation", "packing-selection-evaluation"], type=str)
+    speedup_parser.add_argument("--branch", type=str)
+    speedup_parser.add_argument("--machine", type=str)
+    speedup_parser.add_argument("--dataset-size", type=str)
+    speedup_parser.add_argument("--tiling-method", type=str)
+    args = parser.parse_args()
+
+    if not Path(args.results_db).exists():
+        print("Results database does not exist", file=sys.stderr)
+        sys.exit(1)
+
+    with ResultsDB(args.results_db) as results_db:
+        if args.command == "runs":
+            write_csv(results_db.runs(args.experiment), ["id", "created", "experiment", "label", "git_revision", "git_branch", "machine", "tiling_method", "dataset_size", "l1", "l2", "l3", "input"])
+        else:
+            rows = results_db.speedups(args.baseline, args.variants, args.benchmark, args.metric, experiment=args.experiment, git_branch=args.branch, machine=args.machine, dataset_size=args.dataset_size, tiling_method=args.tiling_method)
+            write_csv(rows, ["benchmark", "variant", "tiling", "run_id", "created", "label", "git_branch", "git_revision", "machine", "dataset_size", "speedup", "mean", "baseline_mean"])
@@ -24,6 +24,7 @@ function Help()
    echo -e "\t-v: Verbose mode."
    echo -e "\t--disable-vectorization: Disable vectorization in LLVM."
    echo -e "\t--disable-unrolling: Disable unrolling in LLVM."
+   echo -e "\t--perf-region: Count perf events around the kernel only and print them after the execution time."
    echo
 }
 
@@ -108,8 +109,9 @@ function echoYellow() {
 DATASET_SIZE=""
 DISABLE_VECTORIZATION="false"
 DISABLE_UNROLLING="false"
+PERF_REGION="false"
 
-PARSED_ARGUMENTS=$(getopt -a -n "polly" -o hvD: --long disable-unrolling,disable-vectorization -- "$@")
+PARSED_ARGUMENTS=$(getopt -a -n "polly" -o hvD: --long disable-unrolling,disable-vectorization,perf-region -- "$@")
 if [ $? != 0 ]; then
     echo "Invalid option." >&2
     Help
@@ -138,6 +140,10 @@ while [ : ]; do
       DISABLE_UNROLLING="true"
       shift
       ;;
+    --perf-region)
+      PERF_REGION="true"
+      shift
+      ;;
     --)
       shift
       break
@@ -185,7 +191,7 @@ checkDependencies
 checkClangVersion
 
 # Get remove-body.py script path
-REMOVE_BODY="$scriptPath/remove-body.py"
+REMOVE_BODY="$scriptPath/../lower-to-binary/remove-body.py"
 if [ ! -f $REMOVE_BODY ]; then
   echo "remove-body.py not found!"
   exit 1
@@ -212,12 +218,12 @@ for i in $(cat $POLYBENCH_BENCHMARK_LIST); do
     STATIC_LINE=$(echo "$STATIC_GREP" | cut -d '-' -f1)
     sed -i "${STATIC_LINE}d" $COPY_POLYBENCH_DIR/$i
   fi
-
-  # remove body of kernel function and only leave a function declaration
-  $REMOVE_BODY $COPY_POLYBENCH_DIR/$i
-
 done
 
+# remove body of kernel functions and only leave function declarations, all
+# benchmarks of the list in one run
+$REMOVE_BODY --benchmark-list $POLYBENCH_BENCHMARK_LIST --polybench-dir $COPY_POLYBENCH_DIR -j $(nproc)
+
 FLAGS=""
 
 if [[ $DISABLE_VECTORIZATION == "true" ]]; then
@@ -230,6 +236,12 @@ if [[ $DISABLE_UNROLLING == "true" ]]; then
   FLAGS="$FLAGS -fno-unroll-loops"
 fi
 
+# polybench.c starts and stops the counters with the kernel timer
+POLYBENCH_FLAGS="-DPOLYBENCH_TIME"
+if [[ $PERF_REGION == "true" ]]; then
+  POLYBENCH_FLAGS="$POLYBENCH_FLAGS -DPOLYBENCH_PERF_REGION"
+fi
+
 # Compile .mlir with .c files -------------------------------
 
 for i in $(cat $POLYBENCH_BENCHMARK_LIST); do
@@ -288,7 +300,7 @@ for i in $(cat $POLYBENCH_BENCHMARK_LIST); do
   # -lm is required for a few kernels
   $CLANG $COPY_POLYBENCH_DIR/$i $OUTPUT_DIR/${FNAME%.*}.ll $POLYBENCH_UTILITIES/polybench.c \
     -I$POLYBENCH_UTILITIES -I$COPY_POLYBENCH_DIR/$(dirname $i) \
-    -DPOLYBENCH_USE_RESTRICT -DPOLYBENCH_TIME -D${DATASET_SIZE}_DATASET -DPOLYBENCH_NO_FLUSH_CACHE \
+    -DPOLYBENCH_USE_RESTRICT $POLYBENCH_FLAGS -D${DATASET_SIZE}_DATASET -DPOLYBENCH_NO_FLUSH_CACHE \
     -Wall -Wno-misleading-indentation -Wno-unused-variable -Wno-unknown-pragmas \
     -O3 -ffast-math $FLAGS -flto -lm \
     -o $OUTPUT_DIR/${FNAME%.*}.exe
@@ -1,68 +1,41 @@
 #!/usr/bin/env python3
-# Remove body of kernel from a polybench .c file and transform it into a function declaration
+# Remove body of kernel from polybench .c files and transform it into a function declaration
 
 import argparse
 from pathlib import Path
 import sys
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from packtools.kernelbody import strip_kernel_files, benchmark_list_files, kernel_files, NO_KERNEL
+
 if __name__ == "__main__":
 
-    parser = argparse.ArgumentParser()
-    parser.add_argument("filename")
+    parser = argparse.ArgumentParser(description="Replace the body of the kernel of polybench .c files by a semicolon, leaving a function declaration.")
+    parser.add_argument("filenames", nargs='*', help="Files rewritten in place")
+    parser.add_argument("--benchmark-list", help="Also rewrite the files of a polybench benchmark_list.", type=str)
+    parser.add_argument("--polybench-dir", help="Dir the files of --benchmark-list are relative to (its parent dir by default).", type=str)
+    parser.add_argument("--tree", help="Also rewrite every .c file of this directory tree that defines a kernel.", type=str)
+    parser.add_argument("-j", "--jobs", help="Number of files rewritten in parallel.", type=int, default=1)
     args = parser.parse_args()
 
-    filename = Path(args.filename)
-    if not filename.exists() or not filename.is_file():
-        print("Filename is not a file of does not exist", file=sys.stderr)
+    filenames = [Path(filename) for filename in args.filenames]
+    if args.benchmark_list is not None:
+        polybench_dir = args.polybench_dir if args.polybench_dir is not None else Path(args.benchmark_list).absolute().parents[1]
+        filenames += benchmark_list_files(args.benchmark_list, polybench_dir)
+
+    failed = False
+    for filename in filenames:
+        if not filename.exists() or not filename.is_file():
+            print("{}: filename is not a file of does not exist".format(filename), file=sys.stderr)
+            failed = True
+    filenames = [filename for filename in filenames if filename.is_file()]
+
+    # files of the tree without a kernel definition are left as they are
+    tree_filenames = kernel_files(args.tree) if args.tree is not None else []
+    for filename, result in zip(filenames + tree_filenames, strip_kernel_files(filenames + tree_filenames, args.jobs)):
+        if result == NO_KERNEL and filename not in tree_filenames:
+            print("{}: no kernel function found".format(filename), file=sys.stderr)
+            failed = True
+
+    if failed:
         sys.exit(1)
-    else:
-        filename = filename.absolute()
-
-    kernel_found = False
-    first_bracket_line = -1
-    first_bracket_found = False
-    last_bracket_line = -1
-    last_bracket_found = False
-    bracket_count = 0
-
-    with open(filename, 'r') as f:
-        lines = f.readlines()
-
-    # find kernel and first bracket
-    for line_number, line in enumerate(lines):
-        if "void kernel_" in line:
-            kernel_found = True
-
-        if kernel_found and "{" in line:
-            first_bracket_line = line_number
-            first_bracket_found = True
-            bracket_count = 1
-            break
-
-    # enclosing bracket
-    for line_number, line in enumerate(lines[first_bracket_line+1:], start=first_bracket_line+1):
-        if first_bracket_found and line_number > first_bracket_line:
-            bracket_count += line.count('{')
-            bracket_count -= line.count('}')
-            if bracket_count == 0:
-                last_bracket_line = line_number
-                break
-
-    # rewrite file without kernel body
-    with open(filename, 'w') as f:
-        for line_number, line in enumerate(lines):
-
-            # if first bracket is in a new line
-            if line_number == first_bracket_line-1:
-                if ')' not in lines[first_bracket_line]:
-                    f.write(line[:-1]+';'+line[-1])
-                    continue
-
-            # if brack is at the end of the line, e.g. 'arg4, arg5) {'
-            if line_number == first_bracket_line:
-                if ')' in lines[first_bracket_line]:
-                    f.write(line.replace('{', ';'))
-                    continue
-            
-            if not first_bracket_line <= line_number <= last_bracket_line:
-                f.write(line)
\ No newline at end of file
@@ -0,0 +1 @@
+# Python helpers shared by the experiment and lowering scripts
@@ -0,0 +1,53 @@
+# Adaptive number of repetitions of the benchmarks
+#
+# Instead of running every binary a fixed number of times, the controller
+# keeps the running statistics of each binary and, after every round, only
+# schedules the binaries whose 95% confidence interval (computed as in
+# parse-log.py) is still wider than the target relative width. Binaries are
+# never run less than min_runs times nor more than max_runs times, and no
+# binary is scheduled once the deadline is reached.
+
+import time
+
+from packtools.follow import Welford
+
+
+class RepetitionController:
+    def __init__(self, executables, target_ci=0.01, min_runs=5, max_runs=None, deadline=None, statistics=None):
+        self.executables = list(executables)
+        # relative half width of the confidence interval (conf / mean)
+        self.target_ci = target_ci
+        self.min_runs = max(min_runs, 2)
+        self.max_runs = max_runs
+        # time.time() after which no binary is scheduled anymore
+        self.deadline = deadline
+        # map from executable to the Welford of its execution times
+        self.statistics = statistics if statistics is not None else {}
+
+    def record(self, executable, runtime):
+        if executable not in self.statistics:
+            self.statistics[executable] = Welford()
+        self.statistics[executable].update(runtime)
+
+    def runs(self, executable):
+        stat = self.statistics.get(executable)
+        return stat.count if stat is not None else 0
+
+    # relative half width of the confidence interval, nan before two runs
+    def relative_ci(self, executable):
+        stat = self.statistics.get(executable)
+        if stat is None or stat.count < 2 or stat.mean == 0:
+            return float('nan')
+        return stat.conf / abs(stat.mean)
+
+    def converged(self, executable):
+        runs = self.runs(executable)
+        if self.max_runs is not None and runs >= self.max_runs:
+            return True
+        return runs >= self.min_runs and self.relative_ci(executable) <= self.target_ci
+
+    # binaries to run in the next round, empty when the measurements are done
+    def pending(self):
+        if self.deadline is not None and time.time() >= self.deadline:
+            return []
+        return [executable for executable in self.executables if not self.converged(executable)]
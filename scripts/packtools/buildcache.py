@@ -0,0 +1,378 @@
+# Content-addressed cache of the artifacts of the compile pipeline
+#
+# A step of the pipeline for one benchmark (mlir-clang, tiling, packing,
+# lowering, ...) is an action: commands run in a scratch dir, reading input
+# files and leaving output files there. The key of an action hashes
+# everything its outputs depend on: the command lines with the content of the
+# input files and tool binaries in place of their paths, the files written
+# for it (the tile.sizes of Polymer, the source without the kernel body) and
+# the environment variables it sets, the content of the dirs of shared
+# libraries it adds to the LD_LIBRARY_PATH of the caller (but not the
+# LD_LIBRARY_PATH of the caller itself). The spec.file values it uses are part of
+# its command lines, other values (the cpu of -march=native) are given with
+# the action.
+#
+# The outputs of an action are stored once by content hash in objects/ and
+# actions/<key>.json lists them with the error of the action, so that an
+# action whose key is in the cache is restored instead of run, failed ones
+# included. Only failures of the commands themselves (a non-zero exit status)
+# are cached: timeouts, commands killed by a signal (Ctrl-C, the OOM killer)
+# or that could not be started, and every action finished once the build is
+# interrupted, are run again by the next build. Tool binaries are hashed once per size
+# and mtime (tools.json). Actions are evicted in least recently used order
+# once the objects exceed the size cap, with the objects no action refers to
+# anymore, except the ones written since the eviction started. A cache is shared by the threads of a build, each running its own
+# actions.
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from packtools.cache import DEFAULT_CACHE_DIR, content_hash
+
+BUILD_CACHE_VERSION = 1
+DEFAULT_BUILD_CACHE_DIR = DEFAULT_CACHE_DIR / "build"
+DEFAULT_BUILD_CACHE_SIZE_MB = 4096
+# objects modified less than this before an eviction started are kept
+EVICT_MARGIN_NS = 1000000000
+
+
+# an input file of a command, its name and content are part of the key
+# instead of its path; the key of a dir (an include dir) covers the headers
+# in it
+class Input:
+    def __init__(self, path, prefix=''):
+        self.path = Path(path)
+        self.prefix = prefix
+
+    def __str__(self):
+        return self.prefix + str(self.path)
+
+    def digest(self, cache):
+        if self.path.is_dir():
+            digest = hashlib.blake2b()
+            for header in sorted(self.path.glob("*.h")):
+                digest.update("{}\0{}\0".format(header.name, content_hash(header)).encode())
+            return digest.hexdigest()
+        return content_hash(self.path)
+
+
+# a tool binary, hashed once per size and mtime
+class Tool(Input):
+    def digest(self, cache):
+        return cache.tool_hash(self.path)
+
+
+# a dir of files used by a tool (the shared libraries of Pluto, the clang
+# headers of mlir-clang, with their subdirs), every file hashed as a tool
+class ToolDir(Input):
+    def digest(self, cache):
+        return cache.dir_hash(self.path)
+
+
+# a command of an action; stdout and stderr are redirected to files of the
+# scratch dir (or os.devnull), tag names the command in the messages of its
+# failures: "(mlir-clang) Error", "(polymer-opt) Timeout"; library_paths are
+# ToolDirs appended to the LD_LIBRARY_PATH of the caller
+class Command:
+    def __init__(self, argv, stdout=None, stderr=None, timeout=None, tag=None, env=None, library_paths=()):
+        self.argv = argv
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timeout = timeout
+        self.tag = tag
+        self.env = env or {}
+        self.library_paths = list(library_paths)
+
+    # environment of the command, None to inherit the one of the caller
+    def environment(self):
+        if not self.env and not self.library_paths:
+            return None
+        env = dict(os.environ, **self.env)
+        if self.library_paths:
+            env["LD_LIBRARY_PATH"] = ":".join([env.get("LD_LIBRARY_PATH", "")] + [str(path.path) for path in self.library_paths])
+        return env
+
+    def message(self, failure):
+        return failure if self.tag is None else "{} {}".format(self.tag, failure)
+
+
+# commands run one after the other until one fails; files are written in the
+# scratch dir before, outputs are the files of the scratch dir that are kept
+# (whichever exist, also after a failure); inputs and values are hashed in
+# the key without being on a command line
+class Action:
+    def __init__(self, commands, outputs, files=None, inputs=(), values=None):
+        self.commands = commands
+        self.outputs = outputs
+        self.files = files or {}
+        self.inputs = list(inputs)
+        self.values = values or {}
+
+
+# outcome of an action: the failure message (None when all commands
+# succeeded), if it was restored from the cache and if it failed for a reason
+# that may be gone in the next build (timeout, signal, command not started)
+class ActionResult:
+    def __init__(self, error=None, cached=False, transient=False):
+        self.error = error
+        self.cached = cached
+        self.transient = transient
+
+
+# temporary file next to path, unique per process and thread
+def _tmp_path(path):
+    return path.with_name("{}.tmp{}-{}".format(path.name, os.getpid(), threading.get_ident()))
+
+
+def _argument_key(argument, cache):
+    if isinstance(argument, Input):
+        return [type(argument).__name__, argument.prefix, argument.path.name, argument.digest(cache)]
+    return str(argument)
+
+
+# hash of everything the outputs of the action depend on
+def action_key(action, cache):
+    key = {
+        "version": BUILD_CACHE_VERSION,
+        "commands": [[[_argument_key(argument, cache) for argument in command.argv], command.stdout, command.stderr, command.timeout, sorted(command.env.items()),
+                      [_argument_key(path, cache) for path in command.library_paths]] for command in action.commands],
+        "outputs": action.outputs,
+        "files": sorted((name, hashlib.blake2b(text.encode()).hexdigest()) for name,text in action.files.items()),
+        "inputs": [_argument_key(argument, cache) for argument in action.inputs],
+        "values": action.values,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+# run the commands of the action in workdir
+def execute_action(action, workdir):
+    workdir = Path(workdir)
+    for name,text in action.files.items():
+        (workdir / name).parent.mkdir(parents=True, exist_ok=True)
+        (workdir / name).write_text(text)
+
+    for command in action.commands:
+        streams = []
+        try:
+            for name in (command.stdout, command.stderr):
+                if name is None:
+                    streams.append(None)
+                else:
+                    path = Path(os.devnull) if name == os.devnull else workdir / name
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    streams.append(open(path, 'wb'))
+            completed = subprocess.run([str(argument) for argument in command.argv], cwd=str(workdir), stdout=streams[0], stderr=streams[1], timeout=command.timeout, env=command.environment())
+        except subprocess.TimeoutExpired:
+            return ActionResult(command.message("Timeout"), transient=True)
+        except OSError:
+            return ActionResult(command.message("Error"), transient=True)
+        finally:
+            for stream in streams:
+                if stream is not None:
+                    stream.close()
+        # a negative status is the signal that killed the command
+        if completed.returncode != 0:
+            return ActionResult(command.message("Error"), transient=completed.returncode < 0)
+    return ActionResult()
+
+
+# copy the outputs of the action found in workdir to dest_dir
+def _copy_outputs(action, workdir, dest_dir):
+    for name in action.outputs:
+        source = Path(workdir) / name
+        if source.is_file():
+            (Path(dest_dir) / name).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy(source, Path(dest_dir) / name)
+
+
+# cache of the actions in cache_dir, its objects limited to max_bytes
+class BuildCache:
+    def __init__(self, cache_dir=DEFAULT_BUILD_CACHE_DIR, max_bytes=DEFAULT_BUILD_CACHE_SIZE_MB << 20):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.tools_path = self.cache_dir / "tools.json"
+        try:
+            with open(self.tools_path) as f:
+                self.tools = json.load(f)
+        except (OSError, ValueError):
+            self.tools = {}
+        self.hits = 0
+        self.misses = 0
+        # hash of the ToolDirs of this build
+        self.dirs = {}
+        self.lock = threading.Lock()
+        # set when the build is interrupted, its commands may have been killed
+        self.interrupted = threading.Event()
+
+    def tool_hash(self, path):
+        path = Path(path).resolve()
+        stat = path.stat()
+        with self.lock:
+            entry = self.tools.get(str(path))
+            if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime_ns:
+                entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": content_hash(path)}
+                self.tools[str(path)] = entry
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                self._write_json(self.tools_path, self.tools)
+            return entry["hash"]
+
+    # hash of the files of a dir and of their paths in it; computed once per
+    # build, each file being hashed as a tool
+    def dir_hash(self, path):
+        path = Path(path).resolve()
+        with self.lock:
+            if path in self.dirs:
+                return self.dirs[path]
+        digest = hashlib.blake2b()
+        for file in sorted(file for file in path.rglob("*") if file.is_file()):
+            digest.update("{}\0{}\0".format(file.relative_to(path), self.tool_hash(file)).encode())
+        with self.lock:
+            self.dirs[path] = digest.hexdigest()
+        return self.dirs[path]
+
+    def action_path(self, key):
+        return self.cache_dir / "actions" / key[:2] / (key + ".json")
+
+    def object_path(self, digest):
+        return self.cache_dir / "objects" / digest[:2] / digest
+
+    # returns the entry of the action or None when it has to be run
+    def lookup(self, key):
+        action_path = self.action_path(key)
+        try:
+            with open(action_path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not all(self.object_path(output["hash"]).is_file() for output in entry["outputs"].values()):
+            return None
+        # hits are recorded in the mtime of the entry for the eviction
+        os.utime(action_path)
+        return entry
+
+    def restore(self, entry, dest_dir):
+        for name,output in entry["outputs"].items():
+            path = Path(dest_dir) / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = _tmp_path(path)
+            shutil.copyfile(self.object_path(output["hash"]), tmp_path)
+            os.chmod(tmp_path, output["mode"])
+            os.replace(tmp_path, path)
+
+    # keep the outputs of the action found in workdir under key
+    def store(self, key, action, workdir, result):
+        outputs = {}
+        for name in action.outputs:
+            path = Path(workdir) / name
+            if not path.is_file():
+                continue
+            digest = content_hash(path)
+            object_path = self.object_path(digest)
+            if object_path.exists():
+                # renewed, so that the evict of another build keeps it
+                os.utime(object_path)
+            else:
+                object_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = _tmp_path(object_path)
+                shutil.copyfile(path, tmp_path)
+                os.replace(tmp_path, object_path)
+            outputs[name] = {"hash": digest, "size": path.stat().st_size, "mode": path.stat().st_mode & 0o777}
+        action_path = self.action_path(key)
+        action_path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_json(action_path, {"outputs": outputs, "error": result.error})
+
+    # restore the outputs of the action in dest_dir, running it first when
+    # it is not in the cache
+    def run(self, action, dest_dir):
+        key = action_key(action, self)
+        entry = self.lookup(key)
+        if entry is not None:
+            with self.lock:
+                self.hits += 1
+            self.restore(entry, dest_dir)
+            return ActionResult(entry["error"], cached=True)
+
+        with self.lock:
+            self.misses += 1
+        (self.cache_dir / "tmp").mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=str(self.cache_dir / "tmp")) as workdir:
+            result = execute_action(action, workdir)
+            if not result.transient and not self.interrupted.is_set():
+                self.store(key, action, workdir, result)
+            _copy_outputs(action, workdir, dest_dir)
+        return result
+
+    # remove the least recently used actions until the objects of the
+    # remaining ones fit in max_bytes, then the objects no action refers to
+    def evict(self):
+        # the timestamps of the files lag behind the clock
+        start = time.time_ns() - EVICT_MARGIN_NS
+        entries = []
+        for action_path in (self.cache_dir / "actions").glob("*/*.json"):
+            try:
+                mtime = action_path.stat().st_mtime_ns
+                with open(action_path) as f:
+                    entries.append((mtime, action_path, json.load(f)))
+            except (OSError, ValueError):
+                continue
+
+        kept = set()
+        total = 0
+        for _,action_path,entry in sorted(entries, key=lambda entry: entry[0], reverse=True):
+            digests = {output["hash"]: output["size"] for output in entry["outputs"].values()}
+            size = sum(size for digest,size in digests.items() if digest not in kept)
+            if total + size > self.max_bytes:
+                action_path.unlink(missing_ok=True)
+                continue
+            kept.update(digests)
+            total += size
+
+        # the objects being written or stored since the scan of the actions
+        # (by another build sharing the cache) may belong to actions it missed
+        for object_path in (self.cache_dir / "objects").glob("*/*"):
+            if object_path.name in kept or ".tmp" in object_path.name:
+                continue
+            try:
+                if object_path.stat().st_mtime_ns >= start:
+                    continue
+            except FileNotFoundError:
+                continue
+            object_path.unlink(missing_ok=True)
+
+    def _write_json(self, path, value):
+        tmp_path = _tmp_path(path)
+        with open(tmp_path, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+
+# run the action in a scratch dir and copy its outputs to dest_dir, through
+# the cache when there is one
+def run_action(action, dest_dir, cache=None):
+    if cache is not None:
+        return cache.run(action, dest_dir)
+    with tempfile.TemporaryDirectory() as workdir:
+        result = execute_action(action, workdir)
+        _copy_outputs(action, workdir, dest_dir)
+    return result
+
+
+# returns a BuildCache for the --build-cache-dir, --build-cache-size and
+# --no-build-cache options
+def build_cache(args):
+    if args.no_build_cache:
+        return None
+    return BuildCache(args.build_cache_dir, args.build_cache_size << 20)
+
+
+def add_build_cache_arguments(parser):
+    parser.add_argument("--build-cache-dir", help="Directory of the cache of the compiled artifacts.", type=str, default=str(DEFAULT_BUILD_CACHE_DIR))
+    parser.add_argument("--build-cache-size", help="Size limit of the cache of the compiled artifacts in MiB.", type=int, default=DEFAULT_BUILD_CACHE_SIZE_MB)
+    parser.add_argument("--no-build-cache", help="Always run every step, without reading or updating the cache.", action='store_true')
@@ -0,0 +1,154 @@
+# Persistent cache of the samples parsed from the logs
+#
+# Every entry is a pickle file holding the samples of one log together with
+# the path of the log and the size, mtime and content hash of the log and of
+# the files read with it (the perf CSV file next to it), or their absence,
+# when it was parsed. The hashes are only computed once the files were parsed,
+# and a log that changed while it was parsed gets no entry. An entry is used
+# as long as these files are unchanged: when only the mtime differs (a file
+# was touched or copied) the content hash decides. Entries are evicted in least recently used order once the cache
+# exceeds its size cap.
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+CACHE_VERSION = 3
+DEFAULT_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "packtools"
+DEFAULT_CACHE_SIZE_MB = 512
+
+
+def content_hash(log_file):
+    digest = hashlib.blake2b()
+    with open(log_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# size, mtime and content hash (computed when needed) of a file, None when it
+# does not exist
+def _file_fingerprint(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": None}
+
+
+# size and mtime of a file fingerprint, None when the file does not exist
+def _stat_key(file_fingerprint):
+    if file_fingerprint is None:
+        return None
+    return file_fingerprint["size"], file_fingerprint["mtime"]
+
+
+# whether the files of fingerprint are the ones of the entry, the hashes of
+# the files whose mtime changed are computed
+def _same_files(paths, entry_files, fingerprint):
+    if len(entry_files) != len(fingerprint):
+        return False
+    for path,old,new in zip(paths, entry_files, fingerprint):
+        if old is None or new is None:
+            if old is not new:
+                return False
+            continue
+        if old["size"] != new["size"]:
+            return False
+        new["hash"] = old["hash"] if old["mtime"] == new["mtime"] else content_hash(path)
+        if new["hash"] != old["hash"]:
+            return False
+    return True
+
+
+# cache of the parsed logs in cache_dir, limited to max_bytes
+class LogCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE_MB << 20):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        # fingerprint of the logs looked up, reused when their entry is written
+        self.fingerprints = {}
+
+    # the entry of a log also depends on the parser (tag) reading it
+    def entry_path(self, log_file, tag):
+        name = "{}\0{}\0{}".format(CACHE_VERSION, tag, Path(log_file).resolve())
+        return self.cache_dir / (hashlib.sha256(name.encode()).hexdigest() + ".pickle")
+
+    # returns the cached samples of the log or None when it has to be parsed;
+    # sidecars are the other files the samples are read from
+    def get(self, log_file, tag='', sidecars=()):
+        entry_path = self.entry_path(log_file, tag)
+        paths = [log_file] + list(sidecars)
+        fingerprint = [_file_fingerprint(path) for path in paths]
+        self.fingerprints[entry_path] = fingerprint
+
+        try:
+            with open(entry_path, 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            entry = None
+
+        if entry is not None and _same_files(paths, entry["files"], fingerprint):
+            if any(old is not None and old["mtime"] != new["mtime"] for old,new in zip(entry["files"], fingerprint)):
+                self.put(log_file, entry["samples"], tag, sidecars)
+            else:
+                # hits are recorded in the mtime of the entry for the eviction
+                os.utime(entry_path)
+            return entry["samples"]
+        return None
+
+    # keep the samples parsed from the log and its sidecars, with the
+    # fingerprint taken by get; the content hashes are computed once the
+    # files were parsed (from the page cache), and nothing is kept when the
+    # files changed since get (run.sh appending to the log while it was
+    # parsed)
+    def put(self, log_file, samples, tag='', sidecars=()):
+        entry_path = self.entry_path(log_file, tag)
+        paths = [log_file] + list(sidecars)
+        current = [_file_fingerprint(path) for path in paths]
+        fingerprint = self.fingerprints.pop(entry_path, None)
+        if fingerprint is None:
+            fingerprint = current
+        elif [_stat_key(file_fingerprint) for file_fingerprint in fingerprint] != [_stat_key(file_fingerprint) for file_fingerprint in current]:
+            return
+        for path,file_fingerprint in zip(paths, fingerprint):
+            if file_fingerprint is not None and file_fingerprint["hash"] is None:
+                file_fingerprint["hash"] = content_hash(path)
+        entry = {"files": fingerprint, "path": str(Path(log_file).resolve()), "samples": samples}
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_suffix(".tmp{}".format(os.getpid()))
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+        self.evict()
+
+    # remove the least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        entries = []
+        for entry_path in self.cache_dir.glob("*.pickle"):
+            try:
+                stat = entry_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry_path))
+        total = sum(size for _,size,_ in entries)
+        for _,size,entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            total -= size
+
+
+# returns a LogCache for the --cache-dir, --cache-size and --no-cache options
+def log_cache(args):
+    if args.no_cache:
+        return None
+    return LogCache(args.cache_dir, args.cache_size << 20)
+
+
+def add_cache_arguments(parser):
+    parser.add_argument("--cache-dir", help="Directory of the cache of the parsed logs.", type=str, default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument("--cache-size", help="Size limit of the cache of the parsed logs in MiB.", type=int, default=DEFAULT_CACHE_SIZE_MB)
+    parser.add_argument("--no-cache", help="Always parse the logs, without reading or updating the cache.", action='store_true')
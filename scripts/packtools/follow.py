@@ -0,0 +1,151 @@
+# Follow logs while run.sh is still appending to them
+#
+# A LogFollower remembers how far a log was read and only tokenizes the
+# complete lines appended since then; a PerfCsvFollower does the same for the
+# perf CSV file the runner writes the counters of the log to. Running
+# statistics are kept with Welford's online algorithm, so no sample has to be
+# stored. The offsets, tokenizer states and statistics can be saved to a JSON
+# file to resume following after parse-log.py is restarted.
+
+import io
+import json
+import os
+from math import sqrt
+from pathlib import Path
+
+from packtools.logparse import tokenize_lines, TokenizerState, RUNNING
+from packtools.perfcsv import counted_values, PERF_CSV_SUFFIX, PERF_CSV_HEADER, EXECUTABLE, VALUE, ENABLED
+from packtools.stats import confidence_interval
+
+
+# online mean and variance of a series (Welford's algorithm)
+class Welford:
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def stddev(self):
+        if self.count < 2:
+            return float('nan')
+        return sqrt(self.m2 / (self.count - 1))
+
+    # half width of the 95% confidence interval of the mean
+    @property
+    def conf(self):
+        return float(confidence_interval(self.stddev, self.count))
+
+
+# complete lines appended to path after offset, returns the offset following
+# them, their text, and whether the file was truncated or replaced and read
+# from its start
+def read_appended_lines(path, offset):
+    try:
+        size = os.stat(path).st_size
+    except FileNotFoundError:
+        return offset, '', False
+    restarted = size < offset
+    if restarted:
+        offset = 0
+    if size == offset:
+        return offset, '', restarted
+
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+    # the last line may still be being written
+    end = data.rfind(b'\n') + 1
+    return offset + end, data[:end].decode(errors='replace'), restarted
+
+
+# reads the complete lines appended to a log since the previous poll
+class LogFollower:
+    def __init__(self, log_file, offset=0, state=None, executable=None):
+        self.log_file = Path(log_file)
+        self.offset = offset
+        self.state = state if state is not None else TokenizerState()
+        # executable of the last "Running" line, the next samples are its own
+        self.executable = executable
+
+    # returns the tokens of the lines appended since the last poll
+    def poll(self):
+        self.offset, text, restarted = read_appended_lines(self.log_file, self.offset)
+        # the log was truncated or replaced, follow it from the start
+        if restarted:
+            self.state = TokenizerState()
+            self.executable = None
+        tokens = list(tokenize_lines(io.StringIO(text), self.state))
+        for token, key, _ in tokens:
+            if token == RUNNING:
+                self.executable = key
+        return tokens
+
+    def to_json(self):
+        return {"offset": self.offset, "expect_sample": self.state.expect_sample, "collect_perf": self.state.collect_perf, "executable": self.executable}
+
+    @classmethod
+    def from_json(cls, log_file, saved):
+        state = TokenizerState()
+        state.expect_sample = saved["expect_sample"]
+        state.collect_perf = saved["collect_perf"]
+        return cls(log_file, saved["offset"], state, saved["executable"])
+
+
+# reads the counters appended to the perf CSV file of a log (see perfcsv.py),
+# where the runner writes them instead of the log
+class PerfCsvFollower:
+    def __init__(self, csv_file, offset=0):
+        self.log_file = Path(csv_file)
+        self.offset = offset
+
+    # returns the (executable, event, value) of the counted rows appended
+    # since the last poll
+    def poll(self):
+        self.offset, text, _ = read_appended_lines(self.log_file, self.offset)
+        counters = []
+        for line in text.splitlines():
+            fields = line.split(',', ENABLED)
+            if len(fields) <= ENABLED or line == PERF_CSV_HEADER.rstrip('\n'):
+                continue
+            for event, value in counted_values([fields[VALUE:]]).items():
+                counters.append((fields[EXECUTABLE], event, value))
+        return counters
+
+    def to_json(self):
+        return {"offset": self.offset}
+
+    @classmethod
+    def from_json(cls, csv_file, saved):
+        return cls(csv_file, saved["offset"])
+
+
+# save the followers (map from log file) and the statistics (map from a tuple
+# of strings to a Welford) to a JSON file
+def save_follow_state(state_path, followers, statistics):
+    saved = {
+        "followers": {str(log_file): follower.to_json() for log_file,follower in followers.items()},
+        "statistics": [list(key) + [stat.count, stat.mean, stat.m2] for key,stat in statistics.items()],
+    }
+    tmp_path = Path(str(state_path) + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(saved, f)
+    os.replace(tmp_path, state_path)
+
+
+# returns the followers and statistics saved by save_follow_state
+def load_follow_state(state_path):
+    with open(state_path, 'r') as f:
+        saved = json.load(f)
+    followers = {}
+    for log_file, follower in saved["followers"].items():
+        cls = PerfCsvFollower if log_file.endswith(PERF_CSV_SUFFIX) else LogFollower
+        followers[Path(log_file)] = cls.from_json(log_file, follower)
+    statistics = {tuple(stat[:-3]): Welford(*stat[-3:]) for stat in saved["statistics"]}
+    return followers, statistics
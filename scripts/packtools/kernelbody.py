@@ -0,0 +1,142 @@
+# Remove the body of the kernel of polybench .c files
+#
+# The lowering scripts link the kernel compiled from MLIR with the polybench
+# .c file of the benchmark, whose own kernel is turned into a declaration.
+# The source is read with a small C lexer: braces, parentheses and the kernel
+# name are only looked for outside of comments, string and character literals
+# and preprocessor lines, so braces in comments, strings or macros and a "{"
+# on the line of "void kernel_" are handled.
+
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# tokens of the lexer, in order of priority: comments, literals and
+# preprocessor lines (with their continuation lines) are skipped as a whole
+_token_re = re.compile(r"""
+      (?P<comment>//[^\n]*|/\*.*?\*/)
+    | (?P<literal>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+    | (?P<preprocessor>^[ \t]*\#(?:\\\n|[^\n])*)
+    | (?P<identifier>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<punctuation>[{}();])
+""", re.VERBOSE | re.DOTALL | re.MULTILINE)
+
+# result of strip_kernel_file
+STRIPPED = "stripped"
+NO_KERNEL = "no kernel"
+
+
+# (kind, text, start) of the tokens of source that matter to find the kernel
+def c_tokens(source):
+    for match in _token_re.finditer(source):
+        kind = match.lastgroup
+        if kind in ('comment', 'literal', 'preprocessor'):
+            continue
+        yield kind, match.group(), match.start()
+
+
+# offsets of the opening and closing braces of the body of the first
+# "void kernel_*" function defined in source, None if there is none
+def kernel_body_range(source):
+    tokens = c_tokens(source)
+    previous = None
+    for kind, text, _ in tokens:
+        if kind == 'identifier' and text.startswith("kernel_") and previous == "void":
+            body = _function_body(tokens)
+            if body is not None:
+                return body
+        previous = text
+    return None
+
+
+# braces of the body following the parameter list of a function, None when
+# it is only declared
+def _function_body(tokens):
+    parentheses = 0
+    depth = 0
+    start = None
+    for kind, text, offset in tokens:
+        if text == '(':
+            parentheses += 1
+        elif text == ')':
+            parentheses -= 1
+        elif text == ';' and parentheses == 0 and start is None:
+            return None
+        elif text == '{' and parentheses == 0:
+            if start is None:
+                start = offset
+            depth += 1
+        elif text == '}' and start is not None:
+            depth -= 1
+            if depth == 0:
+                return start, offset
+    return None
+
+
+# returns the source with the body of the kernel replaced by ";" and the
+# (start, end) range of source that was replaced, so that the declaration is
+# source[:start] + ";\n" + source[end:]; None if no kernel is defined. A "{"
+# on its own line is removed with its line, as is the rest of the line of the
+# closing brace when blank.
+def remove_kernel_body(source):
+    body = kernel_body_range(source)
+    if body is None:
+        return None
+    open_brace, close_brace = body
+    start = open_brace
+    if source[source.rfind('\n', 0, open_brace) + 1:open_brace].strip() == '':
+        start = len(source[:open_brace].rstrip())
+    line_end = source.find('\n', close_brace)
+    if line_end == -1:
+        line_end = len(source)
+    end = line_end + 1 if source[close_brace + 1:line_end].strip() == '' else close_brace + 1
+    return source[:start] + ";\n" + source[end:], (start, min(end, len(source)))
+
+
+# source without the "static" line above "void kernel_", as the lowering
+# scripts remove it with sed (doitgen has none)
+def remove_kernel_static(source):
+    lines = source.splitlines(keepends=True)
+    for index, line in enumerate(lines):
+        if "void kernel_" not in line:
+            continue
+        for static in (index - 1, index):
+            if static >= 0 and "static" in lines[static]:
+                return "".join(lines[:static] + lines[static + 1:])
+    return source
+
+
+# rewrite a file without the body of its kernel, returns STRIPPED or
+# NO_KERNEL (the file is then left unchanged)
+def strip_kernel_file(path):
+    path = Path(path)
+    stripped = remove_kernel_body(path.read_text())
+    if stripped is None:
+        return NO_KERNEL
+    path.write_text(stripped[0])
+    return STRIPPED
+
+
+# rewrite the files in a pool of jobs workers, returns the result of every
+# file in order
+def strip_kernel_files(paths, jobs=1):
+    paths = [str(path) for path in paths]
+    if jobs <= 1 or len(paths) <= 1:
+        return [strip_kernel_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(strip_kernel_file, paths, chunksize=max(1, len(paths) // (4 * jobs))))
+
+
+# files of a polybench benchmark_list, relative to the polybench dir
+def benchmark_list_files(benchmark_list, polybench_dir):
+    with open(benchmark_list) as f:
+        return [Path(polybench_dir) / line.strip() for line in f if line.strip() != '']
+
+
+# .c files of a directory tree mentioning a kernel
+def kernel_files(tree):
+    files = []
+    for path in sorted(Path(tree).rglob("*.c")):
+        if path.is_file() and "kernel_" in path.read_text(errors='replace'):
+            files.append(path)
+    return files
@@ -0,0 +1,79 @@
+# Streaming tokenizer for the logs written by the run.sh scripts
+#
+# The polybench-evaluation logs contain, for every execution, a "Running" line
+# followed by the execution time printed by polybench and optionally the output
+# of perf stat. The packing-selection-evaluation log contains the output of
+# Google Benchmark ("Running" line and mean/stddev aggregates) and optionally
+# the output of perf stat. Both formats are tokenized in a single pass.
+
+import re
+
+# tokens yielded by tokenize_log as (kind, key, value)
+RUNNING = "running"      # key: executable path as printed in the log
+SAMPLE = "sample"        # value: execution time in seconds (line after "Running")
+STATISTIC = "statistic"  # key: "mean" or "stddev", value: fields of the line
+COUNTER = "counter"      # key: perf counter name, value: counter value
+ERROR = "error"          # execution aborted or crashed
+
+_error_re = re.compile(r"abort|segmentation fault", re.IGNORECASE)
+
+
+# tokenizer state kept between chunks of a log read while it is being written
+class TokenizerState:
+    def __init__(self):
+        self.expect_sample = False
+        self.collect_perf = False
+
+
+def tokenize_log(log_file):
+    with open(log_file, 'r') as f:
+        yield from tokenize_lines(f)
+
+
+# tokenize complete lines, continuing from state when given
+def tokenize_lines(lines, state=None):
+    expect_sample = state.expect_sample if state is not None else False
+    collect_perf = state.collect_perf if state is not None else False
+    for line in lines:
+        # skip empty lines
+        if line.isspace():
+            continue
+
+        if _error_re.search(line):
+            yield ERROR, None, None
+            continue
+
+        if "Running" in line:
+            expect_sample = True
+            collect_perf = False
+            yield RUNNING, line.split()[1], None
+            continue
+
+        # execution time printed by polybench right after "Running"
+        if expect_sample:
+            expect_sample = False
+            try:
+                yield SAMPLE, None, float(line)
+                continue
+            except ValueError:
+                pass
+
+        # start of perf information
+        if "Performance counter stats" in line:
+            collect_perf = True
+        # end of perf information
+        elif "seconds time elapsed" in line:
+            collect_perf = False
+        elif collect_perf:
+            fields = line.split(None, 2)
+            # "<not counted>" and "<not supported>" counters have no value
+            if not fields[0].startswith('<'):
+                yield COUNTER, fields[1], int(fields[0].replace(',', ''))
+        elif "mean" in line:
+            yield STATISTIC, "mean", line.split()
+        elif "stddev" in line:
+            yield STATISTIC, "stddev", line.split()
+
+    if state is not None:
+        state.expect_sample = expect_sample
+        state.collect_perf = collect_perf
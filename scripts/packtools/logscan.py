@@ -0,0 +1,279 @@
+# Memory-mapped scanner for large logs written by the run.sh scripts
+#
+# tokenize_log builds a str for every line of the log, although most of the
+# lines are perf stat or Google Benchmark noise. The scanner maps the log in
+# memory and jumps with bytes.find from one "Running" line to the next, and
+# inside an execution to its execution time, its perf blocks and its Google
+# Benchmark aggregates; the counters of a perf block are read with a single
+# compiled pattern. The values are collected in typed arrays, one entry per
+# execution, and returned as NumPy arrays. The pages already scanned are
+# released, so memory and time follow the number of executions rather than
+# the number of lines.
+#
+# The lines are interpreted as by tokenize_log (see logparse.py). The rare
+# executions with an error line (abort, segmentation fault) are read line
+# by line.
+
+import mmap
+import re
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+import numpy as np
+
+# counted lines of a perf block as (value, counter name), "<not counted>" and
+# "<not supported>" counters have no value
+_counter_re = re.compile(rb"^[ \t]*([0-9][0-9,]*)[ \t]+(\S+)", re.MULTILINE)
+# lines with these (in any case) are errors
+_ERROR_MARKERS = (b"abort", b"segmentation fault")
+
+# bytes read between two releases of the scanned pages, and size of the
+# chunks searched for errors
+_RELEASE_BYTES = 16 << 20
+
+# one entry per execution ("Running" line) of the log:
+#   executables  executable names as printed, in order of first appearance
+#   runs         index in executables of the executable of each execution
+#   samples      execution time printed by polybench in seconds, NaN if none
+#   means        Google Benchmark mean CPU time, NaN if none
+#   stddevs      Google Benchmark stddev of the CPU time, NaN if none
+#   iterations   Google Benchmark iterations of the mean, -1 if none
+#   errors       True if the execution aborted or crashed
+#   counters     map from perf counter to its values, NaN when missing
+ScannedLog = namedtuple("ScannedLog", ["executables", "runs", "samples", "means", "stddevs", "iterations", "errors", "counters"])
+
+
+class _Columns:
+    def __init__(self):
+        self.executables = []
+        self.executable_index = {}
+        self.runs = array('q')
+        self.samples = array('d')
+        self.means = array('d')
+        self.stddevs = array('d')
+        self.iterations = array('q')
+        self.errors = array('b')
+        self.counters = {}
+
+    def add_run(self, executable):
+        index = self.executable_index.get(executable)
+        if index is None:
+            index = len(self.executables)
+            self.executable_index[executable] = index
+            self.executables.append(executable)
+        self.runs.append(index)
+        self.samples.append(np.nan)
+        self.means.append(np.nan)
+        self.stddevs.append(np.nan)
+        self.iterations.append(-1)
+        self.errors.append(0)
+
+    # counters are (value, name) pairs of the current execution, kept as the
+    # rows and values they were set to
+    def set_counters(self, counters):
+        row = len(self.runs) - 1
+        for value, name in counters:
+            counter = self.counters.get(name)
+            if counter is None:
+                counter = self.counters[name] = (array('q'), array('d'))
+            counter[0].append(row)
+            counter[1].append(int(value.replace(b',', b'')))
+
+    def to_scanned_log(self):
+        count = len(self.runs)
+        counters = {}
+        for name,(rows, values) in self.counters.items():
+            column = np.full(count, np.nan)
+            # a counter set twice for the same execution keeps its last value
+            column[np.frombuffer(rows, dtype=np.int64)] = np.frombuffer(values, dtype=np.float64)
+            counters[name.decode()] = column
+        return ScannedLog(
+            self.executables,
+            np.frombuffer(self.runs, dtype=np.int64),
+            np.frombuffer(self.samples, dtype=np.float64),
+            np.frombuffer(self.means, dtype=np.float64),
+            np.frombuffer(self.stddevs, dtype=np.float64),
+            np.frombuffer(self.iterations, dtype=np.int64),
+            np.frombuffer(self.errors, dtype=np.int8).astype(bool),
+            counters)
+
+
+# drop the pages of data before end from the memory of the process, they are
+# read again from the file if needed
+def _release(data, start, end):
+    end -= end % mmap.PAGESIZE
+    if hasattr(data, 'madvise') and end > start:
+        data.madvise(mmap.MADV_DONTNEED, start, end - start)
+    return max(start, end)
+
+
+def _line_end(data, pos, end):
+    line_end = data.find(b'\n', pos, end)
+    return line_end if line_end != -1 else end
+
+
+# start of the lines matching the (case insensitive) error pattern, searched
+# in lower case chunks of the log
+def _error_lines(data):
+    size = len(data)
+    overlap = max(len(marker) for marker in _ERROR_MARKERS) - 1
+    lines = set()
+    released = 0
+    for chunk_start in range(0, size, _RELEASE_BYTES):
+        chunk = data[chunk_start:chunk_start + _RELEASE_BYTES + overlap].lower()
+        for marker in _ERROR_MARKERS:
+            pos = chunk.find(marker)
+            while pos != -1 and pos < _RELEASE_BYTES:
+                lines.add(data.rfind(b'\n', 0, chunk_start + pos) + 1)
+                pos = chunk.find(marker, pos + 1)
+        released = _release(data, released, chunk_start + _RELEASE_BYTES)
+    return sorted(lines)
+
+
+# scan a polybench-evaluation or packing-selection-evaluation log; with
+# google_benchmark, the mean and stddev aggregates are read and the counters
+# of an execution are dropped once it reported an error
+def scan_log(log_file, google_benchmark=False):
+    columns = _Columns()
+    with open(log_file, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files cannot be mapped
+            return columns.to_scanned_log()
+    with data:
+        _scan(data, columns, google_benchmark)
+    return columns.to_scanned_log()
+
+
+# start of the next "Running" line from pos, -1 if none; an error line
+# mentioning "Running" is an error
+def _next_running(data, pos, errors):
+    pos = data.find(b"Running", pos)
+    while pos != -1:
+        start = data.rfind(b'\n', 0, pos) + 1
+        error_index = bisect_left(errors, start)
+        if error_index == len(errors) or errors[error_index] != start:
+            return start
+        pos = data.find(b"Running", _line_end(data, pos, len(data)))
+    return -1
+
+
+def _scan(data, columns, google_benchmark):
+    size = len(data)
+    errors = _error_lines(data)
+    released = 0
+    start = _next_running(data, 0, errors)
+    while start != -1:
+        end = _line_end(data, start, size)
+        columns.add_run(data[start:end].split()[1].decode())
+
+        # the execution ends at the next "Running" line
+        next_start = _next_running(data, end, errors)
+        segment_end = next_start if next_start != -1 else size
+        error_index = bisect_left(errors, end)
+        if error_index < len(errors) and errors[error_index] < segment_end:
+            _scan_lines(data, end + 1, segment_end, columns, google_benchmark, errors)
+        else:
+            _scan_execution(data, end + 1, segment_end, columns, google_benchmark)
+
+        if segment_end - released > _RELEASE_BYTES:
+            released = _release(data, released, segment_end)
+        start = next_start
+
+
+# read an execution without error lines, from the line after "Running" to end
+def _scan_execution(data, pos, end, columns, google_benchmark):
+    # execution time printed by polybench on the first non-empty line
+    while pos < end:
+        line_end = _line_end(data, pos, end)
+        line = data[pos:line_end]
+        if line.isspace() or len(line) == 0:
+            pos = line_end + 1
+            continue
+        try:
+            columns.samples[-1] = float(line)
+            pos = line_end + 1
+        except ValueError:
+            pass
+        break
+
+    while pos < end:
+        block = data.find(b"Performance counter stats", pos, end)
+        block_start = data.rfind(b'\n', 0, block) + 1 if block != -1 else end
+        if google_benchmark:
+            _scan_statistics(data, pos, block_start, columns)
+        if block == -1:
+            return
+        pos = _line_end(data, block, end) + 1
+        # the block ends at its "seconds time elapsed" line, or where another
+        # block starts
+        next_block = data.find(b"Performance counter stats", pos, end)
+        limit = data.rfind(b'\n', 0, next_block) + 1 if next_block != -1 else end
+        elapsed = data.find(b"seconds time elapsed", pos, limit)
+        block_end = data.rfind(b'\n', 0, elapsed) + 1 if elapsed != -1 else limit
+        columns.set_counters(_counter_re.findall(data[pos:block_end]))
+        pos = _line_end(data, elapsed, end) + 1 if elapsed != -1 else limit
+
+
+# Google Benchmark mean and stddev lines between pos and end
+def _scan_statistics(data, pos, end, columns):
+    for key in (b"mean", b"stddev"):
+        found = data.find(key, pos, end)
+        while found != -1:
+            start = data.rfind(b'\n', 0, found) + 1
+            line_end = _line_end(data, found, end)
+            _read_statistic(data[start:line_end], columns)
+            found = data.find(key, line_end, end)
+
+
+def _read_statistic(line, columns):
+    if b"seconds time elapsed" in line:
+        return
+    fields = line.split()
+    if b"mean" in line:
+        columns.means[-1] = float(fields[3])
+        columns.iterations[-1] = int(fields[5])
+    elif b"stddev" in line:
+        columns.stddevs[-1] = float(fields[3])
+
+
+# read an execution line by line like tokenize_log, from the line after
+# "Running" to end
+def _scan_lines(data, pos, end, columns, google_benchmark, errors):
+    expect_sample = True
+    collect_perf = False
+    error_found = False
+    while pos < end:
+        line_end = _line_end(data, pos, end)
+        line = data[pos:line_end]
+        line_start = pos
+        pos = line_end + 1
+        if line.isspace() or len(line) == 0:
+            continue
+
+        error_index = bisect_left(errors, line_start)
+        if error_index < len(errors) and errors[error_index] == line_start:
+            error_found = True
+            columns.errors[-1] = 1
+            continue
+
+        if expect_sample:
+            expect_sample = False
+            try:
+                columns.samples[-1] = float(line)
+                continue
+            except ValueError:
+                pass
+
+        if b"Performance counter stats" in line:
+            collect_perf = True
+        elif b"seconds time elapsed" in line:
+            collect_perf = False
+        elif collect_perf:
+            fields = line.split(None, 2)
+            if not fields[0].startswith(b'<') and not (google_benchmark and error_found):
+                columns.set_counters([(fields[0], fields[1])])
+        elif google_benchmark and (b"mean" in line or b"stddev" in line):
+            _read_statistic(line, columns)
@@ -0,0 +1,131 @@
+# Execution times and perf counters of the logs of the polybench evaluation
+#
+# A log written by run.sh (or the JSON-lines records written alongside it) is
+# read into the samples of every benchmark, and summarized into the mean and
+# confidence interval of each of them; used by parse-log.py and by the tile
+# size search of tile-search.py.
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from packtools.logscan import scan_log
+from packtools.stats import sample_matrix, summarize
+from packtools.records import read_records, benchmark_name, RECORDS_SUFFIX
+from packtools.perfcsv import read_perf_csv, perf_csv_path, perf_csv_warnings, counted_values_by_executable
+
+
+# parse polybench and perf results with a single scan of the mapped log, or
+# read the JSON-lines records written alongside it by run.sh
+def read_log_file(log_file):
+    if Path(log_file).suffix == RECORDS_SUFFIX:
+        return read_records_file(log_file)
+
+    scanned = scan_log(log_file)
+    # executables with the same benchmark name are merged
+    benchmarks = list(dict.fromkeys(benchmark_name(executable) for executable in scanned.executables))
+    benchmark_index = {benchmark: idx for idx,benchmark in enumerate(benchmarks)}
+    run_benchmarks = np.array([benchmark_index[benchmark_name(executable)] for executable in scanned.executables], dtype=np.int64)[scanned.runs]
+
+    # map from benchmark to an array of execution times
+    runtime_map = {}
+    # map from benchmark to perf counter to an array of counter values
+    perf_counter_map = {}
+    for idx,benchmark in enumerate(benchmarks):
+        rows = run_benchmarks == idx
+        samples = scanned.samples[rows]
+        runtime_map[benchmark] = samples[~np.isnan(samples)]*1000
+        perf_counter_map[benchmark] = {}
+        for counter,values in scanned.counters.items():
+            values = values[rows]
+            values = values[~np.isnan(values)]
+            if len(values) > 0:
+                perf_counter_map[benchmark][counter] = values.astype(np.int64)
+
+    # counters written by perf stat -x, next to the log by the runner
+    perf_csv = perf_csv_path(log_file)
+    if perf_csv.exists():
+        read_perf_csv_counters(perf_csv, runtime_map, perf_counter_map)
+        for benchmark in runtime_map:
+            runtime_map[benchmark] = np.asarray(runtime_map[benchmark], dtype=float)
+            for counter in perf_counter_map[benchmark]:
+                perf_counter_map[benchmark][counter] = np.array(perf_counter_map[benchmark][counter])
+
+    return runtime_map, perf_counter_map
+
+
+# add the counted values of a perf CSV file to perf_counter_map, multiplexed
+# and not counted events are reported on stderr
+def read_perf_csv_counters(perf_csv, runtime_map, perf_counter_map):
+    columns = read_perf_csv(perf_csv)
+    for warning in perf_csv_warnings(columns, perf_csv.name):
+        print(warning, file=sys.stderr)
+    for (executable, counter),values in counted_values_by_executable(columns).items():
+        # same benchmark name as in the "Running" lines of the log
+        benchmark = benchmark_name(executable)
+        if benchmark not in runtime_map:
+            runtime_map[benchmark] = []
+            perf_counter_map[benchmark] = {}
+        perf_counter_map[benchmark][counter] = list(perf_counter_map[benchmark].get(counter, [])) + [int(value) for value in values]
+
+
+# samples of the JSON-lines records of a log, as returned by read_log_file
+def read_records_file(records_file):
+    columns, counters = read_records(records_file)
+    runtime_map = {}
+    perf_counter_map = {}
+    benchmarks = columns["benchmark"]
+    for benchmark in dict.fromkeys(benchmarks):
+        rows = benchmarks == benchmark
+        times = columns["runtime"][rows]
+        runtime_map[benchmark] = times[~np.isnan(times)]
+        perf_counter_map[benchmark] = {}
+        for counter,values in counters.items():
+            values = values[rows]
+            values = values[~np.isnan(values)].astype(np.int64)
+            if len(values) > 0:
+                perf_counter_map[benchmark][counter] = values
+    return runtime_map, perf_counter_map
+
+
+# summarize polybench results, returns the mean and confidence interval maps
+# and the smallest number of iterations run by a benchmark
+def runtime_statistics(runtime_map):
+    benchmarks = sorted(runtime_map.keys())
+    stats = summarize(sample_matrix([runtime_map[benchmark] for benchmark in benchmarks]))
+
+    benchmark_mean_time_map = dict(zip(benchmarks, stats.mean))
+    benchmark_confidence_map = dict(zip(benchmarks, stats.conf))
+    iterations = int(stats.count.min()) if len(benchmarks) > 0 else -1
+
+    return benchmark_mean_time_map, benchmark_confidence_map, iterations
+
+
+# summarize perf results of all benchmarks and counters at once
+def perf_statistics(perf_counter_map):
+    series = [(benchmark, counter) for benchmark in sorted(perf_counter_map.keys()) for counter in sorted(perf_counter_map[benchmark].keys())]
+    stats = summarize(sample_matrix([perf_counter_map[benchmark][counter] for benchmark,counter in series]))
+
+    perf_mean_map = {}
+    perf_confidence_map = {}
+    for (benchmark,counter),mean,conf in zip(series, stats.mean, stats.conf):
+        if benchmark not in perf_mean_map:
+            perf_mean_map[benchmark] = {}
+            perf_confidence_map[benchmark] = {}
+        perf_mean_map[benchmark][counter] = mean
+        perf_confidence_map[benchmark][counter] = conf
+
+    return perf_mean_map, perf_confidence_map
+
+
+# summarize execution times and perf counters of a log
+def log_statistics(runtime_map, perf_counter_map):
+    mean_map, confidence_map, iterations = runtime_statistics(runtime_map)
+    perf_mean_map, perf_confidence_map = perf_statistics(perf_counter_map)
+    return mean_map, confidence_map, iterations, perf_mean_map, perf_confidence_map
+
+
+# parse execution times and perf counters of a log, reading it only once
+def parse_log_file(log_file):
+    return log_statistics(*read_log_file(log_file))
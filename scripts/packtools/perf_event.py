@@ -0,0 +1,221 @@
+# Launch a binary with perf counters opened in process (perf_event_open)
+#
+# Instead of wrapping every execution in perf stat, the runner starts the
+# binary through a shell waiting on a pipe, opens the counter groups on the
+# shell with perf_event_open (through ctypes), and lets it exec the binary.
+# The counters are enabled on exec, so only the binary is measured, and read
+# once it exited. The counters are returned as the rows of perf stat -x, (see
+# perfcsv.py) so they end in the same perf CSV files and records.
+
+import ctypes
+import errno
+import os
+import platform
+import struct
+import subprocess
+
+PERF_TYPE_HARDWARE = 0
+PERF_TYPE_RAW = 4
+
+PERF_FORMAT_TOTAL_TIME_ENABLED = 1 << 0
+PERF_FORMAT_TOTAL_TIME_RUNNING = 1 << 1
+PERF_FORMAT_GROUP = 1 << 3
+
+# bits of the flags of perf_event_attr
+ATTR_DISABLED = 1 << 0
+ATTR_EXCLUDE_KERNEL = 1 << 5
+ATTR_EXCLUDE_HV = 1 << 6
+ATTR_ENABLE_ON_EXEC = 1 << 12
+
+# encodings of the events of run.sh -p; the raw events are the Skylake /
+# Cascade Lake ones (event | umask << 8) that perf stat resolves by name
+EVENTS = {
+    "cycles": (PERF_TYPE_HARDWARE, 0),
+    "instructions": (PERF_TYPE_HARDWARE, 1),
+    "mem_load_retired.l1_miss": (PERF_TYPE_RAW, 0x08d1),
+    "mem_load_retired.l2_miss": (PERF_TYPE_RAW, 0x10d1),
+    "mem_load_retired.l3_miss": (PERF_TYPE_RAW, 0x20d1),
+    "dtlb_load_misses.stlb_hit": (PERF_TYPE_RAW, 0x2008),
+    "dtlb_load_misses.miss_causes_a_walk": (PERF_TYPE_RAW, 0x0108),
+}
+
+_SYSCALL_NUMBERS = {"x86_64": 298, "aarch64": 241}
+
+# errors of perf_event_open for events the machine cannot count, which perf
+# stat reports as <not supported>
+NOT_SUPPORTED_ERRORS = (errno.ENOENT, errno.EOPNOTSUPP, errno.EINVAL, errno.ENODEV, errno.ENOSYS)
+
+
+# shell the binary is started from: it waits for a line on its stdin (the go
+# pipe) before replacing itself with the binary, so that the counters opened
+# on its pid are enabled by the exec of the binary; subprocess starts it
+# safely from the threads of the runner, unlike os.fork
+GO_WRAPPER = ["/bin/sh", "-c", 'read go && exec "$@" < /dev/null; exit 127', "sh"]
+
+
+class PerfEventAttr(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_uint32),
+        ("size", ctypes.c_uint32),
+        ("config", ctypes.c_uint64),
+        ("sample_period", ctypes.c_uint64),
+        ("sample_type", ctypes.c_uint64),
+        ("read_format", ctypes.c_uint64),
+        ("flags", ctypes.c_uint64),
+        ("wakeup_events", ctypes.c_uint32),
+        ("bp_type", ctypes.c_uint32),
+        ("config1", ctypes.c_uint64),
+        ("config2", ctypes.c_uint64),
+        ("branch_sample_type", ctypes.c_uint64),
+        ("sample_regs_user", ctypes.c_uint64),
+        ("sample_stack_user", ctypes.c_uint32),
+        ("clockid", ctypes.c_int32),
+        ("sample_regs_intr", ctypes.c_uint64),
+        ("aux_watermark", ctypes.c_uint32),
+        ("sample_max_stack", ctypes.c_uint16),
+        ("reserved", ctypes.c_uint16),
+    ]
+
+
+_libc = ctypes.CDLL(None, use_errno=True)
+
+
+# split a perf stat -e group list ("{a,b},{c}") into lists of event names
+def parse_event_groups(perf_events):
+    groups = []
+    for group in perf_events.replace('},{', '}\0{').split('\0'):
+        groups.append([event for event in group.strip('{}').split(',') if event != ''])
+    return groups
+
+
+# encoding of an event name, or of a raw event given as r<hex> like perf
+def event_encoding(event):
+    if event in EVENTS:
+        return EVENTS[event]
+    if event.startswith('r'):
+        try:
+            return PERF_TYPE_RAW, int(event[1:], 16)
+        except ValueError:
+            pass
+    raise ValueError("Unknown perf event {}".format(event))
+
+
+def perf_event_open(attr, pid, cpu=-1, group_fd=-1, flags=0):
+    number = _SYSCALL_NUMBERS.get(platform.machine())
+    if number is None:
+        raise OSError(errno.ENOSYS, "perf_event_open is not supported on {}".format(platform.machine()))
+    fd = _libc.syscall(number, ctypes.byref(attr), pid, cpu, group_fd, flags)
+    if fd < 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+    return fd
+
+
+# open an event on pid, counting only user space when perf_event_paranoid
+# forbids counting the kernel too (perf stat falls back the same way); None
+# when the event cannot be counted on this machine
+def open_event(event, pid, leader):
+    attr = PerfEventAttr()
+    attr.type, attr.config = event_encoding(event)
+    attr.size = ctypes.sizeof(PerfEventAttr)
+    attr.read_format = PERF_FORMAT_GROUP | PERF_FORMAT_TOTAL_TIME_ENABLED | PERF_FORMAT_TOTAL_TIME_RUNNING
+    attr.flags = ATTR_EXCLUDE_HV
+    # the leader enables the whole group when the child execs
+    if leader == -1:
+        attr.flags |= ATTR_DISABLED | ATTR_ENABLE_ON_EXEC
+    try:
+        return perf_event_open(attr, pid, -1, leader)
+    except OSError as error:
+        if error.errno in NOT_SUPPORTED_ERRORS:
+            return None
+        if error.errno not in (errno.EACCES, errno.EPERM):
+            raise
+    attr.flags |= ATTR_EXCLUDE_KERNEL
+    try:
+        return perf_event_open(attr, pid, -1, leader)
+    except OSError as error:
+        if error.errno not in (errno.EACCES, errno.EPERM) + NOT_SUPPORTED_ERRORS:
+            raise
+        return None
+
+
+# open the groups of events on pid, returns a list of (events, fds) with the
+# counters disabled until pid calls exec; the fd of an event that cannot be
+# counted is None, and the first event opened leads the group
+def open_groups(groups, pid):
+    opened = []
+    try:
+        for events in groups:
+            fds = []
+            opened.append((events, fds))
+            for event in events:
+                fds.append(open_event(event, pid, group_leader(fds)))
+    except (OSError, ValueError):
+        close_groups(opened)
+        raise
+    return opened
+
+
+# fd of the leader of a group, -1 when no event of the group was opened
+def group_leader(fds):
+    return next((fd for fd in fds if fd is not None), -1)
+
+
+def close_groups(opened):
+    for _, fds in opened:
+        for fd in fds:
+            if fd is not None:
+                os.close(fd)
+
+
+# rows of perf stat -x, (value, unit, event, run time, enabled percentage);
+# multiplexed values are scaled as perf stat does, and the events that could
+# not be opened are "<not supported>"
+def read_groups(opened):
+    rows = []
+    for events, fds in opened:
+        values = []
+        enabled = running = 0
+        if group_leader(fds) != -1:
+            counted = sum(1 for fd in fds if fd is not None)
+            data = os.read(group_leader(fds), 8 * (3 + counted))
+            count, enabled, running = struct.unpack_from('QQQ', data)
+            values = list(struct.unpack_from('{}Q'.format(count), data, 24))
+        for event, fd in zip(events, fds):
+            if fd is None:
+                rows.append(["<not supported>", "", event, "0", "100.00"])
+            elif running == 0:
+                rows.append(["<not counted>", "", event, "0", "0.00"])
+            else:
+                value = values.pop(0)
+                scaled = round(value * enabled / running) if running < enabled else value
+                rows.append([str(scaled), "", event, str(running), "{:.2f}".format(100.0 * running / enabled)])
+    return rows
+
+
+# run command pinned to core with the counter groups, returns its exit code,
+# its output (stdout and stderr) and the rows of the counters
+def run_with_counters(command, groups, core=None):
+    go_read, go_write = os.pipe()
+    try:
+        process = subprocess.Popen(GO_WRAPPER + list(command), stdin=go_read, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    finally:
+        os.close(go_read)
+    try:
+        if core is not None:
+            os.sched_setaffinity(process.pid, {core})
+        opened = open_groups(groups, process.pid)
+    except (OSError, ValueError):
+        # the wrapper exits without exec when the pipe is closed
+        os.close(go_write)
+        process.communicate()
+        raise
+    os.write(go_write, b'1\n')
+    os.close(go_write)
+
+    try:
+        output, _ = process.communicate()
+        rows = read_groups(opened)
+    finally:
+        close_groups(opened)
+    return process.returncode, output, rows
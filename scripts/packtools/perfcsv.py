@@ -0,0 +1,135 @@
+# Machine-readable perf stat output (perf stat -x,)
+#
+# The runners call perf stat -x, -o <file> and append its lines to a CSV file
+# next to the log (x.log -> x.perf.csv), prefixed by the executable, the
+# iteration and the core of the execution:
+#   executable,iteration,core,value,unit,event,run_time,enabled
+# value is kept as printed by perf, so "<not counted>" and "<not supported>"
+# remain visible, and enabled is the percentage of the run time the counter
+# was scheduled on the PMU (below 100 when counters are multiplexed, perf
+# then scales the value).
+
+import numpy as np
+from pathlib import Path
+
+from packtools.records import RECORDS_SUFFIX
+
+PERF_CSV_SUFFIX = '.perf.csv'
+PERF_CSV_HEADER = "executable,iteration,core,value,unit,event,run_time,enabled\n"
+
+# columns of a perf CSV file
+EXECUTABLE, ITERATION, CORE, VALUE, UNIT, EVENT, RUN_TIME, ENABLED = range(8)
+
+
+def perf_csv_path(log_file):
+    log_file = Path(log_file)
+    return log_file.with_name(log_file.stem + PERF_CSV_SUFFIX)
+
+
+# files the parse-log.py scripts read with a log, for the cache of the parsed
+# logs: its perf CSV file; the JSON-lines records carry their own counters
+def log_sidecars(log_file):
+    if Path(log_file).suffix == RECORDS_SUFFIX:
+        return []
+    return [perf_csv_path(log_file)]
+
+
+def perf_stat_command(perf_events, output_path):
+    return ["perf", "stat", "-x,", "-o", str(output_path), "-e", perf_events]
+
+
+# counter lines written by perf stat -x, -o (without comments and empty lines),
+# as lists of value, unit, event, run time and enabled percentage
+def read_perf_output(output_path):
+    rows = []
+    with open(output_path, 'r') as f:
+        for line in f:
+            if line.startswith('#') or line.isspace():
+                continue
+            fields = line.rstrip('\n').split(',')
+            fields += [''] * (5 - len(fields))
+            rows.append(fields[:5])
+    return rows
+
+
+# append the counters of one execution to a perf CSV file
+def append_perf_csv(csv_path, executable, iteration, core, rows):
+    csv_path = Path(csv_path)
+    write_header = not csv_path.exists()
+    with open(csv_path, 'a') as f:
+        if write_header:
+            f.write(PERF_CSV_HEADER)
+        for row in rows:
+            f.write(",".join([Path(executable).name, str(iteration), str(core)] + row) + "\n")
+
+
+# map from counter name to the value of the counted events of rows
+def counted_values(rows):
+    return {row[2]: int(float(row[0])) for row in rows if not row[0].startswith('<')}
+
+
+# read a perf CSV file at once, returns a map from column name to a NumPy
+# array: executable, event (text), iteration, core (int), value (NaN when
+# not counted or not supported), enabled (percentage, NaN when unknown) and
+# status (the "<not counted>" and "<not supported>" markers, '' if counted)
+def read_perf_csv(csv_path):
+    with open(csv_path, 'r') as f:
+        lines = f.read().splitlines()[1:]
+    if len(lines) == 0:
+        table = np.empty((0, 8), dtype=str)
+    else:
+        table = np.array([line.split(',', 7) for line in lines])
+
+    value_text = table[:, VALUE]
+    status = np.where(np.char.startswith(value_text, '<'), value_text, '')
+    counted = status == ''
+    values = np.full(len(table), np.nan)
+    values[counted] = value_text[counted].astype(float)
+    enabled_text = table[:, ENABLED]
+    enabled = np.full(len(table), np.nan)
+    known = enabled_text != ''
+    enabled[known] = enabled_text[known].astype(float)
+
+    return {
+        "executable": table[:, EXECUTABLE],
+        "event": table[:, EVENT],
+        "iteration": table[:, ITERATION].astype(np.int64),
+        "core": table[:, CORE].astype(np.int64),
+        "value": values,
+        "enabled": enabled,
+        "status": status,
+    }
+
+
+# map from (executable, event) to the array of its counted values, in the
+# order of the file
+def counted_values_by_executable(columns):
+    counted = columns["status"] == ''
+    keys = np.char.add(np.char.add(columns["executable"][counted], ','), columns["event"][counted])
+    values = columns["value"][counted]
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(unique_keys) + 1))
+    grouped = {}
+    for idx,key in enumerate(unique_keys):
+        executable, event = str(key).split(',', 1)
+        grouped[(executable, event)] = values[order[bounds[idx]:bounds[idx+1]]]
+    return grouped
+
+
+# lines describing the counters of a perf CSV file that were not always
+# counted or were multiplexed, to be printed by the parsers
+def perf_csv_warnings(columns, name):
+    warnings = []
+    events = columns["event"]
+    counted = columns["status"] == ''
+    for event in dict.fromkeys(events):
+        rows = events == event
+        not_counted = int(np.count_nonzero(~counted[rows]))
+        enabled = columns["enabled"][rows & counted]
+        multiplexed = int(np.count_nonzero(enabled < 100))
+        if not_counted > 0:
+            warnings.append("{}: {} not counted in {} of {} executions".format(name, event, not_counted, int(np.count_nonzero(rows))))
+        if multiplexed > 0:
+            warnings.append("{}: {} multiplexed in {} executions (enabled {:.2f}% of the time on average)".format(name, event, multiplexed, float(np.nanmean(enabled[enabled < 100]))))
+    return warnings
@@ -0,0 +1,229 @@
+# Steps of the compile pipeline of the polybench evaluation as actions
+#
+# Every function returns the action (see buildcache.py) doing one step of
+# generate-files.sh for one benchmark, with the commands of the script doing
+# it: polygeist.sh, polymer.sh, affine-tiling.sh, mlir-packing.sh,
+# lower-to-binary.sh and polly.sh, and their -plus versions with the tools of
+# llvm-packing-plus. The polybench sources are adapted in memory instead of in
+# a copy of polybench: the static of the kernel is removed for mlir-clang and
+# the lowering, the body of the kernel for the lowering (see kernelbody.py).
+# The outputs of an action are named after the benchmark (gemm.mlir,
+# logs/gemm.log, gemm.exe) in the dir of the step.
+
+import os
+import platform
+import subprocess
+from pathlib import Path
+
+from packtools.buildcache import Action, Command, Input, Tool, ToolDir
+from packtools.kernelbody import remove_kernel_static, remove_kernel_body
+
+# values generate-files.sh requires in the spec.file
+SPEC_VARIABLES = ("L1", "L2", "L3", "L1_ASSOCIATIVITY", "L2_ASSOCIATIVITY", "CACHE_LINE", "DTLB_ENTRY", "DTLB_PAGE", "POLLY_ENABLE_PATTERN_MATCHING", "LLVM_DISABLE_VECTORIZATION", "LLVM_DISABLE_UNROLLING")
+
+# first, last and increment of the Polymer tile sizes per dataset size
+POLYMER_TILE_SIZES = {
+    "MINI": (2, 8, 1),
+    "SMALL": (2, 32, 1),
+    "MEDIUM": (4, 128, 1),
+    "LARGE": (8, 512, 2),
+    "EXTRALARGE": (16, 1024, 4),
+}
+
+# benchmarks Polymer fails on, or does not tile in POLYMER_TIMEOUT seconds
+POLYMER_FAILURES = ("symm", "ludcmp", "nussinov")
+POLYMER_TIMEOUTS = ("adi", "deriche")
+POLYMER_TIMEOUT = 20
+
+PACKED_MESSAGE = "Succeeded generating packing"
+
+_CLEANUP_PASSES = ["-affine-loop-normalize", "-canonicalize", "-affine-simplify-structures", "-cse"]
+_WARNING_FLAGS = ["-Wall", "-Wno-unused-variable", "-Wno-unknown-pragmas"]
+
+
+# variables of the config.file and spec.file, sourced by bash as the scripts
+# do since their values refer to each other
+def read_shell_files(*paths):
+    script = 'set -a; for file in "$@"; do . "$file"; done; env -0'
+    output = subprocess.run(["bash", "-c", script, "bash"] + [str(path) for path in paths], stdout=subprocess.PIPE, check=True).stdout
+    return dict(item.split("=", 1) for item in output.decode().split("\0") if "=" in item)
+
+
+def read_benchmark_list(benchmark_list):
+    with open(benchmark_list) as f:
+        return [line.strip() for line in f if line.strip() != '']
+
+
+def polymer_tile_sizes(dataset_size):
+    first, last, increment = POLYMER_TILE_SIZES[dataset_size]
+    return list(range(first, last + 1, increment))
+
+
+# Polymer tile sizes of some benchmarks, a line per benchmark: "gemm 8 16 32"
+def read_tile_sizes(path):
+    tile_sizes = {}
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) > 0:
+                tile_sizes[fields[0]] = [int(field) for field in fields[1:]]
+    return tile_sizes
+
+
+def write_tile_sizes(path, tile_sizes):
+    with open(path, 'w') as f:
+        for benchmark, tiles in sorted(tile_sizes.items()):
+            f.write(" ".join([benchmark] + [str(tile) for tile in sorted(tiles)]) + "\n")
+
+
+# gemm for ./linear-algebra/blas/gemm/gemm.c or gemm.mlir
+def benchmark_stem(benchmark):
+    return Path(benchmark).stem
+
+
+def kernel_name(benchmark):
+    return "kernel_" + benchmark_stem(benchmark).replace('-', '_')
+
+
+# flags of clang set by the spec.file
+def clang_flags(config):
+    flags = []
+    if config["LLVM_DISABLE_VECTORIZATION"] == "true":
+        flags += ["-fno-vectorize", "-fno-slp-vectorize", "-fno-tree-vectorize"]
+    else:
+        flags += ["-march=native"]
+    if config["LLVM_DISABLE_UNROLLING"] == "true":
+        flags += ["-fno-unroll-loops"]
+    return flags
+
+
+# model of the cpu, binaries built with -march=native are only reused on it
+def host_cpu():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def _host_values(flags):
+    return {"cpu": host_cpu()} if "-march=native" in flags else {}
+
+
+# mlir-clang, then mlir-opt adding no-alias and fast-math to the kernel
+def polygeist_action(config, benchmark, dataset_size):
+    source_path = Path(config["POLYBENCH"]) / benchmark
+    stem = benchmark_stem(benchmark)
+    return Action([
+        Command([Tool(config["MLIR_CLANG"]), source_path.name,
+                 "--function=" + kernel_name(benchmark), "-D{}_DATASET".format(dataset_size),
+                 "-DPOLYBENCH_USE_SCALAR_LB", "-DPOLYBENCH_USE_RESTRICT", "-DPOLYBENCH_NO_FLUSH_CACHE",
+                 "-I", ToolDir(config["POLYGEIST_CLANG_HEADERS"]), Input(config["POLYBENCH_UTILITIES"], "-I"), Input(source_path.parent, "-I"),
+                 "--raise-scf-to-affine", "-S", "--memref-fullrank"],
+                stdout=stem + ".tmp.mlir", tag="(mlir-clang)"),
+        Command([Tool(config["MLIR_OPT"]), "-affine-loop-pack=add-ffast-math=true add-no-alias=true packing-options=-1"] + _CLEANUP_PASSES + [stem + ".tmp.mlir"],
+                stdout=stem + ".mlir", tag="(mlir-opt)"),
+    ], [stem + ".mlir"], files={source_path.name: remove_kernel_static(source_path.read_text())})
+
+
+# tile.sizes of polymer.sh: the tile size of every loop level
+def polymer_tile_file(tile):
+    return "{}\n".format(tile) * 6 + "\n"
+
+
+# polymer-opt tiling with pluto and the tile.sizes of the scratch dir
+def polymer_action(config, mlir_file, tile):
+    stem = benchmark_stem(mlir_file)
+    return Action([
+        Command([Tool(config["POLYMER_OPT"]), Input(mlir_file), "-allow-unregistered-dialect", "-insert-redundant-load", "-extract-scop-stmt", "-canonicalize", "-pluto-opt", "-inline", "-canonicalize"],
+                stdout=stem + ".tmp.mlir", stderr=os.devnull, timeout=POLYMER_TIMEOUT, tag="(polymer-opt)", library_paths=[ToolDir(config["POLYMER_PLUTO_LIB"])]),
+        Command([Tool(config["MLIR_OPT"])] + _CLEANUP_PASSES + [stem + ".tmp.mlir"], stdout=stem + ".mlir", tag="(mlir-opt)"),
+    ], [stem + ".mlir"], files={"tile.sizes": polymer_tile_file(tile)})
+
+
+# affine loop tiling for a cache size (KiB), mlir_opt is MLIR_OPT or
+# MLIR_PLUS_OPT
+def affine_tiling_action(mlir_opt, mlir_file, cache_size):
+    stem = benchmark_stem(mlir_file)
+    return Action([
+        Command([Tool(mlir_opt), Input(mlir_file), "-affine-loop-tile=cache-size={}".format(cache_size), "-affine-loop-invariant-code-motion"] + _CLEANUP_PASSES,
+                stdout=stem + ".mlir", stderr=os.devnull),
+    ], [stem + ".mlir"])
+
+
+# packing of a tiled kernel, the debug output of the pass is kept in
+# logs/ (it tells whether the kernel was packed)
+def packing_action(config, mlir_opt, mlir_file):
+    stem = benchmark_stem(mlir_file)
+    options = [("l1-cache-size", "L1"), ("l2-cache-size", "L2"), ("l3-cache-size", "L3"), ("cache-line-size", "CACHE_LINE"), ("l1d-tlb-entries", "DTLB_ENTRY"), ("l1d-tlb-page-size", "DTLB_PAGE")]
+    flags = "".join(" {}={}".format(option, config[name]) for option,name in options)
+    return Action([
+        Command([Tool(mlir_opt), Input(mlir_file), "-affine-loop-invariant-code-motion", "-affine-loop-pack=" + flags, "-debug-only=affine-loop-pack"] + _CLEANUP_PASSES,
+                stdout=stem + ".mlir", stderr="logs/{}.log".format(stem)),
+    ], [stem + ".mlir", "logs/{}.log".format(stem)])
+
+
+# polybench source of the benchmark linked with the kernel lowered from
+# MLIR: without static and body of the kernel
+def kernel_source(config, benchmark):
+    source = remove_kernel_static((Path(config["POLYBENCH"]) / benchmark).read_text())
+    stripped = remove_kernel_body(source)
+    return stripped[0] if stripped is not None else source
+
+
+# lowering of the kernel to LLVM IR, compiled and linked with the source of
+# the benchmark returned by kernel_source; mlir_opt and mlir_translate are
+# the tools of llvm-packing or llvm-packing-plus
+def lowering_action(config, mlir_opt, mlir_translate, benchmark, source, mlir_file, dataset_size, perf_region=False):
+    source_path = Path(config["POLYBENCH"]) / benchmark
+    stem = benchmark_stem(benchmark)
+    flags = clang_flags(config)
+    polybench_flags = ["-DPOLYBENCH_TIME"] + (["-DPOLYBENCH_PERF_REGION"] if perf_region else [])
+    return Action([
+        Command([Tool(mlir_opt), Input(mlir_file), "-affine-loop-invariant-code-motion"] + _CLEANUP_PASSES +
+                ["-lower-affine", "-convert-scf-to-cf", "-convert-arith-to-llvm", "-convert-math-to-llvm",
+                 "-convert-func-to-llvm=use-bare-ptr-memref-call-conv=1", "-convert-memref-to-llvm", "-reconcile-unrealized-casts",
+                 "-o", stem + ".llvmir.mlir"],
+                tag="(mlir-opt lowering)"),
+        Command([Tool(mlir_translate), stem + ".llvmir.mlir", "-mlir-to-llvmir", "-o", stem + ".no-opt.ll"], tag="(mlir-translate)"),
+        Command([Tool(config["CLANG"]), "-c", stem + ".no-opt.ll"] + _WARNING_FLAGS + ["-O3", "-ffast-math"] + flags + ["-emit-llvm", "-S", "-flto", "-o", stem + ".ll"],
+                tag="(clang/compile)"),
+        Command([Tool(config["CLANG"]), source_path.name, stem + ".ll", Input(Path(config["POLYBENCH_UTILITIES"]) / "polybench.c"),
+                 Input(config["POLYBENCH_UTILITIES"], "-I"), Input(source_path.parent, "-I"),
+                 "-DPOLYBENCH_USE_RESTRICT"] + polybench_flags + ["-D{}_DATASET".format(dataset_size), "-DPOLYBENCH_NO_FLUSH_CACHE",
+                 "-Wall", "-Wno-misleading-indentation", "-Wno-unused-variable", "-Wno-unknown-pragmas",
+                 "-O3", "-ffast-math"] + flags + ["-flto", "-lm", "-o", stem + ".exe"],
+                tag="(clang/link)"),
+    ], [stem + ".ll", stem + ".exe"], files={source_path.name: source}, values=_host_values(flags))
+
+
+# the benchmark compiled by clang with polly
+def polly_action(config, benchmark, dataset_size, perf_region=False):
+    source_path = Path(config["POLYBENCH"]) / benchmark
+    stem = benchmark_stem(benchmark)
+    flags = clang_flags(config)
+    pattern_matching = "true" if config["POLLY_ENABLE_PATTERN_MATCHING"] == "true" else "false"
+    polybench_flags = ["-DPOLYBENCH_TIME"] + (["-DPOLYBENCH_PERF_REGION"] if perf_region else [])
+    return Action([
+        Command([Tool(config["CLANG"]), "-c", Input(source_path), Input(config["POLYBENCH_UTILITIES"], "-I"),
+                 "-DPOLYBENCH_USE_SCALAR_LB", "-DPOLYBENCH_USE_RESTRICT", "-DPOLYBENCH_NO_FLUSH_CACHE",
+                 "-D{}_DATASET".format(dataset_size), "-DPOLYBENCH_TIME",
+                 "-Wall", "-Wno-misleading-indentation", "-Wno-unused-variable", "-Wno-unknown-pragmas",
+                 "-O3", "-ffast-math"] + flags +
+                ["-mllvm", "-polly",
+                 "-mllvm", "-polly-pattern-matching-based-opts=" + pattern_matching,
+                 "-mllvm", "-polly-target-1st-cache-level-associativity=" + config["L1_ASSOCIATIVITY"],
+                 "-mllvm", "-polly-target-2nd-cache-level-associativity=" + config["L2_ASSOCIATIVITY"],
+                 "-mllvm", "-polly-target-1st-cache-level-size={}".format(int(config["L1"]) * 1024),
+                 "-mllvm", "-polly-target-2nd-cache-level-size={}".format(int(config["L2"]) * 1024),
+                 "-emit-llvm", "-S", "-flto", "-o", stem + ".ll"],
+                tag="(clang/compile)"),
+        # polly.sh links with -D${DATASET}_DATASET, DATASET being unset there
+        Command([Tool(config["CLANG"]), stem + ".ll", Input(Path(config["POLYBENCH_UTILITIES"]) / "polybench.c"), Input(config["POLYBENCH_UTILITIES"], "-I"),
+                 "-DPOLYBENCH_USE_SCALAR_LB", "-DPOLYBENCH_USE_RESTRICT", "-DPOLYBENCH_NO_FLUSH_CACHE",
+                 "-D_DATASET"] + polybench_flags + _WARNING_FLAGS + ["-O3", "-ffast-math"] + flags + ["-flto", "-lm", "-o", stem + ".exe"],
+                tag="(clang/link)"),
+    ], [stem + ".ll", stem + ".exe"], inputs=[Input(source_path.parent, "-I")], values=_host_values(flags))
@@ -0,0 +1,143 @@
+# Wall and CPU time of the phases of the parse-log.py scripts (--profile)
+#
+# The scripts start the phases one after the other, a phase ends when the
+# next one starts. A phase is timed with time.perf_counter and
+# time.process_time in the process of the script. Work done by worker
+# processes (logs parsed or graphs rendered with -j) is timed in the workers
+# and added to the phase it belongs to as worker_wall and worker_cpu, the
+# time of the phase itself then includes waiting for the workers. The report
+# is written as JSON; the whole run can also be recorded with cProfile, for
+# pstats or snakeviz.
+
+import cProfile
+import json
+import os
+import sys
+import time
+
+PROFILE_FILE = "profile.json"
+
+
+# returns the result of function(*args) with its wall and CPU times, also in
+# worker processes
+def timed_call(function, *args):
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = function(*args)
+    return result, time.perf_counter() - wall, time.process_time() - cpu
+
+
+class PhaseTimes:
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.worker_wall = 0.0
+        self.worker_cpu = 0.0
+
+    def to_json(self, name):
+        return {"name": name, "calls": self.calls, "wall": self.wall, "cpu": self.cpu, "worker_wall": self.worker_wall, "worker_cpu": self.worker_cpu}
+
+
+# times of the phases of a run, in the order they first ran
+class Profiler:
+    def __init__(self, stats_path=None):
+        self.phases = {}
+        # running phase, the work submitted to workers is added to it
+        self.current = None
+        self.started = None
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.stats_path = stats_path
+        self.profile = None
+        if stats_path is not None:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def _times(self, name):
+        if name not in self.phases:
+            self.phases[name] = PhaseTimes()
+        return self.phases[name]
+
+    # end the running phase and start timing name
+    def start(self, name):
+        self.stop()
+        self.current = name
+        self.started = (time.perf_counter(), time.process_time())
+
+    def stop(self):
+        if self.current is None:
+            return
+        wall, cpu = self.started
+        self.add_time(self.current, time.perf_counter() - wall, time.process_time() - cpu)
+        self.current = None
+
+    def add_time(self, name, wall, cpu):
+        times = self._times(name)
+        times.calls += 1
+        times.wall += wall
+        times.cpu += cpu
+
+    def add_worker_time(self, name, wall, cpu):
+        times = self._times(name)
+        times.worker_wall += wall
+        times.worker_cpu += cpu
+
+    # end the running phase and write the JSON report, with the options of
+    # the run
+    def write_report(self, report_path, **options):
+        self.stop()
+        report = {
+            "argv": sys.argv,
+            "options": options,
+            "cpus": os.cpu_count(),
+            "wall": time.perf_counter() - self.wall,
+            "cpu": time.process_time() - self.cpu,
+            "phases": [times.to_json(name) for name,times in self.phases.items()],
+        }
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    # stop cProfile and write its statistics
+    def close(self):
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(str(self.stats_path))
+            self.profile = None
+
+
+# same interface as Profiler, records nothing (without --profile)
+class NullProfiler:
+    current = None
+
+    def start(self, name):
+        pass
+
+    def stop(self):
+        pass
+
+    def add_time(self, name, wall, cpu):
+        pass
+
+    def add_worker_time(self, name, wall, cpu):
+        pass
+
+    def write_report(self, report_path, **options):
+        pass
+
+    def close(self):
+        pass
+
+
+def add_profile_arguments(parser):
+    parser.add_argument("--profile", help="Write the wall and CPU time of every phase (parsing, statistics, graph families) to " + PROFILE_FILE + " in the output dir.", action='store_true')
+    parser.add_argument("--profile-stats", help="Also record the run with cProfile and write the statistics to this file (read with pstats). Implies --profile.", type=str)
+
+
+# profiler of the parsed arguments
+def profiler(args):
+    if args.profile_stats is not None:
+        return Profiler(os.path.abspath(args.profile_stats))
+    if args.profile:
+        return Profiler()
+    return NullProfiler()
@@ -0,0 +1,111 @@
+# JSON-lines records of the benchmark executions
+#
+# Runners write one JSON object per line next to the text log (x.log ->
+# x.jsonl) with the fields:
+#   benchmark  name of the benchmark (gemm, 2mm, ...)
+#   variant    log name for polybench-evaluation, packing for packing-selection
+#   tiling     tiling size or target cache level, -1 when not tiled
+#   iteration  round of run.sh or google benchmark repetition
+#   core       cpu the execution ran on, -1 when unknown
+#   runtime    execution time in milliseconds, null if the execution crashed
+#   counters   map from perf counter name to its value (may be empty)
+# The parsers read the whole file at once into NumPy columns, without
+# guessing the meaning of the lines of the text log.
+
+import json
+import re
+import numpy as np
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RECORDS_SUFFIX = '.jsonl'
+
+
+# records written alongside a text log
+def records_path(log_file):
+    return Path(log_file).with_suffix(RECORDS_SUFFIX)
+
+
+# tiling size or target cache level of a polybench-evaluation log name
+# (polymer-packing-32, affine-tiling-l2), -1 for polly and polygeist
+def variant_tiling(variant):
+    for field in variant.split('-'):
+        if field.isdigit():
+            return int(field)
+        if field.startswith('l') and field[1:].isdigit():
+            return int(field[1:])
+    return -1
+
+
+# benchmark of a polybench-evaluation executable, its name without the .exe
+# suffix (covariance.exe -> covariance), for the records and the text logs
+def benchmark_name(executable):
+    name = Path(executable).name
+    return name[:-len('.exe')] if name.endswith('.exe') else name
+
+
+# benchmark of a packing-selection executable (gemm-blis-LARGE-8-8-8-packing-none)
+def executable_benchmark(executable):
+    return re.split(r"-(?:MINI|SMALL|MEDIUM|LARGE|EXTRALARGE)-", Path(executable).stem)[0]
+
+
+# tiling and packing of a packing-selection executable
+def executable_tiling_packing(executable):
+    tiling, packing = Path(executable).name.replace('.exe', '').split('-packing-')
+    return int(tiling.split('-')[-1]), packing
+
+
+def make_record(benchmark, variant, tiling, iteration, core=-1, runtime=None, counters=None):
+    return {"benchmark": benchmark, "variant": variant, "tiling": tiling, "iteration": iteration, "core": core, "runtime": runtime, "counters": counters or {}}
+
+
+# appends records to a JSON-lines file
+class RecordWriter:
+    def __init__(self, path):
+        self.file = open(path, 'ab')
+
+    def write(self, record):
+        if orjson is not None:
+            self.file.write(orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n')
+        else:
+            self.file.write(json.dumps(record, separators=(',', ':')).encode() + b'\n')
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# read all records of a file, returns a map from field to a NumPy column
+# (object arrays for text fields, NaN for missing runtimes) and a map from
+# perf counter to a column of values (NaN when not counted)
+def read_records(path):
+    with open(path, 'rb') as f:
+        lines = [line for line in f.read().split(b'\n') if line.strip()]
+    # a single JSON array is parsed much faster than one object per line
+    data = b'[' + b','.join(lines) + b']'
+    records = orjson.loads(data) if orjson is not None else json.loads(data)
+
+    columns = {
+        "benchmark": np.array([record["benchmark"] for record in records], dtype=object),
+        "variant": np.array([record["variant"] for record in records], dtype=object),
+        "tiling": np.array([record["tiling"] for record in records], dtype=np.int64),
+        "iteration": np.array([record["iteration"] for record in records], dtype=np.int64),
+        "core": np.array([record.get("core", -1) for record in records], dtype=np.int64),
+        "runtime": np.array([record["runtime"] for record in records], dtype=float),
+    }
+    counters = {}
+    for row,record in enumerate(records):
+        for name,value in record["counters"].items():
+            if name not in counters:
+                counters[name] = np.full(len(records), np.nan)
+            counters[name][row] = value
+    return columns, counters
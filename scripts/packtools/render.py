@@ -0,0 +1,161 @@
+# Render the graphs of the parse-log.py scripts in a pool of workers
+#
+# The scripts describe every graph with a FigureSpec: the calls made on its
+# axes are recorded in the parent process and replayed by render_figure, so
+# the (slow) matplotlib drawing and saving runs in parallel in the workers.
+# matplotlib is imported when the first graph is rendered: building specs
+# does not need it and the scripts start faster when they draw no graph.
+#
+# Graphs are drawn with the object-oriented Agg API, without pyplot and its
+# figure managers. The graphs of a family (the time graph of every benchmark,
+# the graph of every perf counter...) are drawn on the same figure: only the
+# data artists of the previous graph are removed, the axes keep their
+# settings since every graph of the family makes the same calls on them.
+
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from packtools.profiling import timed_call, NullProfiler
+
+# output formats supported by the --format option of the scripts
+FORMATS = ('png', 'svg', 'pdf')
+
+
+# records calls made on an object, including on its attributes (ax.xaxis.grid)
+class _CallRecorder:
+    def __init__(self, calls, names=()):
+        self._calls = calls
+        self._names = names
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _CallRecorder(self._calls, self._names + (name,))
+
+    def __call__(self, *args, **kwargs):
+        self._calls.append((self._names, args, kwargs))
+
+
+# description of a graph: calls on its axes and the options of its legend;
+# graphs of the same family are drawn on the same figure
+class FigureSpec:
+    def __init__(self, family=None):
+        self.family = family
+        self.calls = []
+        self.legend_kwargs = None
+
+    @property
+    def ax(self):
+        return _CallRecorder(self.calls)
+
+    # all legends use a white frame with a black edge
+    def legend(self, **kwargs):
+        self.legend_kwargs = kwargs
+
+
+# same as plt.subplots() but returns a spec to be given to a FigureRenderer
+def figure_spec(family=None):
+    spec = FigureSpec(family)
+    return spec, spec.ax
+
+
+# figure of each family drawn by this process, with the rcParams it was
+# created with and the methods called by its last graph
+_family_figures = {}
+
+
+# figure and axes to draw spec on; the figure of its family is reused when
+# the rcParams did not change and its last graph called the same methods,
+# a new figure is created otherwise
+def _figure_axes(spec):
+    import matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    methods = [names for names, _, _ in spec.calls]
+    if spec.family in _family_figures:
+        rc_params, family_methods, fig, ax = _family_figures[spec.family]
+        if rc_params == matplotlib.rcParams and family_methods == methods:
+            _remove_data(ax)
+            return fig, ax
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if spec.family is not None:
+        _family_figures[spec.family] = (matplotlib.rcParams.copy(), methods, fig, ax)
+    return fig, ax
+
+
+# remove the artists and legend of the previous graph, the limits are
+# computed again from the data of the next one
+def _remove_data(ax):
+    for artist in list(ax.lines) + list(ax.patches) + list(ax.collections) + list(ax.texts) + list(ax.images):
+        artist.remove()
+    ax.containers.clear()
+    if ax.get_legend() is not None:
+        ax.get_legend().remove()
+    ax.set_prop_cycle(None)
+    ax.set_autoscale_on(True)
+    ax.relim()
+
+
+def render_figure(spec, graph_path):
+    fig, ax = _figure_axes(spec)
+    for names, args, kwargs in spec.calls:
+        method = ax
+        for name in names:
+            method = getattr(method, name)
+        method(*args, **kwargs)
+    if spec.legend_kwargs is not None:
+        legend = ax.legend(**spec.legend_kwargs)
+        frame = legend.get_frame()
+        frame.set_facecolor('white')
+        frame.set_edgecolor('black')
+    fig.savefig(graph_path, bbox_inches='tight', dpi=300)
+
+
+# returns the wall and CPU times of the rendering in the worker
+def _render_pickled_figure(pickled_spec, graph_path):
+    _, wall, cpu = timed_call(render_figure, pickle.loads(pickled_spec), graph_path)
+    return wall, cpu
+
+
+def _init_worker(rc_params):
+    import matplotlib
+    matplotlib.use('Agg')
+    matplotlib.rcParams.update(rc_params)
+
+
+# renders the submitted specs, in a pool of workers if jobs > 1; the time
+# spent by the workers is added to the phase of the profiler a graph was
+# submitted from
+class FigureRenderer:
+    def __init__(self, jobs=1, graph_format='png', profiler=None):
+        self.jobs = jobs
+        self.graph_format = graph_format
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.executor = None
+        self.futures = []
+
+    def submit(self, spec, graph_path):
+        graph_path = graph_path.with_suffix('.' + self.graph_format)
+        if self.jobs <= 1:
+            render_figure(spec, graph_path)
+            return
+        # workers start with the style and rcParams set up by the script
+        if self.executor is None:
+            import matplotlib
+            self.executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker, initargs=(dict(matplotlib.rcParams),))
+        # pickle now, the data lists of the spec may be reused by the caller
+        self.futures.append((self.executor.submit(_render_pickled_figure, pickle.dumps(spec), graph_path), self.profiler.current))
+
+    # wait for all graphs to be written
+    def close(self):
+        if self.executor is None:
+            return
+        for future, phase in self.futures:
+            wall, cpu = future.result()
+            if phase is not None:
+                self.profiler.add_worker_time(phase, wall, cpu)
+        self.executor.shutdown()
+        self.executor = None
+        self.futures = []
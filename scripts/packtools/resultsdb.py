@@ -0,0 +1,215 @@
+# SQLite database of the results of the parse-log.py scripts across runs
+#
+# Every parse of an experiment adds a run with its metadata: git revision and
+# branch of the compiler sources, machine, cache sizes of the spec.file,
+# dataset size and tiling method. The statistics of the run are added as one
+# row per (benchmark, variant, tiling, metric), with the names used by the
+# JSON-lines records (see records.py):
+#   variant  log name for polybench-evaluation, packing for packing-selection
+#   tiling   tiling size or target cache level, -1 when not tiled
+#   metric   "runtime" (milliseconds) or the name of a perf counter
+# The rows are indexed by metric, benchmark and variant, so that comparisons
+# across runs (speedup of the packed variants over polygeist of every run,
+# ...) are single queries.
+
+import json
+import platform
+import re
+import sqlite3
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    experiment TEXT NOT NULL,
+    label TEXT,
+    git_revision TEXT,
+    git_branch TEXT,
+    machine TEXT,
+    tiling_method TEXT,
+    dataset_size TEXT,
+    l1 INTEGER,
+    l2 INTEGER,
+    l3 INTEGER,
+    spec TEXT,
+    input TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    benchmark TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    tiling INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    mean REAL,
+    stddev REAL,
+    conf REAL,
+    count INTEGER
+);
+CREATE INDEX IF NOT EXISTS results_metric_benchmark ON results (metric, benchmark, variant, run_id);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id, metric, benchmark);
+CREATE INDEX IF NOT EXISTS runs_experiment ON runs (experiment, created);
+"""
+
+DATASET_SIZES = ('MINI', 'SMALL', 'MEDIUM', 'LARGE', 'EXTRALARGE')
+
+# KEY="value" lines of the spec.file, values computed by the shell are skipped
+_spec_line_re = re.compile(r'^\s*([A-Z0-9_]+)="([^"$`]*)"\s*$')
+
+
+# values of the spec.file, the cache sizes are in KiB
+def read_spec_file(spec_file):
+    spec = {}
+    try:
+        with open(spec_file) as f:
+            for line in f:
+                match = _spec_line_re.match(line)
+                if match:
+                    spec[match.group(1)] = match.group(2)
+    except OSError:
+        pass
+    return spec
+
+
+# revision and branch of the git checkout containing path, None when it is not
+# in a checkout
+def git_head(path):
+    def git(*args):
+        try:
+            completed = subprocess.run(["git", "-C", str(path)] + list(args), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError:
+            return None
+        return completed.stdout.decode().strip() if completed.returncode == 0 else None
+    return git("rev-parse", "HEAD"), git("rev-parse", "--abbrev-ref", "HEAD")
+
+
+# dataset size found in the names of path and its parents
+# (output-polybench-affine-LARGE/logs), None if there is none
+def path_dataset_size(path):
+    for part in Path(path).resolve().parts[::-1]:
+        for field in re.split(r"[-_.]", part):
+            if field.upper() in DATASET_SIZES:
+                return field.upper()
+    return None
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# metadata of a run parsed from input; the compiler sources are the src
+# checkout of the repository (GPAT-Plus branches) when present
+def run_metadata(experiment, input_path, args, tiling_method=None):
+    repository = Path(__file__).resolve().parents[2]
+    compiler_dir = Path(args.compiler_dir) if args.compiler_dir else repository / "src"
+    if not compiler_dir.is_dir():
+        compiler_dir = repository
+    revision, branch = git_head(compiler_dir)
+    spec = read_spec_file(args.spec_file)
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "experiment": experiment,
+        "label": args.run_label,
+        "git_revision": revision,
+        "git_branch": branch,
+        "machine": platform.node(),
+        "tiling_method": tiling_method,
+        "dataset_size": args.dataset_size or path_dataset_size(input_path),
+        "l1": _int_or_none(spec.get("L1")),
+        "l2": _int_or_none(spec.get("L2")),
+        "l3": _int_or_none(spec.get("L3")),
+        "spec": json.dumps(spec, sort_keys=True),
+        "input": str(Path(input_path).resolve()),
+    }
+
+
+class ResultsDB:
+    def __init__(self, path):
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise RuntimeError("{}: results database version {} is not supported".format(path, version))
+        with self.connection:
+            self.connection.executescript(_SCHEMA)
+            self.connection.execute("PRAGMA user_version = {}".format(SCHEMA_VERSION))
+
+    # add a run and its results, rows are (benchmark, variant, tiling, metric,
+    # mean, stddev, conf, count); returns the id of the run
+    def add_run(self, metadata, rows):
+        columns = list(metadata.keys())
+        with self.connection:
+            cursor = self.connection.execute("INSERT INTO runs ({}) VALUES ({})".format(", ".join(columns), ", ".join("?" * len(columns))), [metadata[column] for column in columns])
+            run_id = cursor.lastrowid
+            self.connection.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", ((run_id,) + tuple(_sql_value(value) for value in row) for row in rows))
+        return run_id
+
+    def runs(self, experiment=None):
+        query = "SELECT * FROM runs"
+        parameters = []
+        if experiment is not None:
+            query += " WHERE experiment = ?"
+            parameters.append(experiment)
+        return self._rows(query + " ORDER BY created, id", parameters)
+
+    # speedup of the variants matching the LIKE pattern over the baseline
+    # variant of the same run, per benchmark, for the runs matching filters
+    # (experiment, git_branch, machine, dataset_size, ...); the baseline of a
+    # tiled variant is the baseline of the same tiling or the untiled one
+    def speedups(self, baseline, variants='%', benchmark=None, metric='runtime', **filters):
+        query = """
+            SELECT runs.id AS run_id, runs.created, runs.label, runs.git_revision, runs.git_branch, runs.machine, runs.dataset_size,
+                   result.benchmark, result.variant, result.tiling, base.mean / result.mean AS speedup, result.mean, base.mean AS baseline_mean
+            FROM results AS result
+            JOIN results AS base ON base.run_id = result.run_id AND base.metric = result.metric
+                AND base.benchmark = result.benchmark AND base.variant = ? AND base.tiling IN (result.tiling, -1)
+            JOIN runs ON runs.id = result.run_id
+            WHERE result.metric = ? AND result.variant LIKE ? AND result.variant != ?"""
+        parameters = [baseline, metric, variants, baseline]
+        if benchmark is not None:
+            query += " AND result.benchmark = ?"
+            parameters.append(benchmark)
+        for column,value in filters.items():
+            if value is not None:
+                query += " AND runs.{} = ?".format(column)
+                parameters.append(value)
+        return self._rows(query + " ORDER BY result.benchmark, result.variant, result.tiling, runs.created, runs.id", parameters)
+
+    def _rows(self, query, parameters):
+        cursor = self.connection.execute(query, parameters)
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# NumPy scalars are stored as Python numbers, NaN as NULL
+def _sql_value(value):
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def add_results_arguments(parser):
+    experiments_dir = Path(__file__).resolve().parents[1] / "experiments"
+    parser.add_argument("--results-db", help="SQLite database the statistics of this run are added to, with its metadata.", type=str)
+    parser.add_argument("--run-label", help="Label of the run in the results database.", type=str)
+    parser.add_argument("--dataset-size", help="Dataset size of the run in the results database (found in the input path by default).", choices=DATASET_SIZES, type=str)
+    parser.add_argument("--compiler-dir", help="Git checkout of the compiler sources whose revision is recorded (src/ of the repository by default).", type=str)
+    parser.add_argument("--spec-file", help="spec.file whose cache sizes are recorded.", type=str, default=str(experiments_dir / "spec.file"))
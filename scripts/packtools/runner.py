@@ -0,0 +1,185 @@
+# Run the benchmark binaries and write the log read by parse-log.py
+#
+# The runner replaces the loop of run.sh: binaries are shuffled in process,
+# pinned to a random core with sched_setaffinity (inherited by the binary and
+# by perf) and their output is appended to the log directly. The log has the
+# same format as the one written by run.sh with tee: a "Running" line per
+# execution, tagged with the core it ran on, followed by the output of the
+# binary. perf stat writes its machine-readable output (perf stat -x,) that
+# is appended to a CSV file next to the log (see perfcsv.py). With the
+# perf-event-open backend, the runner opens the counters itself instead of
+# starting perf stat (see perf_event.py).
+#
+# Every execution is also written as a JSON-lines record (see records.py)
+# next to the log.
+#
+# With max_parallel > 1, independent binaries run at the same time, each on
+# its own cpu among cpus that share neither a physical core nor an L2 cache.
+
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from packtools.logparse import tokenize_lines, SAMPLE, COUNTER
+from packtools.records import RecordWriter, make_record, records_path, variant_tiling, benchmark_name
+from packtools.topology import isolated_cpus
+from packtools.perfcsv import perf_stat_command, read_perf_output, append_perf_csv, counted_values, perf_csv_path
+from packtools.perf_event import run_with_counters, parse_event_groups
+
+# perf events collected by run.sh -p, in groups measured together
+PERF_EVENTS = "{cycles,instructions},{mem_load_retired.l1_miss,mem_load_retired.l2_miss,mem_load_retired.l3_miss},{dtlb_load_misses.stlb_hit,dtlb_load_misses.miss_causes_a_walk}"
+
+
+# result of one execution of a binary
+class Execution:
+    def __init__(self, executable, core, output, returncode, perf_rows=None):
+        self.executable = executable
+        self.core = core
+        self.output = output
+        self.returncode = returncode
+        # lines of perf stat -x, split in fields, None without perf
+        self.perf_rows = perf_rows
+
+    # execution time printed by polybench in milliseconds, None if it crashed
+    @property
+    def runtime(self):
+        for token, _, value in tokenize_lines(io.StringIO(self.log_text())):
+            if token == SAMPLE:
+                return value*1000
+        return None
+
+    # map from perf counter to its value, counters not counted are left out
+    @property
+    def counters(self):
+        if self.perf_rows is not None:
+            return counted_values(self.perf_rows)
+        return {key: value for token, key, value in tokenize_lines(io.StringIO(self.output)) if token == COUNTER}
+
+    # JSON-lines record of the execution, the variant is the name of the log
+    def record(self, variant, iteration):
+        return make_record(benchmark_name(self.executable), variant, variant_tiling(variant), iteration, self.core, self.runtime, self.counters)
+
+    # text appended to the log for this execution, the parsers only read the
+    # executable name of the "Running" line
+    def log_text(self):
+        return "Running {} on core {}\n{}".format(Path(self.executable).name, self.core, self.output)
+
+
+# ways of collecting the perf counters: a perf stat process per execution or
+# perf_event_open from the runner
+PERF_BACKENDS = ('perf-stat', 'perf-event-open')
+
+
+# run one binary pinned to core, with perf counters when perf_events is given
+def run_binary(executable, core, perf_events=None, perf_backend='perf-stat'):
+    command = [str(executable)]
+    if perf_events is not None and perf_backend == 'perf-event-open':
+        returncode, output, perf_rows = run_with_counters(command, parse_event_groups(perf_events), core)
+        return Execution(executable, core, output.decode(errors='replace'), returncode, perf_rows)
+
+    # the binary inherits the affinity of the calling thread, which gets its
+    # own back so that the processes it starts later (a build) are not pinned
+    affinity = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, {core})
+    try:
+        if perf_events is None:
+            completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            return Execution(executable, core, completed.stdout.decode(errors='replace'), completed.returncode)
+
+        with tempfile.NamedTemporaryFile('r', prefix='perf-', suffix='.csv') as perf_output:
+            completed = subprocess.run(perf_stat_command(perf_events, perf_output.name) + command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            perf_rows = read_perf_output(perf_output.name)
+        return Execution(executable, core, completed.stdout.decode(errors='replace'), completed.returncode, perf_rows)
+    finally:
+        os.sched_setaffinity(0, affinity)
+
+
+# runs rounds of the binaries in random order and appends them to the log
+class BenchmarkRunner:
+    def __init__(self, log_path, cores, perf_events=None, seed=None, max_parallel=1, perf_backend='perf-stat'):
+        self.log_path = Path(log_path)
+        self.cores = list(cores)
+        self.perf_events = perf_events
+        self.perf_backend = perf_backend
+        self.random = random.Random(seed)
+        # cpus of the concurrent executions, None to run one binary at a time
+        self.slots = None
+        if max_parallel > 1:
+            self.slots = isolated_cpus(self.cores)[:max_parallel]
+            if len(self.slots) < max_parallel:
+                print("Only {} isolated cores available, running {} binaries at the same time".format(len(self.slots), len(self.slots)), file=sys.stderr)
+
+    def run_round(self, executables, iteration=0):
+        executables = list(executables)
+        self.random.shuffle(executables)
+        if self.slots is not None and len(self.slots) > 1:
+            return self.run_round_parallel(executables, iteration)
+        executions = []
+        with open(self.log_path, 'a') as log, RecordWriter(records_path(self.log_path)) as records:
+            for executable in executables:
+                execution = run_binary(executable, self.random.choice(self.cores), self.perf_events, self.perf_backend)
+                log.write(execution.log_text())
+                records.write(execution.record(self.log_path.stem, iteration))
+                if execution.perf_rows is not None:
+                    append_perf_csv(perf_csv_path(self.log_path), execution.executable, iteration, execution.core, execution.perf_rows)
+                executions.append(execution)
+        return executions
+
+    # run the binaries on the isolated cpus, a cpu is taken by one execution
+    # at a time; executions are written to the log as they complete
+    def run_round_parallel(self, executables, iteration):
+        free_slots = list(self.slots)
+        lock = threading.Lock()
+
+        def run_on_free_slot(executable):
+            with lock:
+                slot = free_slots.pop()
+            try:
+                return run_binary(executable, slot, self.perf_events, self.perf_backend)
+            finally:
+                with lock:
+                    free_slots.append(slot)
+
+        executions = []
+        with ThreadPoolExecutor(max_workers=len(self.slots)) as executor, open(self.log_path, 'a') as log, RecordWriter(records_path(self.log_path)) as records:
+            futures = [executor.submit(run_on_free_slot, executable) for executable in executables]
+            for future in as_completed(futures):
+                execution = future.result()
+                log.write(execution.log_text())
+                records.write(execution.record(self.log_path.stem, iteration))
+                if execution.perf_rows is not None:
+                    append_perf_csv(perf_csv_path(self.log_path), execution.executable, iteration, execution.core, execution.perf_rows)
+                executions.append(execution)
+        return executions
+
+    # run every binary repeats times, or until the controller stops scheduling
+    # it when one is given
+    def run(self, executables, repeats, controller=None):
+        executables = sorted(executables)
+        by_name = {Path(executable).name: executable for executable in executables}
+        for run in range(1, repeats + 1):
+            if controller is not None:
+                executables = [by_name[name] for name in controller.pending()]
+                if len(executables) == 0:
+                    print("Execution times converged or time budget reached after {} iterations".format(run - 1))
+                    return
+            print("Iteration {} of {} -------------------------------".format(run, repeats), flush=True)
+            for execution in self.run_round(executables, run):
+                if execution.returncode != 0:
+                    print("{} exited with code {}".format(execution.executable, execution.returncode), file=sys.stderr)
+                runtime = execution.runtime
+                if controller is not None and runtime is not None:
+                    controller.record(Path(execution.executable).name, runtime)
+
+
+# cores usable by the runner: the first CORES of the spec.file that the
+# process is allowed to run on
+def available_cores(cores):
+    allowed = os.sched_getaffinity(0)
+    return [core for core in range(cores) if core in allowed] or sorted(allowed)
@@ -0,0 +1,160 @@
+# Run the tasks of a build as a graph, in parallel
+#
+# A task reads input resources and produces output resources (the paths of
+# the files it writes, or any name); it runs once every task producing one of
+# its inputs is done, inputs nobody produces are there from the start. Ready
+# tasks run on a pool of worker threads, the commands they start being the
+# actual work, in the order they were given. The number of running tasks is
+# limited by a job server: jobs tokens of its own, or the tokens of the GNU
+# make jobserver when run by make -jN, so that a build started by make shares
+# its cores with the rest of the make jobs. Every task is reported to the
+# caller as soon as it is done, the tasks depending on a failed task (one
+# that raised) are skipped.
+
+import heapq
+import os
+import re
+import select
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class Task:
+    def __init__(self, name, run, inputs=(), outputs=()):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+
+# tokens of the make jobserver given in MAKEFLAGS: (read fd, write fd), None
+# without jobserver or when make did not pass its fds to this process (a
+# recipe without "+")
+def make_jobserver(makeflags=None):
+    makeflags = os.environ.get("MAKEFLAGS", "") if makeflags is None else makeflags
+    match = re.search(r"--jobserver-(?:auth|fds)=(?:fifo:(\S+)|(\d+),(\d+))", makeflags)
+    if match is None:
+        return None
+    try:
+        if match.group(1) is not None:
+            fd = os.open(match.group(1), os.O_RDWR)
+            return fd, fd
+        read_fd, write_fd = int(match.group(2)), int(match.group(3))
+        os.fstat(read_fd)
+        os.fstat(write_fd)
+        return read_fd, write_fd
+    except OSError:
+        return None
+
+
+# limits the running tasks to jobs; with the make jobserver, the process has
+# one implicit token and reads one from make for every other running task
+class JobServer:
+    def __init__(self, jobs, jobserver=None):
+        self.jobs = jobs
+        self.jobserver = jobserver
+        self.semaphore = threading.BoundedSemaphore(jobs)
+        self.lock = threading.Lock()
+        self.implicit_free = True
+
+    def acquire(self):
+        self.semaphore.acquire()
+        if self.jobserver is None:
+            return None
+        with self.lock:
+            if self.implicit_free:
+                self.implicit_free = False
+                return None
+        # the pipe of make is non-blocking since make 4.3, other clients of
+        # make may take the token between select and read
+        while True:
+            try:
+                return os.read(self.jobserver[0], 1)
+            except (BlockingIOError, InterruptedError):
+                select.select([self.jobserver[0]], [], [])
+
+    def release(self, token):
+        if token is not None:
+            os.write(self.jobserver[1], token)
+        elif self.jobserver is not None:
+            with self.lock:
+                self.implicit_free = True
+        self.semaphore.release()
+
+
+# run the tasks on jobs workers; report(task, value, error, done, total) is
+# called in the calling thread when a task is done, value being what its run
+# returned and error the exception it raised, or "skipped" when one of the
+# tasks it depends on failed
+def run_tasks(tasks, jobs=1, report=None, jobserver=None):
+    producers = {}
+    for task in tasks:
+        for output in task.outputs:
+            producers[output] = task
+    dependents = {id(task): [] for task in tasks}
+    waiting = {}
+    for task in tasks:
+        dependencies = {id(producers[resource]) for resource in task.inputs if resource in producers and producers[resource] is not task}
+        waiting[id(task)] = len(dependencies)
+        for dependency in dependencies:
+            dependents[dependency].append(task)
+    order = {id(task): index for index, task in enumerate(tasks)}
+
+    job_server = JobServer(max(1, jobs), jobserver)
+
+    def run(task):
+        token = job_server.acquire()
+        try:
+            return task.run()
+        finally:
+            job_server.release(token)
+
+    # ready tasks by their order in tasks
+    ready = [(order[id(task)], task) for task in tasks if waiting[id(task)] == 0]
+    heapq.heapify(ready)
+    done = 0
+    failed = 0
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        while ready or running:
+            # a few more tasks than workers are queued so that workers never wait for the main thread
+            while ready and len(running) < 2 * max(1, jobs):
+                _, task = heapq.heappop(ready)
+                running[executor.submit(run, task)] = task
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                task = running.pop(future)
+                skipped = []
+                error = future.exception()
+                value = future.result() if error is None else None
+                if error is not None:
+                    skipped = _skip_dependents(task, dependents, waiting)
+                else:
+                    for dependent in dependents[id(task)]:
+                        waiting[id(dependent)] -= 1
+                        if waiting[id(dependent)] == 0:
+                            heapq.heappush(ready, (order[id(dependent)], dependent))
+                done += 1
+                failed += error is not None
+                if report is not None:
+                    report(task, value, error, done, len(tasks))
+                for dependent in skipped:
+                    done += 1
+                    failed += 1
+                    if report is not None:
+                        report(dependent, None, "skipped", done, len(tasks))
+    return failed
+
+
+# the tasks depending, directly or not, on a failed task; they are never run
+def _skip_dependents(task, dependents, waiting):
+    skipped = []
+    stack = list(dependents[id(task)])
+    while stack:
+        dependent = stack.pop()
+        if waiting[id(dependent)] < 0:
+            continue
+        waiting[id(dependent)] = -1
+        skipped.append(dependent)
+        stack.extend(dependents[id(dependent)])
+    return skipped
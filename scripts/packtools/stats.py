@@ -0,0 +1,61 @@
+# Statistics of many series of samples in a single vectorized call
+#
+# Series are the rows of a (series x iterations) matrix. Series with fewer
+# samples than the others (a benchmark that crashed or was interrupted) are
+# masked instead of padded, so their statistics only use their own samples.
+
+import numpy as np
+from collections import namedtuple
+
+# confidence level of the intervals drawn on the graphs
+CONFIDENCE = 0.95
+
+# scipy.stats.norm.ppf((1 + CONFIDENCE) / 2), scipy takes longer to import
+# than the logs take to parse and is only loaded for other levels
+_CONFIDENCE_QUANTILE = 1.959963984540054
+
+# one array per statistic, with one value per series
+Statistics = namedtuple('Statistics', ['count', 'mean', 'stddev', 'sem', 'conf', 'median'])
+
+
+# build a masked (series x iterations) matrix from a list of 1-D sample arrays
+def sample_matrix(series):
+    lengths = np.array([len(samples) for samples in series], dtype=np.intp)
+    width = int(lengths.max()) if len(series) > 0 else 0
+    mask = np.arange(width) >= lengths[:, np.newaxis]
+    data = np.zeros((len(series), width))
+    if len(series) > 0:
+        data[~mask] = np.concatenate([np.asarray(samples, dtype=float) for samples in series])
+    return np.ma.array(data, mask=mask)
+
+
+# half width of the normal confidence interval of the mean, NaN for series
+# without samples
+def confidence_interval(stddev, count, confidence=CONFIDENCE):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return _normal_quantile(confidence) * (np.asarray(stddev) / np.sqrt(count))
+
+
+def _normal_quantile(confidence):
+    if confidence == CONFIDENCE:
+        return _CONFIDENCE_QUANTILE
+    import scipy.stats as st
+    return st.norm.ppf((1 + confidence) / 2)
+
+
+# statistics of every row of samples, a matrix or a masked matrix where NaN
+# also marks missing samples; statistics of series with fewer than two
+# samples are NaN when they need the standard deviation
+def summarize(samples, confidence=CONFIDENCE):
+    samples = np.ma.masked_invalid(np.ma.asarray(samples, dtype=float))
+    if samples.ndim == 1:
+        samples = samples[np.newaxis, :]
+    count = samples.count(axis=1)
+    mean = samples.mean(axis=1).filled(np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stddev = samples.std(axis=1, ddof=1).filled(np.nan)
+        stddev[count < 2] = np.nan
+        sem = stddev / np.sqrt(count)
+    conf = confidence_interval(stddev, count, confidence)
+    median = np.ma.median(samples, axis=1).filled(np.nan)
+    return Statistics(count, mean, stddev, sem, conf, median)
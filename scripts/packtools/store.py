@@ -0,0 +1,89 @@
+# Columnar store of the samples parsed from the logs
+#
+# A store is a directory with one .npy file per column and a metadata.json
+# file describing them. Text columns (benchmark, variant, ...) are saved as
+# integer codes into a list of labels kept in metadata.json. Columns are
+# memory-mapped when read, so graphs can be rebuilt without parsing the logs.
+
+import json
+import numpy as np
+import shutil
+from pathlib import Path
+
+STORE_VERSION = 1
+
+
+# write a map from column name to a sequence of values (all of the same length),
+# text columns can also be given already coded with their labels in labels
+def write_store(store_dir, columns, labels=None):
+    store_dir = Path(store_dir)
+    labels = labels or {}
+    tmp_dir = store_dir.with_name(store_dir.name + '.tmp')
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    rows = -1
+    metadata = {"version": STORE_VERSION, "columns": {}}
+    for idx,(name,values) in enumerate(columns.items()):
+        values = np.asarray(values)
+        if rows == -1:
+            rows = len(values)
+        assert rows == len(values)
+
+        column = {"file": "column-{}.npy".format(idx)}
+        # text columns are saved as codes into their labels
+        if name in labels:
+            column["labels"] = list(labels[name])
+        elif values.dtype.kind in ('U', 'S', 'O'):
+            column_labels, values = np.unique(values.astype(str), return_inverse=True)
+            column["labels"] = column_labels.tolist()
+            values = values.astype(np.int32)
+        np.save(tmp_dir / column["file"], values)
+        metadata["columns"][name] = column
+    metadata["rows"] = max(rows, 0)
+
+    # metadata is written last, a store without it is incomplete
+    with open(tmp_dir / "metadata.json", 'w') as f:
+        json.dump(metadata, f, indent=1)
+
+    if store_dir.exists():
+        shutil.rmtree(store_dir)
+    tmp_dir.rename(store_dir)
+
+
+def is_store(store_dir):
+    return (Path(store_dir) / "metadata.json").is_file()
+
+
+# returns a map from column name to a memory-mapped array and a map from
+# text column name to its labels (the array of a text column holds the codes)
+def read_store(store_dir):
+    store_dir = Path(store_dir)
+    with open(store_dir / "metadata.json", 'r') as f:
+        metadata = json.load(f)
+    if metadata["version"] != STORE_VERSION:
+        raise ValueError("Unsupported samples store version {} in {}".format(metadata["version"], store_dir))
+
+    columns = {}
+    labels = {}
+    for name,column in metadata["columns"].items():
+        columns[name] = np.load(store_dir / column["file"], mmap_mode='r')
+        if "labels" in column:
+            labels[name] = column["labels"]
+    return columns, labels
+
+
+# split the row indices of sorted key columns into contiguous groups,
+# returns a list of (key codes, start, end)
+def group_rows(*key_columns):
+    rows = len(key_columns[0])
+    if rows == 0:
+        return []
+    changes = np.zeros(rows, dtype=bool)
+    changes[0] = True
+    for column in key_columns:
+        changes[1:] |= column[1:] != column[:-1]
+    starts = np.flatnonzero(changes)
+    ends = np.append(starts[1:], rows)
+    return [(tuple(int(column[start]) for column in key_columns), int(start), int(end)) for start,end in zip(starts, ends)]
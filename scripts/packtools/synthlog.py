@@ -0,0 +1,204 @@
+# Synthetic logs in the format written by the run.sh scripts
+#
+# The logs are used to measure the parse-log.py scripts (see
+# experiments/parse-benchmark) without running the benchmarks. A
+# polybench-evaluation log has, for every execution, a "Running" line, the
+# execution time printed by polybench and the output of perf stat. The
+# packing-selection-evaluation log has the Google Benchmark aggregates of each
+# executable instead of the polybench execution time. Executions are written
+# in rounds, every executable once per round in random order, until the log
+# reaches the requested size; a fraction of them aborts or crashes, as seen
+# by the parsers.
+#
+# Values are drawn from a seeded generator: the same arguments always write
+# the same logs.
+
+import json
+import random
+
+from packtools.runner import PERF_EVENTS
+
+# benchmarks of the polybench-evaluation logs
+POLYBENCH_BENCHMARKS = [
+    "correlation", "covariance", "gemm", "gemver", "gesummv", "symm", "syr2k", "syrk", "trmm",
+    "2mm", "3mm", "atax", "bicg", "doitgen", "mvt", "cholesky", "durbin", "gramschmidt", "lu",
+    "ludcmp", "trisolv", "contraction-3d", "deriche", "floyd-warshall", "nussinov", "adi",
+    "fdtd-2d", "heat-3d", "jacobi-1d", "jacobi-2d", "seidel-2d",
+]
+
+# perf counters of run.sh -p
+PERF_COUNTERS = PERF_EVENTS.replace('{', '').replace('}', '').split(',')
+
+# lines written by an execution that aborted or crashed, the error line of
+# each is matched by the parsers
+ERROR_OUTPUTS = [
+    "{executable}: Assertion `n > 0' failed.\nAborted (core dumped)\n",
+    "Segmentation fault (core dumped)\n",
+]
+
+# description of the generated logs, written next to them
+MANIFEST_FILE = "synthetic.json"
+
+# bytes written at once
+_WRITE_BYTES = 1 << 20
+
+
+# size in bytes of a string such as 512K, 200M or 20G
+def parse_size(size):
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+    size = size.strip().upper().rstrip('B')
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
+# log names of a polybench-evaluation run with the tiling method
+def polybench_log_names(tiling_method, tile_sizes):
+    names = ["polly", "polygeist"]
+    if tiling_method == "AffineTiling":
+        names += ["affine-tiling-{}".format(level) for level in ('l1', 'l2', 'l3')]
+        names += ["affine-tiling-{}-packing".format(level) for level in ('l1', 'l2', 'l3')]
+    else:
+        names += ["polymer-{}".format(tile) for tile in tile_sizes]
+        names += ["polymer-packing-{}".format(tile) for tile in tile_sizes]
+    return names
+
+
+def _perf_block(rng, command, counter_means):
+    lines = ["\n Performance counter stats for '{}':\n\n".format(command)]
+    for counter,mean in counter_means:
+        if rng.random() < 0.002:
+            lines.append("   <not counted>      {}\n".format(counter))
+            continue
+        value = int(rng.gauss(mean, mean * 0.05))
+        lines.append("   {:>15,}      {:<35} (50.00%)\n".format(max(value, 0), counter))
+    lines.append("\n       {:.9f} seconds time elapsed\n\n".format(rng.uniform(0.1, 2.0)))
+    lines.append("       {:.6f} seconds user\n       {:.6f} seconds sys\n\n\n".format(rng.uniform(0.1, 2.0), rng.uniform(0.0, 0.05)))
+    return "".join(lines)
+
+
+def _error_output(rng, executable):
+    return rng.choice(ERROR_OUTPUTS).format(executable=executable)
+
+
+# counter means of an executable, roughly proportional to its runtime
+def _counter_means(rng, runtime):
+    return [(counter, rng.uniform(0.5, 2.0) * runtime * 1e9) for counter in PERF_COUNTERS]
+
+
+# write rounds of executions to path until it holds size bytes, text_of
+# returns the text of one execution; returns the number of executions and
+# the number that failed
+def _write_rounds(path, size, rng, executables, text_of):
+    executions = 0
+    failed = 0
+    written = 0
+    buffer = []
+    buffered = 0
+    with open(path, 'w') as log:
+        while written + buffered < size:
+            order = list(executables)
+            rng.shuffle(order)
+            for executable in order:
+                text, error = text_of(executable)
+                buffer.append(text)
+                buffered += len(text)
+                executions += 1
+                failed += error
+                if buffered >= _WRITE_BYTES:
+                    log.write("".join(buffer))
+                    written += buffered
+                    buffer = []
+                    buffered = 0
+                if written + buffered >= size:
+                    break
+        log.write("".join(buffer))
+    return executions, failed
+
+
+# write a polybench-evaluation log of about size bytes
+def write_polybench_log(path, size, rng, benchmarks, perf=True, error_rate=0.001, core=3):
+    executables = [benchmark + ".exe" for benchmark in benchmarks]
+    runtimes = {executable: rng.lognormvariate(-2.5, 1.0) for executable in executables}
+    counter_means = {executable: _counter_means(rng, runtimes[executable]) for executable in executables}
+
+    def text_of(executable):
+        text = "Running {}\n".format(executable)
+        error = rng.random() < error_rate
+        if error:
+            text += _error_output(rng, executable)
+        else:
+            text += "{:.6f}\n".format(rng.gauss(runtimes[executable], runtimes[executable] * 0.03))
+        if perf:
+            text += _perf_block(rng, "taskset --cpu-list {} ./{}".format(core, executable), counter_means[executable])
+        return text, error
+
+    return _write_rounds(path, size, rng, executables, text_of)
+
+
+# write a packing-selection-evaluation log of about size bytes
+def write_packing_log(path, size, rng, benchmark, tile_sizes, packings, perf=True, error_rate=0.001, core=3, dataset="LARGE"):
+    executables = []
+    for tile in tile_sizes:
+        for packing in ["none", "heuristic"] + [str(packing) for packing in range(packings)]:
+            executables.append("./executables/{}-{}-{}-{}-{}-packing-{}.exe".format(benchmark, dataset, tile, tile, tile, packing))
+    runtimes = {executable: rng.lognormvariate(3.5, 0.5) for executable in executables}
+    counter_means = {executable: _counter_means(rng, runtimes[executable] / 1000) for executable in executables}
+    repeats = 25
+
+    def text_of(executable):
+        runtime = rng.gauss(runtimes[executable], runtimes[executable] * 0.03)
+        stddev = abs(rng.gauss(runtimes[executable] * 0.05, runtimes[executable] * 0.01))
+        name = "BM_{}/iterations:1/repeats:{}".format(benchmark.upper().replace('-', '_'), repeats)
+        text = "Running {}\n".format(executable)
+        text += "{}\nRun on (8 X 2400 MHz CPU s)\nCPU Caches:\n  L1 Data 32 KiB (x4)\n  L2 Unified 256 KiB (x4)\n  L3 Unified 8192 KiB (x1)\n".format(rng.choice(["2023-01-01T00:00:00+00:00", "2023-01-02T00:00:00+00:00"]))
+        text += "-" * 80 + "\nBenchmark" + " " * 48 + "Time             CPU   Iterations\n" + "-" * 80 + "\n"
+        error = rng.random() < error_rate
+        if error:
+            text += _error_output(rng, executable)
+        else:
+            for _ in range(3):
+                sample = rng.gauss(runtime, stddev)
+                text += "{:<50} {:>8.3f} ms {:>8.3f} ms {:>12}\n".format(name, sample, sample, 1)
+            for aggregate,value in (("mean", runtime), ("median", runtime), ("stddev", stddev), ("cv", stddev / runtime * 100)):
+                unit = "%" if aggregate == "cv" else "ms"
+                text += "{:<50} {:>8.3f} {} {:>8.3f} {} {:>12}\n".format(name + "_" + aggregate, value, unit, value, unit, repeats)
+        if perf:
+            text += _perf_block(rng, "taskset --cpu-list {} {}".format(core, executable), counter_means[executable])
+        return text, error
+
+    return _write_rounds(path, size, rng, executables, text_of)
+
+
+# write the logs of a polybench-evaluation output dir, size is split evenly
+# between the logs; returns the manifest of the logs
+def write_polybench_logs(output_dir, size, tiling_method, tile_sizes, benchmarks=POLYBENCH_BENCHMARKS, perf=True, error_rate=0.001, seed=0):
+    rng = random.Random(seed)
+    names = polybench_log_names(tiling_method, tile_sizes)
+    logs = []
+    for name in names:
+        path = output_dir / (name + ".log")
+        executions, failed = write_polybench_log(path, size // len(names), rng, benchmarks, perf, error_rate)
+        logs.append({"log": path.name, "bytes": path.stat().st_size, "executions": executions, "failed": failed})
+    return _write_manifest(output_dir, {"experiment": "polybench-evaluation", "tiling_method": tiling_method, "seed": seed, "logs": logs})
+
+
+# write the log of a packing-selection-evaluation run, returns its manifest
+def write_packing_logs(output_dir, size, benchmark, tile_sizes, packings, perf=True, error_rate=0.001, seed=0):
+    rng = random.Random(seed)
+    path = output_dir / "output.log"
+    executions, failed = write_packing_log(path, size, rng, benchmark, tile_sizes, packings, perf, error_rate)
+    logs = [{"log": path.name, "bytes": path.stat().st_size, "executions": executions, "failed": failed}]
+    return _write_manifest(output_dir, {"experiment": "packing-selection-evaluation", "benchmark": benchmark, "seed": seed, "logs": logs})
+
+
+def _write_manifest(output_dir, manifest):
+    with open(output_dir / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    return manifest
+
+
+def read_manifest(log_dir):
+    with open(log_dir / MANIFEST_FILE) as f:
+        return json.load(f)
@@ -0,0 +1,103 @@
+# Search of the fastest Polymer tile size of a benchmark
+#
+# generate-files.sh builds and run.sh measures every tile size of the range of
+# the dataset size (4 to 128 by 1 for MEDIUM, 16 to 1024 by 4 for EXTRALARGE),
+# although the execution time of a kernel changes slowly with its tile size.
+# The search first measures a few tile sizes: tile sizes spread geometrically
+# over the range, and the tile sizes whose tiles fit in the L1, L2 and L3
+# caches of the spec.file. Then it narrows a bracket around the fastest tile
+# size: each round measures the tile sizes halfway between the fastest tile
+# size and its closest measured tile sizes, until these are next to it in the
+# range. A tile size faster than the fastest one is inside the bracket, so
+# whatever the noise every round at least halves the largest gap between the
+# fastest tile size and its closest measured ones: a search measures at most
+# two tile sizes per round, for a number of rounds that grows with the
+# logarithm of the largest gap between the first tile sizes. Only the fastest
+# tile size is refined: on a plateau, refining every tile size whose
+# confidence interval overlaps the one of the fastest would measure most of
+# the plateau. Tile sizes that failed (not tiled, not packed or not run) bound
+# the bracket but are never the fastest.
+
+import math
+from bisect import bisect_left
+
+# tile sizes measured first, spread over the range
+COARSE_POINTS = 8
+# size of the elements of the polybench arrays (double)
+ELEMENT_SIZE = 8
+# arrays of the kernel whose tiles are in the cache at the same time, as in
+# C[i][j] += A[i][k] * B[k][j]
+TILED_ARRAYS = 3
+
+
+# largest tile sizes whose square tiles of arrays arrays fit in the L1, L2 and
+# L3 caches of the spec.file (sizes in KiB)
+def cache_tile_sizes(spec, element_size=ELEMENT_SIZE, arrays=TILED_ARRAYS):
+    tile_sizes = []
+    for level in ("L1", "L2", "L3"):
+        if spec.get(level, "").isdigit():
+            tile_sizes.append(int(math.sqrt(int(spec[level]) * 1024 / (arrays * element_size))))
+    return tile_sizes
+
+
+# tile size of tiles closest to tile
+def nearest_tile(tiles, tile):
+    return min(tiles, key=lambda candidate: (abs(candidate - tile), candidate))
+
+
+# points tile sizes of tiles in geometric progression from the first one to
+# the last one
+def coarse_tiles(tiles, points=COARSE_POINTS):
+    first, last = max(tiles[0], 1), tiles[-1]
+    if points < 2:
+        return {tiles[0]}
+    ratio = (last / first) ** (1 / (points - 1))
+    return {nearest_tile(tiles, first * ratio ** point) for point in range(points)}
+
+
+class TileSearch:
+    def __init__(self, tiles, priors=(), points=COARSE_POINTS):
+        self.tiles = sorted(set(tiles))
+        self.index = {tile: index for index, tile in enumerate(self.tiles)}
+        self.initial = coarse_tiles(self.tiles, points) | {nearest_tile(self.tiles, tile) for tile in priors}
+        # map from tile size to the mean and confidence interval of its
+        # execution time, None when it failed
+        self.results = {}
+
+    def record(self, tile, mean, conf):
+        self.results[tile] = (mean, conf)
+
+    def fail(self, tile):
+        self.results[tile] = None
+
+    def measured(self):
+        return {tile: result for tile, result in self.results.items() if result is not None}
+
+    # fastest tile size, None before a tile size was measured
+    def best(self):
+        measured = self.measured()
+        if len(measured) == 0:
+            return None
+        return min(measured, key=lambda tile: (measured[tile][0], tile))
+
+    # closest tile sizes measured or failed below and above tile (indices in
+    # the range), the ends of the range act as missing neighbours
+    def bracket(self, tile):
+        tried = sorted(self.index[tried] for tried in self.results if tried in self.index)
+        position = bisect_left(tried, self.index[tile])
+        lower = tried[position - 1] if position > 0 else -1
+        upper = tried[position + 1] if position + 1 < len(tried) else len(self.tiles)
+        return lower, upper
+
+    # tile sizes to measure in the next round, empty when the search is done
+    def next_tiles(self):
+        tiles = set(tile for tile in self.initial if tile not in self.results)
+        best = self.best()
+        if best is not None and best in self.index:
+            index = self.index[best]
+            lower, upper = self.bracket(best)
+            if index - lower > 1:
+                tiles.add(self.tiles[(lower + index + 1) // 2])
+            if upper - index > 1:
+                tiles.add(self.tiles[(index + upper) // 2])
+        return sorted(tiles)
@@ -0,0 +1,98 @@
+# CPU topology used to run several benchmarks at the same time
+#
+# Concurrent executions must not disturb each other more than necessary: two
+# executions never share a physical core (SMT siblings) nor an L2 cache. The
+# topology is read from sysfs, or from lscpu -p when sysfs does not describe
+# the caches (containers, some virtual machines).
+
+import subprocess
+from pathlib import Path
+
+SYSFS_CPU = Path("/sys/devices/system/cpu")
+
+
+# parse a sysfs cpu list ("0-3,8,10-11")
+def parse_cpu_list(text):
+    cpus = set()
+    for part in text.strip().split(','):
+        if part == '':
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+# map from logical cpu to a map from domain ("core", "L2", "L3", "package")
+# to the id of the domain containing the cpu
+def _sysfs_topology(cpus):
+    topology = {}
+    for cpu in cpus:
+        cpu_dir = SYSFS_CPU / "cpu{}".format(cpu)
+        domains = {
+            "core": min(parse_cpu_list((cpu_dir / "topology" / "thread_siblings_list").read_text())),
+            "package": int((cpu_dir / "topology" / "physical_package_id").read_text()),
+        }
+        for index_dir in sorted((cpu_dir / "cache").glob("index[0-9]*")):
+            level = int((index_dir / "level").read_text())
+            if level in (2, 3):
+                # a cache is identified by the first cpu sharing it
+                domains["L{}".format(level)] = min(parse_cpu_list((index_dir / "shared_cpu_list").read_text()))
+        topology[cpu] = domains
+    return topology
+
+
+def _lscpu_topology(cpus):
+    output = subprocess.run(["lscpu", "-p=CPU,CORE,SOCKET,CACHE"], stdout=subprocess.PIPE, check=True).stdout.decode()
+    topology = {}
+    for line in output.splitlines():
+        if line.startswith('#'):
+            continue
+        cpu, core, socket, caches = line.split(',', 3)
+        if int(cpu) not in cpus:
+            continue
+        # caches are listed as L1d:L1i:L2:L3
+        caches = caches.strip(',').replace(',', ':').split(':')
+        domains = {"core": (int(socket), int(core)), "package": int(socket)}
+        if len(caches) > 2 and caches[2] != '':
+            domains["L2"] = int(caches[2])
+        if len(caches) > 3 and caches[3] != '':
+            domains["L3"] = int(caches[3])
+        topology[int(cpu)] = domains
+    return topology
+
+
+def cpu_topology(cpus):
+    try:
+        return _sysfs_topology(cpus)
+    except (OSError, ValueError):
+        return _lscpu_topology(cpus)
+
+
+# logical cpus of cpus that can run benchmarks at the same time, with no two
+# of them sharing a physical core or an L2 cache; the cpus are ordered to
+# spread the first ones over the L3 caches and packages
+def isolated_cpus(cpus):
+    topology = cpu_topology(sorted(cpus))
+    used = set()
+    selected = []
+    for cpu in sorted(topology):
+        domains = topology[cpu]
+        keys = {("core", domains["core"])}
+        if "L2" in domains:
+            keys.add(("L2", domains["L2"]))
+        if keys & used:
+            continue
+        used |= keys
+        selected.append(cpu)
+
+    # round robin over the L3 caches (or packages without L3 information)
+    rank = {}
+    order = {}
+    for cpu in selected:
+        domain = topology[cpu].get("L3", ("package", topology[cpu]["package"]))
+        rank[cpu] = order.get(domain, 0)
+        order[domain] = rank[cpu] + 1
+    return sorted(selected, key=lambda cpu: (rank[cpu], cpu))
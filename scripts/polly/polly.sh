@@ -29,6 +29,7 @@ function Help()
    echo -e "\t--enable-pattern-matching: Enable pattern matching optimizations in Polly."
    echo -e "\t--disable-vectorization: Disable vectorization in LLVM."
    echo -e "\t--disable-unrolling: Disable unrolling in LLVM."
+   echo -e "\t--perf-region: Count perf events around the kernel only and print them after the execution time."
    echo
 }
 
@@ -108,8 +109,9 @@ L2_ASSOCIATIVITY="8"
 ENABLE_PATTERN_MATCHING="false"
 DISABLE_VECTORIZATION="false"
 DISABLE_UNROLLING="false"
+PERF_REGION="false"
 
-PARSED_ARGUMENTS=$(getopt -a -n "polly" -o hvD: --long l1:,l2:,l1-associativity:,l2-associativity:,enable-pattern-matching,disable-unrolling,disable-vectorization -- "$@")
+PARSED_ARGUMENTS=$(getopt -a -n "polly" -o hvD: --long l1:,l2:,l1-associativity:,l2-associativity:,enable-pattern-matching,disable-unrolling,disable-vectorization,perf-region -- "$@")
 if [ $? != 0 ]; then
     echo "Invalid option." >&2
     Help
@@ -158,6 +160,10 @@ while [ : ]; do
       DISABLE_UNROLLING="true"
       shift
       ;;
+    --perf-region)
+      PERF_REGION="true"
+      shift
+      ;;
     --)
       shift
       break
@@ -211,6 +217,12 @@ if [[ $DISABLE_UNROLLING == "true" ]]; then
   FLAGS="$FLAGS -fno-unroll-loops"
 fi
 
+# polybench.c starts and stops the counters with the kernel timer
+POLYBENCH_FLAGS="-DPOLYBENCH_TIME"
+if [[ $PERF_REGION == "true" ]]; then
+  POLYBENCH_FLAGS="$POLYBENCH_FLAGS -DPOLYBENCH_PERF_REGION"
+fi
+
 for i in $(cat $POLYBENCH_BENCHMARK_LIST); do
   FNAME=$(basename $i)
   echo -e " Polly (clang) $FNAME"
@@ -246,7 +258,7 @@ for i in $(cat $POLYBENCH_BENCHMARK_LIST); do
   $CLANG "$OUTPUT_DIR/${FNAME%.*}.ll" "$POLYBENCH_UTILITIES/polybench.c" \
     -I$POLYBENCH_UTILITIES -DPOLYBENCH_USE_SCALAR_LB \
     -DPOLYBENCH_USE_RESTRICT -DPOLYBENCH_NO_FLUSH_CACHE \
-    -D${DATASET}_DATASET -DPOLYBENCH_TIME \
+    -D${DATASET}_DATASET $POLYBENCH_FLAGS \
     -Wall -Wno-unused-variable -Wno-unknown-pragmas \
     -O3 -ffast-math $FLAGS -flto -lm \
     -o $OUTPUT_DIR/${FNAME%.*}.exe